@@ -1,7 +1,10 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 import json
-from typing import Dict, Any
-from app_pipeline import generate_health_recommendation
+from typing import Dict, Any, Tuple
+from app_pipeline import recommendation_entry, prefetch_neighbours, recommendation_cache, DEFAULT_PROFILE_ID, MEAL_PLAN_FORMAT, SCORE_BUCKET_WIDTH, RecommendationUnavailable
+from metrics import REGISTRY, REQUESTS, REQUESTS_IN_FLIGHT, PROMETHEUS_CONTENT_TYPE, track_stage
+from response_encoding import compress, encoded_response, if_none_match, not_modified, strong_etag, variant_response
+from session_channel import SessionCancelled, SessionHub
 import time
 
 app = Flask(__name__)
@@ -38,7 +41,6 @@ def format_meal_plan_html(meal_plan: str) -> str:
                     html.append('<ul class="meal-items">')
                     for item in items:
                         if item.strip():
-                            print(item)
                             # Highlight recommendations
                             if 'Add' in item or 'Incorporate' in item:
                                 html.append(f'<li class="recommendation">{item.strip()}</li>')
@@ -68,33 +70,166 @@ def read_html_file(filepath: str) -> str:
     except Exception as e:
         return f"<p>Error loading HTML content: {str(e)}</p>"
 
-def run_pipeline(value: float) -> Dict[str, Any]:
+def pipeline_entry(value: float, profile_id: str = DEFAULT_PROFILE_ID, checkpoint=lambda: None) -> Tuple[int, str, float]:
     """
-    Process the input value through various pipeline steps.
+    Cached or freshly computed recommendation for a slider value.
+
+    Returns:
+        Tuple[int, str, float]: (bucket, recommendation, creation time), see recommendation_entry
     """
     try:
-        results = generate_health_recommendation(value/100)
-        results = format_meal_plan_html(results)
-        return {
-            "status": "success",
-            "results": results
-        }
+        return recommendation_entry(value/100, profile_id, checkpoint)
+    except (RecommendationUnavailable, SessionCancelled):
+        raise
     except Exception as e:
         raise Exception(f"Pipeline error: {str(e)}")
 
-@app.route('/process', methods=['POST'])
+def render_fragment(recommendation: str) -> str:
+    """HTML fragment for a cached recommendation."""
+    # Structured plans are already rendered from the typed model
+    if MEAL_PLAN_FORMAT == 'text':
+        with track_stage("html_format"):
+            return format_meal_plan_html(recommendation)
+    return recommendation
+
+def run_pipeline(value: float, profile_id: str = DEFAULT_PROFILE_ID, checkpoint=lambda: None) -> Dict[str, Any]:
+    """
+    Process the input value through various pipeline steps.
+    """
+    _, recommendation, _ = pipeline_entry(value, profile_id, checkpoint)
+    return {
+        "status": "success",
+        "results": render_fragment(recommendation)
+    }
+
+def fragment_etag(profile_id: str, bucket: int, created_at: float) -> str:
+    """
+    ETag of a rendered plan, derived from its cache key and version.
+
+    A plan is only ever replaced by recomputing it, which gives it a new
+    creation time, so the tag can be checked without rendering the body.
+    """
+    version = f"{profile_id}\0{bucket}\0{SCORE_BUCKET_WIDTH}\0{created_at!r}\0{MEAL_PLAN_FORMAT}"
+    return strong_etag(version.encode('utf-8'))
+
+def fragment_response(value: float, profile_id: str, conditional: bool) -> Response:
+    """
+    Rendered plan for a slider value, answered with 304 when the client has it.
+
+    If-None-Match is checked as soon as the cached entry is known, before
+    any rendering or compression. The rendered and compressed bodies are
+    cached next to the entry, so repeat requests only pay for them once.
+    """
+    bucket, recommendation, created_at = pipeline_entry(value, profile_id)
+    etag = fragment_etag(profile_id, bucket, created_at)
+    if conditional:
+        matched = if_none_match(request, etag)
+        if matched is not None:
+            return not_modified(matched)
+
+    def variant(encoding):
+        if encoding is None:
+            return recommendation_cache.variant(
+                profile_id, bucket, created_at, 'identity',
+                lambda: render_fragment(recommendation).encode('utf-8')
+            )
+        return recommendation_cache.variant(
+            profile_id, bucket, created_at, encoding,
+            lambda: compress(variant(None), encoding)
+        )
+
+    return variant_response(request, etag, variant, 'text/html; charset=utf-8')
+
+@app.route('/process', methods=['GET', 'POST'])
 def process_value():
+    """
+    Run the pipeline for a slider value.
+
+    POST takes a JSON body and answers JSON. GET takes the same fields as
+    query parameters; with format=html it answers the rendered fragment
+    itself, which browsers can revalidate with If-None-Match (304).
+    Neighbouring buckets are only prefetched for requests with a sessionId.
+    """
+    with REQUESTS_IN_FLIGHT.track_inprogress(endpoint="/process"):
+        try:
+            data = request.get_json() if request.method == 'POST' else request.args
+            value = float(data.get('value', 0))
+            profile_id = data.get('profileId') or DEFAULT_PROFILE_ID
+            if data.get('format') == 'html':
+                response = fragment_response(value, profile_id, conditional=request.method == 'GET')
+            else:
+                response = encoded_response(
+                    request,
+                    json.dumps(run_pipeline(value, profile_id)).encode('utf-8'),
+                    'application/json'
+                )
+            # Without a session id there is nothing to tell clients apart by;
+            # the remote address would merge everyone behind one proxy
+            if data.get('sessionId'):
+                prefetch_neighbours(value/100, session_id=data['sessionId'], profile_id=profile_id)
+            REQUESTS.inc(endpoint="/process", status=str(response.status_code))
+            return response
+        except RecommendationUnavailable as e:
+            REQUESTS.inc(endpoint="/process", status="503")
+            response = jsonify({
+                "status": "error",
+                "error": str(e)
+            })
+            if e.retry_after:
+                response.headers['Retry-After'] = str(int(e.retry_after + 0.5) or 1)
+            return response, 503
+        except Exception as e:
+            REQUESTS.inc(endpoint="/process", status="400")
+            return jsonify({
+                "status": "error",
+                "error": str(e)
+            }), 400
+
+def run_for_session(session_id: str, profile_id: str, value: float, checkpoint) -> str:
+    """Pipeline run for a slider session, rendered as an HTML fragment."""
+    html = run_pipeline(value, profile_id, checkpoint)["results"]
+    prefetch_neighbours(value/100, session_id=session_id, profile_id=profile_id)
+    return html
+
+# Slider values arrive on /slider and results leave on /events; each session
+# only ever processes its newest value
+slider_sessions = SessionHub(run_for_session)
+
+@app.route('/slider', methods=['POST'])
+def slider_update():
+    """Queue a slider value for a session; the result is pushed on /events."""
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('sessionId')
     try:
-        data = request.get_json()
         value = float(data.get('value', 0))
-        results = run_pipeline(value)
-        return jsonify(results), 200
-    except Exception as e:
+    except (TypeError, ValueError):
+        value = None
+    if not session_id or value is None:
         return jsonify({
             "status": "error",
-            "error": str(e)
+            "error": "sessionId and a numeric value are required"
         }), 400
 
+    generation = slider_sessions.session(session_id).submit(data.get('profileId') or DEFAULT_PROFILE_ID, value)
+    return jsonify({"status": "accepted", "generation": generation}), 202
+
+@app.route('/events', methods=['GET'])
+def session_events():
+    """Server-sent events stream of a session's slider results."""
+    session_id = request.args.get('sessionId')
+    if not session_id:
+        return jsonify({"status": "error", "error": "sessionId is required"}), 400
+    response = Response(slider_sessions.stream(session_id), content_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose pipeline metrics in Prometheus text format."""
+    return Response(REGISTRY.expose(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def home():
     meal_plan_html = read_html_file('/Users/nealan/Documents/prototypes/health-hackathon/base_meal_plan.html')
@@ -279,51 +414,83 @@ def home():
                 }}
 
                 let processingTimeout;
+                const sessionId = Math.random().toString(36).slice(2);
+                let latestGeneration = 0;
+                let lastEvent = null;
+                
+                function showResult(html) {{
+                    updateStep('step-generate', 'completed');
+                    updateStep('step-complete', 'completed');
+                    resultDiv.innerHTML = '<h3>Results:</h3>' + html;
+                    processingDiv.style.display = 'none';
+                }}
+                
+                function showError(message) {{
+                    updateStep('step-complete', 'error');
+                    resultDiv.innerHTML = '<h3>Error:</h3>' + 
+                                        '<pre style="color: red;">' + message + '</pre>';
+                    processingDiv.style.display = 'none';
+                }}
+                
+                // One channel per page; the server only pushes the result for
+                // the newest value and drops work for values already replaced
+                const events = window.EventSource ? new EventSource('/events?sessionId=' + sessionId) : null;
+                
+                // A cached result can arrive before the /slider response that
+                // names its generation, so the last event is kept until then
+                function renderLatest() {{
+                    if (!lastEvent || lastEvent.data.generation !== latestGeneration) return;
+                    if (lastEvent.type === 'result') showResult(lastEvent.data.html);
+                    else showError(lastEvent.data.error);
+                }}
+                
+                if (events) {{
+                    ['result', 'error'].forEach(type => events.addEventListener(type, (e) => {{
+                        if (!e.data) return;  // connection errors; EventSource reconnects itself
+                        lastEvent = {{ type: type, data: JSON.parse(e.data) }};
+                        renderLatest();
+                    }}));
+                }}
                 
                 async function processValue(value) {{
                     try {{
                         resetSteps();
                         processingDiv.style.display = 'flex';
                         resultDiv.innerHTML = 'Processing...';
-                        
-                        updateStep('step-input', 'active');
-                        await new Promise(resolve => setTimeout(resolve, 500));
                         updateStep('step-input', 'completed');
-                        
-                        updateStep('step-process', 'active');
-                        await new Promise(resolve => setTimeout(resolve, 500));
                         updateStep('step-process', 'completed');
-                        
                         updateStep('step-generate', 'active');
                         
-                        const response = await fetch('/process', {{
-                            method: 'POST',
-                            headers: {{
-                                'Content-Type': 'application/json'
-                            }},
-                            body: JSON.stringify({{ value: parseFloat(value) }})
-                        }});
-                        
-                        updateStep('step-generate', 'completed');
-                        updateStep('step-complete', 'active');
-                        
-                        const data = await response.json();
+                        if (events) {{
+                            const response = await fetch('/slider', {{
+                                method: 'POST',
+                                headers: {{
+                                    'Content-Type': 'application/json'
+                                }},
+                                body: JSON.stringify({{ value: parseFloat(value), sessionId: sessionId }})
+                            }});
+                            const data = await response.json();
+                            if (!response.ok) showError(data.error);
+                            // Results for older values are ignored when they arrive
+                            else {{
+                                latestGeneration = Math.max(latestGeneration, data.generation);
+                                renderLatest();
+                            }}
+                            return;
+                        }}
                         
-                        if (data.status === 'success') {{
-                            updateStep('step-complete', 'completed');
-                            resultDiv.innerHTML = '<h3>Results:</h3>' + 
-                                                '<pre>' + JSON.stringify(data.results, null, 2) + '</pre>';
+                        // Without EventSource, fetch the rendered fragment directly; the
+                        // browser revalidates repeat values with If-None-Match
+                        const params = new URLSearchParams({{ value: value, sessionId: sessionId, format: 'html' }});
+                        const response = await fetch('/process?' + params.toString());
+                        if (response.ok) {{
+                            showResult(await response.text());
                         }} else {{
-                            updateStep('step-complete', 'error');
-                            resultDiv.innerHTML = '<h3>Error:</h3>' + 
-                                                '<pre style="color: red;">' + data.error + '</pre>';
+                            const data = await response.json();
+                            showError(data.error);
                         }}
                     }} catch (error) {{
-                        updateStep('step-complete', 'error');
-                        resultDiv.innerHTML = '<h3>Error:</h3>' + 
-                                            '<pre style="color: red;">' + error.message + '</pre>';
-                    }} finally {{
-                        processingDiv.style.display = 'none';
+                        showError(error.message);
                     }}
                 }}
                 
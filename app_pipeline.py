@@ -1,12 +1,23 @@
 import os
-import json
-from openai_client import OpenAIClient
+import time
+from openai_client import OpenAIClient, ERROR_PREFIX
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from llm_routing import HedgePolicy, LatencyRoute
 from health_assessment import HealthAssessment
 from medication_parser import MedicationRegimen
-from health_recommendation import main as hrm
+from health_recommendation import main_from_stats as hrm_from_stats
+from metrics import STALE_SERVED, track_stage
+from prompt_builder import build_refinement_prompt, REFINE_TEMPLATE, STRUCTURED_REFINE_TEMPLATE
+from meal_plan import RESPONSE_FORMAT, parse_meal_plan, render_meal_plan_html
+from recommendation_cache import RecommendationCache, score_bucket, bucket_score, DEFAULT_BUCKET_WIDTH
+from prefetch import InFlight, Prefetcher
+from patient_context import PatientContext, PatientContextCache
+from sahha_stream import iter_score_entries
+from score_stats import StreamingScoreStats
+from snapshot_cache import load_cached
 import markdown
 from bs4 import BeautifulSoup
-from typing import Union
+from typing import Callable, Dict, Iterator, Optional, Tuple, Union
 
 def convert_markdown_to_html(markdown_text: str) -> Union[str, None]:
     """
@@ -74,83 +85,444 @@ def convert_markdown_to_html(markdown_text: str) -> Union[str, None]:
         print(f"Error converting markdown to HTML: {str(e)}")
         return None
 
-json_file = '/Users/nealan/Documents/prototypes/health-hackathon/health_assessment.json'
-assessment = HealthAssessment(json_file)
+# Data for the original single-patient deployment, served as the "default" profile
+DATA_DIR = os.getenv('MERIDIAN_DATA_DIR', '/Users/nealan/Documents/prototypes/health-hackathon')
+DEFAULT_PROFILE_ID = "default"
 
-json_file = '/Users/nealan/Documents/prototypes/health-hackathon/medication.json'
-medication = MedicationRegimen(json_file)
+# One directory per profileId holding health_assessment.json, medication.json and
+# optionally sahha_scores.json and base_meal_plan.txt
+PATIENT_DATA_DIR = os.getenv('MERIDIAN_PATIENT_DATA_DIR', os.path.join(DATA_DIR, 'patients'))
+
+# Shared Sahha export, used for profiles without their own score file
+SAHHA_EXPORT = os.getenv('MERIDIAN_SAHHA_EXPORT', 'sahha_scores.json')
+
+# Record/replay settings, e.g. OPEN_AI_CLIENT_MODE=replay for offline load tests
+client_options = {
+    "mode": os.getenv('OPEN_AI_CLIENT_MODE', 'live'),
+    "cassette_path": os.getenv('OPEN_AI_CASSETTE'),
+    "replay_latency_scale": float(os.getenv('OPEN_AI_REPLAY_LATENCY_SCALE', '0')),
+}
+
+# Tail-latency controls, both off unless configured. OPEN_AI_HEDGE_PERCENTILE=0.95
+# sends a backup request (optionally to OPEN_AI_HEDGE_MODEL) for calls slower
+# than 95% of recent ones. MERIDIAN_REFINE_LATENCY_BUDGET moves the refinement
+# call to MERIDIAN_REFINE_FALLBACK_MODEL while the default model's p90 is over budget.
+if os.getenv('OPEN_AI_HEDGE_PERCENTILE'):
+    client_options["hedge"] = HedgePolicy(
+        percentile=float(os.getenv('OPEN_AI_HEDGE_PERCENTILE')),
+        min_delay=float(os.getenv('OPEN_AI_HEDGE_MIN_DELAY', '1.0')),
+        hedge_model=os.getenv('OPEN_AI_HEDGE_MODEL')
+    )
+if os.getenv('MERIDIAN_REFINE_LATENCY_BUDGET'):
+    client_options["routes"] = {
+        "refine": LatencyRoute(
+            budget=float(os.getenv('MERIDIAN_REFINE_LATENCY_BUDGET')),
+            fallback_model=os.getenv('MERIDIAN_REFINE_FALLBACK_MODEL', 'gpt-4.1-nano')
+        )
+    }
 
 # Initialize the client
-client = OpenAIClient(os.getenv('OPEN_AI_API_KEY'))
-
-# Example 1: Simple prompt with system message
-interactions = client.generate_response(
-    system_prompt="You are a doctor tasked with identifying any side effects for each individual medication as well as the interaction of them together. ",
-    prompt=f"""Below is the medication that will be taken today {medication.get_daily_summary_string()}.
-        1. Start by first listing all medication
-        2. For each list the side effects. 
-        3. Afterwards, list the interactions between each medication.
-        Please ensure that you do not make any mistakes.
-        """,
+client = OpenAIClient(os.getenv('OPEN_AI_API_KEY'), **client_options)
+
+# Update the generate_chat_response method to use max_completion_tokens
+o1_client = OpenAIClient(os.getenv('OPEN_AI_API_KEY'), **client_options)
 
+# Shared by every pipeline LLM call. Opens after consecutive failures or calls
+# slower than MERIDIAN_LLM_LATENCY_THRESHOLD seconds, so an OpenAI outage
+# fails requests fast instead of tying up workers.
+llm_breaker = CircuitBreaker(
+    "openai",
+    failure_threshold=int(os.getenv('MERIDIAN_LLM_FAILURE_THRESHOLD', '5')),
+    reset_timeout=float(os.getenv('MERIDIAN_LLM_RESET_TIMEOUT', '30')),
+    latency_threshold=float(os.getenv('MERIDIAN_LLM_LATENCY_THRESHOLD', '30')) or None
 )
 
 
-chat_messages = [
-    {
-        "role": "user", 
-        "content": f"""I am a dietician working with a client who is aiming to get stronger.
-                They have provided for you their medication for the day.
-                If there is any potential interaction for the medication, please provide a note against the meal so that they can be aware of the risk. "
-                Provide a meal plan for today.
-                
-                Medication:
-                {interactions}
-                
-                Format the meal plan to look like the following:
-
-
-                MEAL_NAME (TIME):
-                - MEAL ITEM 1
-                - MEAL ITEM 2
-                - MEAL ITEM 3
-
-                - MEDICATION 1
-                - MEDICATION 2
-                
-                """
-    }
-]
+class RecommendationUnavailable(RuntimeError):
+    """The LLM failed or is switched off by the breaker, and nothing is cached."""
 
-# Update the generate_chat_response method to use max_completion_tokens
-o1_client = OpenAIClient(os.getenv('OPEN_AI_API_KEY'))
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
 
-meal_plan = o1_client.generate_chat_response(chat_messages)
 
-with open('sahha_scores.json', 'r') as file:
-    sahha_scores = json.load(file)
+def _llm_call(generate: Callable[[], str]) -> str:
+    """
+    Run an LLM call through the circuit breaker.
 
+    Args:
+        generate (Callable[[], str]): Call returning the model's text or OpenAIClient error text
 
-def generate_health_recommendation(current_sahha_score):
-    
-    current_state = hrm(sahha_scores, current_sahha_score)
+    Returns:
+        str: Model output
+
+    Raises:
+        CircuitOpenError: If the breaker is open
+        RuntimeError: If the call failed
+    """
+    def checked() -> str:
+        text = generate()
+        if text.startswith(ERROR_PREFIX):
+            raise RuntimeError(text)
+        return text
+    return llm_breaker.call(checked)
+
+
+def analyze_medication_interactions(medication: MedicationRegimen) -> str:
+    """Ask the LLM for side effects and interactions of today's medication."""
+    return client.generate_response(
+        system_prompt="You are a doctor tasked with identifying any side effects for each individual medication as well as the interaction of them together. ",
+        prompt=f"""Below is the medication that will be taken today {medication.get_daily_summary_string()}.
+            1. Start by first listing all medication
+            2. For each list the side effects. 
+            3. Afterwards, list the interactions between each medication.
+            Please ensure that you do not make any mistakes.
+            """,
+        call_type="medication_interactions"
+    )
+
+
+def generate_base_meal_plan(interactions: str) -> str:
+    """Ask the LLM for today's meal plan, annotated with medication risks."""
+    chat_messages = [
+        {
+            "role": "user", 
+            "content": f"""I am a dietician working with a client who is aiming to get stronger.
+                    They have provided for you their medication for the day.
+                    If there is any potential interaction for the medication, please provide a note against the meal so that they can be aware of the risk. "
+                    Provide a meal plan for today.
+                    
+                    Medication:
+                    {interactions}
+                    
+                    Format the meal plan to look like the following:
+
+
+                    MEAL_NAME (TIME):
+                    - MEAL ITEM 1
+                    - MEAL ITEM 2
+                    - MEAL ITEM 3
+
+                    - MEDICATION 1
+                    - MEDICATION 2
+                    
+                    """
+        }
+    ]
+    return o1_client.generate_chat_response(chat_messages, call_type="base_meal_plan")
+
+
+def iter_score_history(profile_id: str) -> Iterator[Dict]:
+    """
+    Stream the Sahha score entries for a profile.
 
-    refine_meal_plan_prompt = f"""
-        Update the meal plan to ensure that it is in line with the client's current state.
-        Provide your reasoning as to why you've made those changes as well. 
+    The default profile keeps the original behaviour of using the whole
+    shared export. Other profiles use their own sahha_scores.json when present,
+    otherwise their entries in the shared export. Entries are filtered as
+    they are parsed, so no list of the export is ever built.
+    """
+    profile_scores = os.path.join(PATIENT_DATA_DIR, profile_id, 'sahha_scores.json')
+    if profile_id != DEFAULT_PROFILE_ID and os.path.exists(profile_scores):
+        return iter_score_entries(profile_scores)
+
+    entries = iter_score_entries(SAHHA_EXPORT)
+    if profile_id == DEFAULT_PROFILE_ID:
+        return entries
+    return (entry for entry in entries if entry.get('profileId') == profile_id)
+
+
+def load_patient_context(profile_id: str) -> PatientContext:
+    """
+    Load everything the pipeline needs for one patient.
+
+    Args:
+        profile_id (str): Sahha profileId, or DEFAULT_PROFILE_ID for the original patient
 
-        Current state:
-            {current_state}
+    Returns:
+        PatientContext: Parsed assessment and regimen, wellbeing score
+        statistics, medication interaction analysis and base meal plan
+
+    Raises:
+        KeyError: If there is no data directory for the profile
+        RuntimeError: If an LLM call failed, so the context is not cached
+    """
+    if profile_id == DEFAULT_PROFILE_ID:
+        profile_dir = DATA_DIR
+    else:
+        # Profile ids come from requests; never let them escape the data directory
+        if os.path.basename(profile_id) != profile_id or profile_id in ('', '.', '..'):
+            raise KeyError(f"Invalid profile id: {profile_id!r}")
+        profile_dir = os.path.join(PATIENT_DATA_DIR, profile_id)
+        if not os.path.isdir(profile_dir):
+            raise KeyError(f"Unknown profile id: {profile_id}")
 
-        Meal Plan:
-            {meal_plan}
+    assessment = load_cached(HealthAssessment, os.path.join(profile_dir, 'health_assessment.json'))
+    medication = load_cached(MedicationRegimen, os.path.join(profile_dir, 'medication.json'))
+    interactions = _llm_call(lambda: analyze_medication_interactions(medication))
 
-        Return ONLY The updated meal plan and reasoning for the changes.
-        """
-    updated_meal_plan = client.generate_response(
-        system_prompt="You are a dietician who has been given a meal plan and a client's current state.",
-        prompt=refine_meal_plan_prompt,
+    base_plan_file = os.path.join(profile_dir, 'base_meal_plan.txt')
+    if profile_id != DEFAULT_PROFILE_ID and os.path.exists(base_plan_file):
+        with open(base_plan_file, 'r') as file:
+            meal_plan = file.read()
+    else:
+        meal_plan = _llm_call(lambda: generate_base_meal_plan(interactions))
 
+    return PatientContext(
+        profile_id=profile_id,
+        assessment=assessment,
+        medication=medication,
+        wellbeing_stats=StreamingScoreStats.from_entries(iter_score_history(profile_id), 'wellbeing'),
+        interactions=interactions,
+        meal_plan=meal_plan
     )
 
-    return convert_markdown_to_html(updated_meal_plan)
+
+patient_contexts = PatientContextCache(
+    load_patient_context,
+    max_contexts=int(os.getenv('MERIDIAN_MAX_PATIENT_CONTEXTS', '1000')),
+    max_bytes=int(os.getenv('MERIDIAN_PATIENT_CONTEXT_BYTES', str(512 * 1024 * 1024)))
+)
+
+# Input-token budget for the refinement prompt; 0 disables trimming
+PROMPT_TOKEN_BUDGET = int(os.getenv('MERIDIAN_PROMPT_TOKEN_BUDGET', '2000')) or None
+
+# 'text' keeps the free-text plan and the dashboard's keyword formatting;
+# 'json' requests schema-constrained output and renders the typed MealPlan.
+# Cached HTML differs between the two, so give each its own
+# MERIDIAN_RECOMMENDATION_STORE.
+MEAL_PLAN_FORMAT = os.getenv('MERIDIAN_MEAL_PLAN_FORMAT', 'text')
+
+SCORE_BUCKET_WIDTH = float(os.getenv('MERIDIAN_SCORE_BUCKET_WIDTH', str(DEFAULT_BUCKET_WIDTH)))
+
+recommendation_cache = RecommendationCache(
+    max_entries=int(os.getenv('MERIDIAN_CACHE_MAX_ENTRIES', '4096')),
+    store_path=os.getenv('MERIDIAN_RECOMMENDATION_STORE')
+)
+
+# Cached plans older than this are still served, but recomputed in the background
+RECOMMENDATION_MAX_AGE = float(os.getenv('MERIDIAN_RECOMMENDATION_MAX_AGE', str(6 * 60 * 60)))
+
+
+def _no_checkpoint() -> None:
+    pass
+
+
+def compute_health_recommendation(
+    current_sahha_score: float,
+    profile_id: str = DEFAULT_PROFILE_ID,
+    checkpoint: Callable[[], None] = _no_checkpoint
+) -> str:
+    """
+    Run the recommendation pipeline for a score without consulting the cache.
+
+    Args:
+        current_sahha_score (float): Wellbeing score between 0 and 1
+        profile_id (str): Patient profile the recommendation is for
+        checkpoint (Callable[[], None]): Called between stages up to the LLM
+            call; raising from it abandons the request
+
+    Returns:
+        str: Rendered recommendation HTML
+
+    Raises:
+        CircuitOpenError: If the LLM circuit breaker is open
+        RuntimeError: If the LLM call failed or returned an invalid structured plan
+    """
+    with track_stage("patient_context"):
+        context = patient_contexts.get(profile_id)
+    checkpoint()
+
+    with track_stage("score_analysis"):
+        current_state = hrm_from_stats(context.wellbeing_stats, current_sahha_score)
+
+    structured = MEAL_PLAN_FORMAT == 'json'
+
+    with track_stage("prompt_build"):
+        refine_prompt = build_refinement_prompt(
+            current_state,
+            context.meal_plan,
+            budget=PROMPT_TOKEN_BUDGET,
+            model=client.default_model,
+            template=STRUCTURED_REFINE_TEMPLATE if structured else REFINE_TEMPLATE
+        )
+    # Last chance to give up; once the LLM has been paid the plan is finished and cached
+    checkpoint()
+
+    with track_stage("llm_refine"):
+        updated_meal_plan = _llm_call(lambda: client.generate_response(
+            system_prompt=refine_prompt.system_prompt,
+            prompt=refine_prompt.prompt,
+            response_format=RESPONSE_FORMAT if structured else None,
+            call_type="refine"
+        ))
+
+    if structured:
+        with track_stage("render"):
+            try:
+                return render_meal_plan_html(parse_meal_plan(updated_meal_plan))
+            except ValueError as e:
+                raise RuntimeError(str(e))
+
+    with track_stage("markdown"):
+        return convert_markdown_to_html(updated_meal_plan)
+
+
+def recommendation_entry(
+    current_sahha_score: float,
+    profile_id: str = DEFAULT_PROFILE_ID,
+    checkpoint: Callable[[], None] = _no_checkpoint
+) -> Tuple[int, str, float]:
+    """
+    Return the recommendation for a score with its cache version, computing it on a miss.
+
+    Scores are snapped to their cache bucket first so that every slider
+    position in a bucket gets the same plan. Cached plans are always served
+    immediately; past RECOMMENDATION_MAX_AGE they are also recomputed in the
+    background (stale-while-revalidate), unless the LLM breaker is open.
+
+    Args:
+        current_sahha_score (float): Wellbeing score between 0 and 1
+        profile_id (str): Patient profile the recommendation is for
+        checkpoint (Callable[[], None]): Passed to compute_health_recommendation on a miss
+
+    Returns:
+        Tuple[int, str, float]: (bucket, rendered HTML, creation time); profile,
+        bucket and creation time identify this exact plan
+
+    Raises:
+        ValueError: If the score is outside [0, 1] or NaN
+        KeyError: If the profile is unknown
+        RecommendationUnavailable: If nothing is cached and the LLM failed or its breaker is open
+    """
+    # Checked before bucketing: bucket_score would clamp an out-of-range
+    # score, and every such score would get a cache entry of its own.
+    # NaN fails the comparison too.
+    if not 0 <= current_sahha_score <= 1:
+        raise ValueError("Current score must be between 0 and 1")
+    bucket = score_bucket(current_sahha_score, SCORE_BUCKET_WIDTH)
+    entry = recommendation_cache.get_entry(profile_id, bucket)
+    if entry is not None:
+        html, created_at = entry
+        if time.time() - created_at > RECOMMENDATION_MAX_AGE:
+            if llm_breaker.is_open:
+                STALE_SERVED.inc(reason="circuit_open")
+            else:
+                STALE_SERVED.inc(reason="expired")
+                revalidator.refresh(profile_id, bucket)
+        return bucket, html, created_at
+
+    try:
+        html, created_at = _compute_once(profile_id, bucket, checkpoint)
+    except CircuitOpenError as e:
+        raise RecommendationUnavailable(str(e), e.retry_after) from e
+    except RuntimeError as e:
+        # Failures are never cached or shown as a plan
+        raise RecommendationUnavailable(
+            f"Could not generate a recommendation: {str(e)}",
+            llm_breaker.retry_after or None
+        ) from e
+    return bucket, html, created_at
+
+
+def _compute_once(profile_id: str, bucket: int, checkpoint: Callable[[], None]) -> Tuple[str, float]:
+    """
+    Compute and cache a bucket, or wait for the computation already running.
+
+    A prefetch or revalidation of the bucket that is still queued is
+    cancelled and the work done here instead, rather than waiting behind
+    the pool.
+
+    Returns:
+        Tuple[str, float]: Rendered HTML and its cache creation time
+    """
+    key = (profile_id, bucket)
+    while True:
+        slot, owner = in_flight.claim(key)
+        if owner:
+            break
+        if slot.cancel():
+            continue
+        try:
+            return slot.result()
+        except (CircuitOpenError, RuntimeError):
+            raise
+        except Exception:
+            # Abandoned for a reason of its own, e.g. a cancelled slider session; try again
+            continue
+
+    slot.set_running_or_notify_cancel()
+    try:
+        html = compute_health_recommendation(bucket_score(bucket, SCORE_BUCKET_WIDTH), profile_id, checkpoint)
+        result = html, recommendation_cache.put(profile_id, bucket, html)
+    except BaseException as e:
+        slot.set_exception(e)
+        in_flight.release(key, slot)
+        raise
+    slot.set_result(result)
+    in_flight.release(key, slot)
+    return result
+
+
+def generate_health_recommendation(
+    current_sahha_score: float,
+    profile_id: str = DEFAULT_PROFILE_ID,
+    checkpoint: Callable[[], None] = _no_checkpoint
+) -> str:
+    """
+    Return the recommendation HTML for a score; see recommendation_entry.
+
+    Args:
+        current_sahha_score (float): Wellbeing score between 0 and 1
+        profile_id (str): Patient profile the recommendation is for
+        checkpoint (Callable[[], None]): Passed to compute_health_recommendation on a miss
+
+    Returns:
+        str: Rendered recommendation HTML
+
+    Raises:
+        ValueError: If the score is outside [0, 1] or NaN
+        KeyError: If the profile is unknown
+        RecommendationUnavailable: If nothing is cached and the LLM failed or its breaker is open
+    """
+    return recommendation_entry(current_sahha_score, profile_id, checkpoint)[1]
+
+
+# Buckets being computed by requests, prefetches or revalidations, so each is
+# computed once at a time
+in_flight = InFlight()
+
+# Warms neighbouring score buckets after each request; 0 concurrency disables it
+PREFETCH_CONCURRENCY = int(os.getenv('MERIDIAN_PREFETCH_CONCURRENCY', '2'))
+
+prefetcher = Prefetcher(
+    compute=lambda profile_id, score: compute_health_recommendation(score, profile_id),
+    cache=recommendation_cache,
+    max_concurrency=max(PREFETCH_CONCURRENCY, 1),
+    radius=int(os.getenv('MERIDIAN_PREFETCH_RADIUS', '2')),
+    bucket_width=SCORE_BUCKET_WIDTH,
+    in_flight=in_flight
+) if PREFETCH_CONCURRENCY > 0 else None
+
+# Recomputes stale cache entries; separate from prefetching so it runs even
+# when prefetching is disabled and is never cancelled by slider movement
+revalidator = Prefetcher(
+    compute=lambda profile_id, score: compute_health_recommendation(score, profile_id),
+    cache=recommendation_cache,
+    max_concurrency=int(os.getenv('MERIDIAN_REVALIDATE_CONCURRENCY', '1')),
+    radius=0,
+    bucket_width=SCORE_BUCKET_WIDTH,
+    in_flight=in_flight
+)
+
+
+def prefetch_neighbours(current_sahha_score: float, session_id: str, profile_id: str = DEFAULT_PROFILE_ID) -> None:
+    """
+    Queue background computation of the buckets around a served score.
+
+    Args:
+        current_sahha_score (float): Score that was just served, between 0 and 1
+        session_id (str): Dashboard session, used to cancel stale prefetches
+        profile_id (str): Patient profile being viewed
+    """
+    if prefetcher is not None:
+        prefetcher.schedule(session_id, profile_id, current_sahha_score)
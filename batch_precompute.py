@@ -0,0 +1,259 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from recommendation_cache import RecommendationCache, score_bucket, bucket_score, DEFAULT_BUCKET_WIDTH
+
+
+class TokenBucket:
+    """Blocking token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute (float): Tokens added per minute
+            capacity (float, optional): Burst size, defaults to one minute's worth
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Take tokens from the bucket, sleeping until enough are available.
+
+        Args:
+            amount (float): Tokens to take; capped at the bucket capacity so an
+                oversized request waits for a full bucket instead of forever
+
+        Returns:
+            float: Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                delay = (amount - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits applied together."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Block until one request using `tokens` tokens may be sent.
+
+        Meant to be charged per API request, e.g. as an OpenAIClient
+        rate_limiter, since one job can make several LLM calls.
+        """
+        return self.requests.acquire(1) + self.tokens.acquire(tokens)
+
+
+class Checkpoint:
+    """
+    Append-only JSON-lines log of finished jobs.
+
+    A restarted run skips every job logged as done; failed jobs are logged
+    for inspection but retried.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: Set[Tuple[str, int]] = set()
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partially written last line
+                    if entry.get("status") == "done":
+                        self.done.add((entry["profile_id"], entry["bucket"]))
+        self._file = open(path, 'a')
+
+    def mark(self, profile_id: str, bucket: int, status: str, error: Optional[str] = None) -> None:
+        entry = {"profile_id": profile_id, "bucket": bucket, "status": status}
+        if error:
+            entry["error"] = error
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            if status == "done":
+                self.done.add((profile_id, bucket))
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+def run_batch(
+    jobs: Iterable[Tuple[str, float]],
+    compute: Callable[[str, float], str],
+    cache: RecommendationCache,
+    checkpoint_path: Optional[str] = None,
+    max_workers: int = 8,
+    bucket_width: float = DEFAULT_BUCKET_WIDTH
+) -> Dict:
+    """
+    Precompute recommendations for many (profile_id, score) jobs concurrently.
+
+    Jobs are deduplicated per score bucket and skipped when the checkpoint or
+    the cache already has them. Jobs whose score is outside [0, 1] or NaN are
+    counted as invalid and not run, as /process rejects them; bucketing would
+    otherwise clamp them into the 0 or 1 bucket. Each result is written to the cache. Rate
+    limits are enforced per LLM call by the clients `compute` uses, since a
+    job makes one to three calls depending on whether its patient context is
+    already loaded.
+
+    Args:
+        jobs (Iterable[Tuple[str, float]]): (profile_id, score) pairs, score between 0 and 1
+        compute (Callable[[str, float], str]): Uncached pipeline, returns rendered HTML
+        cache (RecommendationCache): Cache or store receiving the results
+        checkpoint_path (str, optional): Progress log enabling resume after a restart
+        max_workers (int): Concurrent jobs
+        bucket_width (float): Score bucket width used by the cache
+
+    Returns:
+        Dict: Counts of completed, skipped, invalid and failed jobs and the elapsed time
+    """
+    checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+    pending: List[Tuple[str, int]] = []
+    seen: Set[Tuple[str, int]] = set()
+    skipped = invalid = 0
+
+    for profile_id, score in jobs:
+        if not 0 <= score <= 1:
+            invalid += 1
+            continue
+        key = (profile_id, score_bucket(score, bucket_width))
+        if key in seen:
+            continue
+        seen.add(key)
+        if (checkpoint and key in checkpoint.done) or cache.contains(*key):
+            skipped += 1
+            continue
+        pending.append(key)
+
+    def run_job(profile_id: str, bucket: int) -> None:
+        html = compute(profile_id, bucket_score(bucket, bucket_width))
+        cache.put(profile_id, bucket, html)
+
+    start = time.perf_counter()
+    completed = failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run_job, *key): key for key in pending}
+            for future in as_completed(futures):
+                profile_id, bucket = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    if checkpoint:
+                        checkpoint.mark(profile_id, bucket, "failed", str(e))
+                    continue
+                completed += 1
+                if checkpoint:
+                    checkpoint.mark(profile_id, bucket, "done")
+                if completed % 25 == 0:
+                    elapsed = time.perf_counter() - start
+                    print(f"Precomputed {completed}/{len(pending)} ({completed / elapsed:.1f} jobs/s)")
+    finally:
+        if checkpoint:
+            checkpoint.close()
+
+    return {
+        "completed": completed,
+        "skipped": skipped,
+        "invalid": invalid,
+        "failed": failed,
+        "elapsed_seconds": round(time.perf_counter() - start, 2)
+    }
+
+
+def read_jobs(path: str) -> List[Tuple[str, float]]:
+    """
+    Read (profile_id, score) jobs from a CSV file with those two columns.
+
+    Args:
+        path (str): CSV file with a header row
+
+    Returns:
+        List[Tuple[str, float]]: Jobs in file order
+
+    Raises:
+        ValueError: If a score is not a number between 0 and 1; the message names the line
+    """
+    jobs = []
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            try:
+                score = float(row["score"])
+            except (TypeError, ValueError):
+                score = float('nan')
+            if not 0 <= score <= 1:
+                raise ValueError(f"{path}:{reader.line_num}: score must be between 0 and 1, got {row['score']!r}")
+            jobs.append((row["profile_id"], score))
+    return jobs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute recommendations for many patients.")
+    parser.add_argument("jobs", help="CSV file with profile_id and score (0-1) columns")
+    parser.add_argument("--checkpoint", default="precompute_checkpoint.jsonl")
+    parser.add_argument("--rpm", type=float, default=500, help="Requests per minute limit")
+    parser.add_argument("--tpm", type=float, default=200000, help="Tokens per minute limit")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument(
+        "--store",
+        default=os.getenv('MERIDIAN_RECOMMENDATION_STORE'),
+        help="SQLite recommendation store the server reads (default: $MERIDIAN_RECOMMENDATION_STORE)"
+    )
+    args = parser.parse_args()
+    # Without a store the results die with this process while the checkpoint
+    # marks them done, so a rerun would skip them
+    if not args.store:
+        parser.error("a recommendation store is required: pass --store or set MERIDIAN_RECOMMENDATION_STORE")
+
+    try:
+        jobs = read_jobs(args.jobs)
+    except ValueError as e:
+        parser.error(str(e))
+
+    import app_pipeline
+
+    # One limiter shared by both pipeline clients, charged per API request
+    limiter = RateLimiter(args.rpm, args.tpm)
+    app_pipeline.client.rate_limiter = limiter
+    app_pipeline.o1_client.rate_limiter = limiter
+
+    result = run_batch(
+        jobs,
+        compute=lambda profile_id, score: app_pipeline.compute_health_recommendation(score, profile_id),
+        cache=RecommendationCache(store_path=args.store),
+        checkpoint_path=args.checkpoint,
+        max_workers=args.workers,
+        bucket_width=app_pipeline.SCORE_BUCKET_WIDTH
+    )
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,151 @@
+import threading
+import time
+from typing import Callable, Optional, Tuple, TypeVar
+from metrics import CIRCUIT_REJECTIONS, CIRCUIT_STATE
+
+T = TypeVar('T')
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a dependency while its circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency until it has had time to recover.
+
+    The circuit opens after failure_threshold consecutive failures, where a
+    call slower than latency_threshold also counts as a failure. While open,
+    calls are rejected immediately. After reset_timeout one trial call is let
+    through (half-open); its success closes the circuit, its failure opens it
+    again.
+
+    Only the trial decides the half-open outcome. A call admitted before the
+    circuit last opened may finish at any time afterwards; its result is
+    ignored, so a slow success cannot close the circuit and a late failure
+    cannot cut the trial short.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        latency_threshold: Optional[float] = None
+    ):
+        """
+        Args:
+            name (str): Dependency name, used in errors and metrics
+            failure_threshold (int): Consecutive failures that open the circuit
+            reset_timeout (float): Seconds to stay open before a trial call
+            latency_threshold (float, optional): Seconds after which a successful call counts as a failure
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_threshold = latency_threshold
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        # Incremented each time the circuit opens; calls remember the value
+        # they were admitted under
+        self._generation = 0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.set(_STATE_VALUES[CLOSED], circuit=name)
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected."""
+        with self._lock:
+            if self.state == OPEN:
+                return self._remaining() > 0
+            return self.state == HALF_OPEN and self._trial_running
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until the next trial call, 0 if calls are allowed now."""
+        with self._lock:
+            return max(self._remaining(), 0.0) if self.state == OPEN else 0.0
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """
+        Run fn through the breaker.
+
+        Args:
+            fn (Callable[[], T]): Call to the dependency; raising counts as a failure
+
+        Returns:
+            T: Whatever fn returns
+
+        Raises:
+            CircuitOpenError: If the circuit is open
+        """
+        admission = self._before_call()
+        start = time.perf_counter()
+        try:
+            result = fn()
+        except Exception:
+            self._record(admission, success=False)
+            raise
+        elapsed = time.perf_counter() - start
+        self._record(admission, success=self.latency_threshold is None or elapsed <= self.latency_threshold)
+        return result
+
+    def _before_call(self) -> Tuple[int, bool]:
+        """Admit a call or raise CircuitOpenError; returns (generation, is_trial)."""
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._remaining()
+                if remaining > 0:
+                    CIRCUIT_REJECTIONS.inc(circuit=self.name)
+                    raise CircuitOpenError(self.name, remaining)
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._trial_running:
+                    CIRCUIT_REJECTIONS.inc(circuit=self.name)
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._trial_running = True
+                return self._generation, True
+            return self._generation, False
+
+    def _record(self, admission: Tuple[int, bool], success: bool) -> None:
+        generation, is_trial = admission
+        with self._lock:
+            if generation != self._generation:
+                # Admitted before the circuit last opened
+                return
+            if is_trial:
+                self._trial_running = False
+                if success:
+                    self.failures = 0
+                    self._set_state(CLOSED)
+                else:
+                    self._open()
+                return
+            if success:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self) -> None:
+        self._generation += 1
+        self._opened_at = time.monotonic()
+        self._set_state(OPEN)
+
+    def _remaining(self) -> float:
+        return self._opened_at + self.reset_timeout - time.monotonic()
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            CIRCUIT_STATE.set(_STATE_VALUES[state], circuit=self.name)
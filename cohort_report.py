@@ -0,0 +1,208 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+from health_assessment import HealthAssessment
+from medication_parser import MedicationRegimen
+from snapshot_cache import load_cached
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:
+    pyarrow = None
+
+PATIENT_DATA_DIR = os.getenv(
+    'MERIDIAN_PATIENT_DATA_DIR',
+    os.path.join(os.getenv('MERIDIAN_DATA_DIR', '/Users/nealan/Documents/prototypes/health-hackathon'), 'patients')
+)
+REQUIRED_FILES = ('health_assessment.json', 'medication.json')
+PARQUET_COLUMNS = ('profile_id', 'status', 'error', 'health_summary', 'medication_summary')
+
+
+def discover_patients(root: str) -> List[str]:
+    """
+    Find patient directories under a root, in a stable order.
+
+    Args:
+        root (str): Directory holding one subdirectory per patient
+
+    Returns:
+        List[str]: Paths of subdirectories that contain every REQUIRED_FILES entry
+    """
+    patients = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir() and all(
+                os.path.isfile(os.path.join(entry.path, name)) for name in REQUIRED_FILES
+            ):
+                patients.append(entry.path)
+    return sorted(patients)
+
+
+def summarize_patient(profile_dir: str) -> Dict:
+    """
+    Run the per-patient report for one directory.
+
+    Args:
+        profile_dir (str): Patient directory
+
+    Returns:
+        Dict: profile_id, status ('ok' or 'error') and either both summaries or the error
+    """
+    profile_id = os.path.basename(profile_dir)
+    try:
+        assessment = load_cached(HealthAssessment, os.path.join(profile_dir, 'health_assessment.json'))
+        medication = load_cached(MedicationRegimen, os.path.join(profile_dir, 'medication.json'))
+        return {
+            'profile_id': profile_id,
+            'status': 'ok',
+            'health_summary': assessment.generate_summary(),
+            'medication_summary': medication.get_daily_summary()
+        }
+    except Exception as e:
+        # One malformed patient file must not take down the rest of its chunk
+        return {
+            'profile_id': profile_id,
+            'status': 'error',
+            'error': f"{type(e).__name__}: {str(e)}"
+        }
+
+
+def _summarize_chunk(profile_dirs: List[str]) -> List[Dict]:
+    return [summarize_patient(profile_dir) for profile_dir in profile_dirs]
+
+
+def iter_reports(
+    profile_dirs: List[str],
+    workers: Optional[int] = None,
+    chunk_size: int = 64
+) -> Iterator[Dict]:
+    """
+    Summarize patients across a process pool, yielding results in input order.
+
+    Patients are sent to workers in chunks so process overhead is paid per
+    chunk rather than per patient.
+
+    Args:
+        profile_dirs (List[str]): Patient directories
+        workers (int, optional): Worker processes, defaults to the CPU count
+        chunk_size (int): Patients per task
+
+    Yields:
+        Dict: One summarize_patient result per directory
+    """
+    chunks = [profile_dirs[i:i + chunk_size] for i in range(0, len(profile_dirs), chunk_size)]
+    if workers == 1:
+        for chunk in chunks:
+            yield from _summarize_chunk(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for results in pool.map(_summarize_chunk, chunks):
+            yield from results
+
+
+class JsonlWriter:
+    def __init__(self, path: str):
+        self._file = open(path, 'w')
+
+    def write(self, record: Dict) -> None:
+        self._file.write(json.dumps(record) + '\n')
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetWriter:
+    """Writes records as Parquet row groups; nested summaries are stored as JSON text."""
+
+    def __init__(self, path: str, row_group_size: int = 10000):
+        if pyarrow is None:
+            raise RuntimeError("Parquet output requires pyarrow")
+        schema = pyarrow.schema([(name, pyarrow.string()) for name in PARQUET_COLUMNS])
+        self._writer = pq.ParquetWriter(path, schema)
+        self._schema = schema
+        self._rows: List[Dict] = []
+        self.row_group_size = row_group_size
+
+    def write(self, record: Dict) -> None:
+        self._rows.append({
+            name: json.dumps(record[name]) if isinstance(record.get(name), dict) else record.get(name)
+            for name in PARQUET_COLUMNS
+        })
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+    def _flush(self) -> None:
+        if self._rows:
+            self._writer.write_table(pyarrow.Table.from_pylist(self._rows, schema=self._schema))
+            self._rows = []
+
+
+def generate_report(
+    root: str,
+    output: str,
+    output_format: str = 'jsonl',
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    progress_interval: float = 5.0
+) -> Dict:
+    """
+    Write a cohort report for every patient under a root directory.
+
+    Args:
+        root (str): Directory holding one subdirectory per patient
+        output (str): Output file path
+        output_format (str): 'jsonl' or 'parquet'
+        workers (int, optional): Worker processes, defaults to the CPU count
+        chunk_size (int): Patients per task
+        progress_interval (float): Seconds between progress lines
+
+    Returns:
+        Dict: Patient, error and throughput totals
+    """
+    profile_dirs = discover_patients(root)
+    writer = ParquetWriter(output) if output_format == 'parquet' else JsonlWriter(output)
+
+    total = len(profile_dirs)
+    done = errors = 0
+    start = last_report = time.perf_counter()
+    try:
+        for record in iter_reports(profile_dirs, workers, chunk_size):
+            writer.write(record)
+            done += 1
+            errors += record['status'] == 'error'
+            now = time.perf_counter()
+            if now - last_report >= progress_interval:
+                print(f"{done}/{total} patients, {errors} errors, {done / (now - start):.0f} patients/s")
+                last_report = now
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {
+        'patients': done,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'patients_per_second': round(done / elapsed, 1) if elapsed else None
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate health and medication summaries for a cohort')
+    parser.add_argument('root', nargs='?', default=PATIENT_DATA_DIR, help='Directory of patient directories')
+    parser.add_argument('--output', default='cohort_report.jsonl', help='Output file')
+    parser.add_argument('--format', choices=('jsonl', 'parquet'), default='jsonl', help='Output format')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=64, help='Patients per task')
+    args = parser.parse_args()
+
+    result = generate_report(args.root, args.output, args.format, args.workers, args.chunk_size)
+    print(f"Wrote {result['patients']} patients ({result['errors']} errors) to {args.output} "
+          f"in {result['seconds']}s, {result['patients_per_second']} patients/s")
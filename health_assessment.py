@@ -1,9 +1,10 @@
 import json
+import sys
 from dataclasses import dataclass
-from typing import List, Dict, Optional
-from datetime import datetime
+from typing import Dict, Tuple
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class PersonalInfo:
     age: int
     gender: str
@@ -14,7 +15,16 @@ class PersonalInfo:
     def bmi(self) -> float:
         return self.weight / ((self.height / 100) ** 2)
 
-@dataclass
+    @classmethod
+    def from_dict(cls, d: Dict) -> "PersonalInfo":
+        return cls(
+            age=d['age'],
+            gender=sys.intern(d['gender']),
+            height=d['height'],
+            weight=d['weight']
+        )
+
+@dataclass(frozen=True, slots=True)
 class DexaData:
     total_body_fat: float
     lean_mass: float
@@ -28,7 +38,24 @@ class DexaData:
     arm_fat: float
     arm_lean_mass: float
 
-@dataclass
+    @classmethod
+    def from_dict(cls, d: Dict) -> "DexaData":
+        r = d['regionаlData']
+        return cls(
+            total_body_fat=d['totalBodyFatPercentage'],
+            lean_mass=d['leanMass'],
+            fat_mass=d['fatMass'],
+            bone_density=d['boneMineralDensity'],
+            visceral_fat=d['visceralFat'],
+            trunk_fat=r['trunk']['fatPercentage'],
+            trunk_lean_mass=r['trunk']['leanMass'],
+            leg_fat=r['legs']['fatPercentage'],
+            leg_lean_mass=r['legs']['leanMass'],
+            arm_fat=r['arms']['fatPercentage'],
+            arm_lean_mass=r['arms']['leanMass']
+        )
+
+@dataclass(frozen=True, slots=True)
 class Vo2MaxData:
     max_vo2: float
     anaerobic_threshold: float
@@ -39,7 +66,20 @@ class Vo2MaxData:
     max_speed: float
     time_to_exhaustion: float
 
-@dataclass
+    @classmethod
+    def from_dict(cls, d: Dict) -> "Vo2MaxData":
+        return cls(
+            max_vo2=d['maxVO2'],
+            anaerobic_threshold=d['anaerobicThreshold'],
+            max_heart_rate=d['maxHeartRate'],
+            recovery_rate=d['recoveryRate'],
+            vt1=d['ventillatoryThreshold']['vt1'],
+            vt2=d['ventillatoryThreshold']['vt2'],
+            max_speed=d['maxSpeed'],
+            time_to_exhaustion=d['timeToExhaustion']
+        )
+
+@dataclass(frozen=True, slots=True)
 class DietData:
     calories: int
     protein: float
@@ -48,24 +88,57 @@ class DietData:
     fiber: float
     water_intake: float
     caffeine_intake: float
-    recommendations: List[str]
+    recommendations: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "DietData":
+        i = d['averageDailyIntake']
+        return cls(
+            calories=i['calories'],
+            protein=i['protein'],
+            carbs=i['carbohydrates'],
+            fat=i['fat'],
+            fiber=i['fiber'],
+            water_intake=d['hydration']['waterIntake'],
+            caffeine_intake=d['hydration']['caffeineIntake'],
+            recommendations=_interned(d['recommendedChanges'])
+        )
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class PhysioData:
     fms_total: int
     foot_strike: str
     cadence: int
-    vulnerabilities: List[str]
-    recommendations: List[str]
+    vulnerabilities: Tuple[str, ...]
+    recommendations: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "PhysioData":
+        return cls(
+            fms_total=d['functionalMovementScreen']['total'],
+            foot_strike=sys.intern(d['runningGait']['footStrike']),
+            cadence=d['runningGait']['cadence'],
+            vulnerabilities=_interned(d['vulnerabilities']),
+            recommendations=_interned(d['recommendations'])
+        )
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StrengthData:
     squat_1rm: float
     deadlift_1rm: float
     bench_1rm: float
     max_pullups: int
 
-@dataclass
+    @classmethod
+    def from_dict(cls, d: Dict) -> "StrengthData":
+        return cls(
+            squat_1rm=d['squat']['oneRepMax'],
+            deadlift_1rm=d['deadlift']['oneRepMax'],
+            bench_1rm=d['benchPress']['oneRepMax'],
+            max_pullups=d['pullUps']['maxReps']
+        )
+
+@dataclass(frozen=True, slots=True)
 class BloodworkData:
     total_cholesterol: float
     hdl: float
@@ -78,94 +151,9 @@ class BloodworkData:
     b12: float
     ferritin: float
 
-class HealthAssessment:
-    def __init__(self, data_file: str):
-        with open(data_file, 'r') as f:
-            self.raw_data = json.load(f)
-        
-        self.personal = self._parse_personal()
-        self.dexa = self._parse_dexa()
-        self.vo2 = self._parse_vo2()
-        self.diet = self._parse_diet()
-        self.physio = self._parse_physio()
-        self.strength = self._parse_strength()
-        self.blood = self._parse_blood()
-        
-    def _parse_personal(self) -> PersonalInfo:
-        d = self.raw_data['personalInfo']
-        return PersonalInfo(
-            age=d['age'],
-            gender=d['gender'],
-            height=d['height'],
-            weight=d['weight']
-        )
-    
-    def _parse_dexa(self) -> DexaData:
-        d = self.raw_data['dexaScan']
-        r = d['regionаlData']
-        return DexaData(
-            total_body_fat=d['totalBodyFatPercentage'],
-            lean_mass=d['leanMass'],
-            fat_mass=d['fatMass'],
-            bone_density=d['boneMineralDensity'],
-            visceral_fat=d['visceralFat'],
-            trunk_fat=r['trunk']['fatPercentage'],
-            trunk_lean_mass=r['trunk']['leanMass'],
-            leg_fat=r['legs']['fatPercentage'],
-            leg_lean_mass=r['legs']['leanMass'],
-            arm_fat=r['arms']['fatPercentage'],
-            arm_lean_mass=r['arms']['leanMass']
-        )
-    
-    def _parse_vo2(self) -> Vo2MaxData:
-        d = self.raw_data['vo2MaxTest']
-        return Vo2MaxData(
-            max_vo2=d['maxVO2'],
-            anaerobic_threshold=d['anaerobicThreshold'],
-            max_heart_rate=d['maxHeartRate'],
-            recovery_rate=d['recoveryRate'],
-            vt1=d['ventillatoryThreshold']['vt1'],
-            vt2=d['ventillatoryThreshold']['vt2'],
-            max_speed=d['maxSpeed'],
-            time_to_exhaustion=d['timeToExhaustion']
-        )
-    
-    def _parse_diet(self) -> DietData:
-        d = self.raw_data['dietAssessment']
-        i = d['averageDailyIntake']
-        return DietData(
-            calories=i['calories'],
-            protein=i['protein'],
-            carbs=i['carbohydrates'],
-            fat=i['fat'],
-            fiber=i['fiber'],
-            water_intake=d['hydration']['waterIntake'],
-            caffeine_intake=d['hydration']['caffeineIntake'],
-            recommendations=d['recommendedChanges']
-        )
-    
-    def _parse_physio(self) -> PhysioData:
-        d = self.raw_data['physioAssessment']
-        return PhysioData(
-            fms_total=d['functionalMovementScreen']['total'],
-            foot_strike=d['runningGait']['footStrike'],
-            cadence=d['runningGait']['cadence'],
-            vulnerabilities=d['vulnerabilities'],
-            recommendations=d['recommendations']
-        )
-    
-    def _parse_strength(self) -> StrengthData:
-        d = self.raw_data['strengthAssessment']
-        return StrengthData(
-            squat_1rm=d['squat']['oneRepMax'],
-            deadlift_1rm=d['deadlift']['oneRepMax'],
-            bench_1rm=d['benchPress']['oneRepMax'],
-            max_pullups=d['pullUps']['maxReps']
-        )
-    
-    def _parse_blood(self) -> BloodworkData:
-        d = self.raw_data['bloodPanel']
-        return BloodworkData(
+    @classmethod
+    def from_dict(cls, d: Dict) -> "BloodworkData":
+        return cls(
             total_cholesterol=d['lipids']['totalCholesterol'],
             hdl=d['lipids']['hdl'],
             ldl=d['lipids']['ldl'],
@@ -178,6 +166,36 @@ class HealthAssessment:
             ferritin=d['vitaminsAndMinerals']['ferritin']
         )
 
+
+def _interned(values) -> Tuple[str, ...]:
+    """Tuple of interned strings; recommendation texts repeat across patients."""
+    return tuple(sys.intern(value) for value in values)
+
+
+class HealthAssessment:
+    # Only the typed sections are kept; the parsed JSON is dropped after loading
+    __slots__ = ('personal', 'dexa', 'vo2', 'diet', 'physio', 'strength', 'blood')
+
+    def __init__(self, data_file: str):
+        with open(data_file, 'r') as f:
+            self._load(json.load(f))
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "HealthAssessment":
+        """Build an assessment from already-parsed assessment JSON."""
+        assessment = cls.__new__(cls)
+        assessment._load(data)
+        return assessment
+
+    def _load(self, data: Dict) -> None:
+        self.personal = PersonalInfo.from_dict(data['personalInfo'])
+        self.dexa = DexaData.from_dict(data['dexaScan'])
+        self.vo2 = Vo2MaxData.from_dict(data['vo2MaxTest'])
+        self.diet = DietData.from_dict(data['dietAssessment'])
+        self.physio = PhysioData.from_dict(data['physioAssessment'])
+        self.strength = StrengthData.from_dict(data['strengthAssessment'])
+        self.blood = BloodworkData.from_dict(data['bloodPanel'])
+
     def generate_summary(self) -> Dict[str, str]:
         """Generate a high-level summary of key health metrics"""
         return {
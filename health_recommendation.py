@@ -1,6 +1,12 @@
 import json
+import sys
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Sequence, Tuple
+import numpy as np
+from score_stats import StreamingScoreStats
+
+# Define thresholds for significant changes
+SIGNIFICANT_CHANGE = 0.05
 
 def calculate_workload_capacity(current_score: float) -> Dict:
     """
@@ -51,62 +57,72 @@ def analyze_wellbeing_trend(data: List[Dict]) -> Tuple[float, str, str]:
     Returns:
     Tuple containing (current_score, trend_description, recommended_tone)
     """
-    # Filter for wellbeing entries and sort by date
-    wellbeing_entries = [
-        entry for entry in data 
-        if entry['type'] == 'wellbeing'
-    ]
-    wellbeing_entries.sort(key=lambda x: x['scoreDateTime'])
+    return analyze_wellbeing_trend_from_stats(StreamingScoreStats.from_entries(data, 'wellbeing'))
+
+def analyze_wellbeing_trend_from_stats(stats: StreamingScoreStats) -> Tuple[float, str, str]:
+    """
+    Analyze wellbeing statistics and recommend a tone of voice.
     
-    # Extract scores
-    scores = [entry['score'] for entry in wellbeing_entries]
+    Compares the latest score against the mean of the scores before it,
+    in O(1) regardless of history length.
     
-    if not scores:
+    Args:
+        stats: Running statistics over the wellbeing history
+    
+    Returns:
+    Tuple containing (current_score, trend_description, recommended_tone)
+    """
+    if not stats.count:
         return (0, "No data available", "neutral")
     
-    current_score = scores[-1]
+    current_score = stats.last
     
     # Calculate trend
-    if len(scores) > 1:
-        avg_previous = sum(scores[:-1]) / len(scores[:-1])
-        score_change = current_score - avg_previous
-        
-        # Define thresholds for significant changes
-        SIGNIFICANT_CHANGE = 0.05
-        
-        if score_change > SIGNIFICANT_CHANGE:
-            trend = "improving"
-        elif score_change < -SIGNIFICANT_CHANGE:
-            trend = "declining"
-        else:
-            trend = "stable"
+    if stats.count > 1:
+        trend = _classify_trend(current_score - stats.mean_before_last)
     else:
         trend = "insufficient data"
     
-    # Determine tone based on current score and trend
+    tone = _classify_tone(current_score, trend)
+            
+    trend_description = f"Score is {trend} with current wellbeing at {current_score:.2f}"
+    
+    return (current_score, trend_description, tone)
+
+def _classify_trend(score_change: float) -> str:
+    """
+    Classify a change against the historical average as a trend
+    """
+    if score_change > SIGNIFICANT_CHANGE:
+        return "improving"
+    elif score_change < -SIGNIFICANT_CHANGE:
+        return "declining"
+    else:
+        return "stable"
+
+def _classify_tone(current_score: float, trend: str) -> str:
+    """
+    Determine tone based on current score and trend
+    """
     if current_score >= 0.8:
         if trend == "improving":
-            tone = "enthusiastic and encouraging"
+            return "enthusiastic and encouraging"
         else:
-            tone = "positive and supportive"
+            return "positive and supportive"
     elif 0.6 <= current_score < 0.8:
         if trend == "improving":
-            tone = "optimistic and motivating"
+            return "optimistic and motivating"
         elif trend == "declining":
-            tone = "gentle and guiding"
+            return "gentle and guiding"
         else:
-            tone = "balanced and constructive"
+            return "balanced and constructive"
     else:
         if trend == "improving":
-            tone = "encouraging and supportive"
+            return "encouraging and supportive"
         elif trend == "declining":
-            tone = "empathetic and caring"
+            return "empathetic and caring"
         else:
-            tone = "understanding and helpful"
-            
-    trend_description = f"Score is {trend} with current wellbeing at {current_score:.2f}"
-    
-    return (current_score, trend_description, tone)
+            return "understanding and helpful"
 
 def _get_workload_recommendations(score: float) -> List[str]:
     """
@@ -161,53 +177,32 @@ def main(json_data: List[Dict], current_score: float) -> Dict:
     if not 0 <= current_score <= 1:
         raise ValueError("Current score must be between 0 and 1")
     
-    # Filter and sort historical wellbeing entries
-    wellbeing_entries = [
-        entry for entry in json_data 
-        if entry['type'] == 'wellbeing'
-    ]
-    wellbeing_entries.sort(key=lambda x: x['scoreDateTime'])
+    return main_from_stats(StreamingScoreStats.from_entries(json_data, 'wellbeing'), current_score)
+
+def main_from_stats(stats: StreamingScoreStats, current_score: float) -> Dict:
+    """
+    Same as main, but reads the history from running statistics so the cost
+    per call does not depend on history length.
+    
+    Args:
+        stats: Running statistics over the historical wellbeing scores
+        current_score: Float between 0 and 1 representing current wellbeing score
+        
+    Returns:
+        Dictionary containing analysis and recommendations
+    """
+    # Validate score is between 0 and 1
+    if not 0 <= current_score <= 1:
+        raise ValueError("Current score must be between 0 and 1")
     
-    # Extract historical scores
-    historical_scores = [entry['score'] for entry in wellbeing_entries]
+    avg_previous = stats.mean
     
-    if not historical_scores:
+    if avg_previous is None:
         trend = "insufficient historical data"
-        avg_previous = None
     else:
-        avg_previous = sum(historical_scores) / len(historical_scores)
-        score_change = current_score - avg_previous
-        
-        # Define thresholds for significant changes
-        SIGNIFICANT_CHANGE = 0.05
-        
-        if score_change > SIGNIFICANT_CHANGE:
-            trend = "improving"
-        elif score_change < -SIGNIFICANT_CHANGE:
-            trend = "declining"
-        else:
-            trend = "stable"
+        trend = _classify_trend(current_score - avg_previous)
     
-    # Determine tone based on current score and trend
-    if current_score >= 0.8:
-        if trend == "improving":
-            tone = "enthusiastic and encouraging"
-        else:
-            tone = "positive and supportive"
-    elif 0.6 <= current_score < 0.8:
-        if trend == "improving":
-            tone = "optimistic and motivating"
-        elif trend == "declining":
-            tone = "gentle and guiding"
-        else:
-            tone = "balanced and constructive"
-    else:
-        if trend == "improving":
-            tone = "encouraging and supportive"
-        elif trend == "declining":
-            tone = "empathetic and caring"
-        else:
-            tone = "understanding and helpful"
+    tone = _classify_tone(current_score, trend)
     
     # Create trend description
     if avg_previous is not None:
@@ -244,4 +239,138 @@ def _get_approach_suggestions(score: float) -> str:
     elif 0.6 <= score < 0.8:
         return "Balance encouragement with practical guidance for improvement"
     else:
-        return "Emphasize support and gentle encouragement while offering concrete help"
\ No newline at end of file
+        return "Emphasize support and gentle encouragement while offering concrete help"
+
+
+# Batch API for cohort dashboards. Scores are bucketed with searchsorted and
+# mapped to small integer codes; the strings live once in the lookup tables
+# below, which are derived from the scalar functions so the two cannot drift.
+
+# Lower edges of the risk tiers; tier 0 is below 0.4, tier 3 is 0.8 and above
+RISK_TIER_EDGES = np.array([0.4, 0.6, 0.8])
+_RISK_TIER_SAMPLES = (0.2, 0.5, 0.7, 0.9)
+_TIER_CAPACITY = [calculate_workload_capacity(score) for score in _RISK_TIER_SAMPLES]
+
+RISK_LEVELS = tuple(sys.intern(c["risk_level"]) for c in _TIER_CAPACITY)
+CONFIDENCE_LEVELS = tuple(sys.intern(c["confidence"]) for c in _TIER_CAPACITY)
+WORKLOAD_RECOMMENDATIONS = tuple(
+    tuple(sys.intern(r) for r in c["recommendations"]) for c in _TIER_CAPACITY
+)
+# Cap on positive workload adjustments per risk tier, as in calculate_workload_capacity
+_MAX_INCREASE = np.array([0.0, 5.0, 10.0, 15.0])
+
+TRENDS = ("stable", "improving", "declining", "insufficient data")
+TREND_STABLE, TREND_IMPROVING, TREND_DECLINING, TREND_INSUFFICIENT = range(len(TRENDS))
+
+# Lower edges of the tone tiers used by _classify_tone
+TONE_TIER_EDGES = np.array([0.6, 0.8])
+_TONE_TIER_SAMPLES = (0.5, 0.7, 0.9)
+_tone_table = [[_classify_tone(score, trend) for trend in TRENDS] for score in _TONE_TIER_SAMPLES]
+TONES = tuple(sys.intern(t) for t in dict.fromkeys(t for row in _tone_table for t in row))
+TONE_CODES = np.array([[TONES.index(t) for t in row] for row in _tone_table], dtype=np.int8)
+
+
+def risk_tier_codes(scores: Sequence[float]) -> np.ndarray:
+    """
+    Risk tier per score, indexing RISK_LEVELS, CONFIDENCE_LEVELS and WORKLOAD_RECOMMENDATIONS.
+    
+    Args:
+        scores: Wellbeing scores between 0 and 1
+    
+    Returns:
+        int8 array of tier codes; NaN scores fall in the highest-risk tier like the scalar version
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    tiers = np.searchsorted(RISK_TIER_EDGES, scores, side="right").astype(np.int8)
+    tiers[np.isnan(scores)] = 0
+    return tiers
+
+def calculate_workload_capacity_batch(scores: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized calculate_workload_capacity.
+    
+    Args:
+        scores: Wellbeing scores between 0 and 1
+    
+    Returns:
+        Dictionary with 'workload_adjustment' (float64) and 'risk_tier' (int8) arrays;
+        use resolve_labels to turn tiers into risk levels, confidence or recommendations
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    tiers = risk_tier_codes(scores)
+    base_adjustment = -50 + scores * 65
+    final_adjustment = np.where(
+        base_adjustment > 0,
+        np.minimum(base_adjustment, _MAX_INCREASE[tiers]),
+        base_adjustment
+    )
+    return {
+        "workload_adjustment": _round_like_python(final_adjustment, 1),
+        "risk_tier": tiers
+    }
+
+def _round_like_python(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    np.round, except values within float error of a rounding tie are passed
+    through Python's correctly rounded round() so results match the scalar API.
+    """
+    scale = 10.0 ** digits
+    scaled = values * scale
+    rounded = np.round(scaled) / scale
+    near_tie = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie):
+        rounded[i] = round(float(values[i]), digits)
+    return rounded
+
+def classify_trend_batch(scores: Sequence[float], historical_averages: Sequence[float]) -> np.ndarray:
+    """
+    Vectorized trend classification, indexing TRENDS.
+    
+    Args:
+        scores: Current wellbeing scores
+        historical_averages: Historical average per score; NaN where there is no history
+    
+    Returns:
+        int8 array of trend codes
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    averages = np.asarray(historical_averages, dtype=np.float64)
+    change = scores - averages
+    return np.select(
+        [np.isnan(averages), change > SIGNIFICANT_CHANGE, change < -SIGNIFICANT_CHANGE],
+        [TREND_INSUFFICIENT, TREND_IMPROVING, TREND_DECLINING],
+        default=TREND_STABLE
+    ).astype(np.int8)
+
+def classify_tone_batch(scores: Sequence[float], trends: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Vectorized tone classification, indexing TONES.
+    
+    Args:
+        scores: Current wellbeing scores
+        trends: Trend codes from classify_trend_batch; treated as insufficient data when omitted
+    
+    Returns:
+        int8 array of tone codes
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    tiers = np.searchsorted(TONE_TIER_EDGES, scores, side="right")
+    tiers[np.isnan(scores)] = 0
+    if trends is None:
+        trends = np.full(scores.shape, TREND_INSUFFICIENT, dtype=np.int8)
+    return TONE_CODES[tiers, np.asarray(trends)]
+
+def resolve_labels(codes: np.ndarray, table: Sequence) -> np.ndarray:
+    """
+    Map codes to their labels without creating new strings.
+    
+    Args:
+        codes: Code array from one of the batch functions
+        table: Matching lookup table, e.g. RISK_LEVELS or TONES
+    
+    Returns:
+        Object array referencing the interned labels in `table`
+    """
+    lookup = np.empty(len(table), dtype=object)
+    lookup[:] = list(table)
+    return lookup[codes]
@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, Optional, Tuple
+
+LatencyKey = Tuple[str, str]  # (call type, model)
+
+
+class LatencyTracker:
+    """
+    Recent OpenAI call latencies per call type and model.
+
+    Only samples from the last max_age seconds count, so a model that was
+    slow during an incident is retried once its bad samples age out.
+    """
+
+    def __init__(self, max_samples: int = 200, max_age: float = 300.0, min_samples: int = 5):
+        """
+        Args:
+            max_samples (int): Samples kept per key
+            max_age (float): Seconds a sample stays relevant
+            min_samples (int): Samples needed before a percentile is reported
+        """
+        self.max_samples = max_samples
+        self.max_age = max_age
+        self.min_samples = min_samples
+        self._samples: Dict[LatencyKey, Deque[Tuple[float, float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, call_type: str, model: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get((call_type, model))
+            if samples is None:
+                samples = self._samples[(call_type, model)] = deque(maxlen=self.max_samples)
+            samples.append((time.monotonic(), seconds))
+
+    def percentile(self, call_type: str, model: str, q: float) -> Optional[float]:
+        """
+        Latency percentile over recent samples.
+
+        Args:
+            call_type (str): Call type, e.g. 'refine'
+            model (str): Model name
+            q (float): Percentile between 0 and 1
+
+        Returns:
+            float or None: Latency in seconds, or None with too few recent samples
+        """
+        cutoff = time.monotonic() - self.max_age
+        with self._lock:
+            samples = self._samples.get((call_type, model))
+            if not samples:
+                return None
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            values = sorted(seconds for _, seconds in samples)
+        if len(values) < self.min_samples:
+            return None
+        return values[min(int(q * len(values)), len(values) - 1)]
+
+
+@dataclass
+class HedgePolicy:
+    """
+    When to send a second, backup request for a slow call.
+
+    The hedge fires once the call has run longer than the given percentile of
+    its recent latencies, and never earlier than min_delay. Until enough
+    latencies are known, calls are not hedged.
+    """
+    percentile: float = 0.95
+    min_delay: float = 1.0
+    hedge_model: Optional[str] = None
+
+
+@dataclass
+class LatencyRoute:
+    """
+    Latency budget for one call type.
+
+    When the preferred model's recent latency at the given percentile exceeds
+    the budget, calls go to fallback_model instead, unless that model has
+    been observed to be even slower.
+    """
+    budget: float
+    fallback_model: str
+    percentile: float = 0.9
+
+
+def choose_model(tracker: LatencyTracker, route: Optional[LatencyRoute], call_type: str, model: str) -> str:
+    """
+    Pick the model for a call under its latency budget.
+
+    Args:
+        tracker (LatencyTracker): Observed latencies
+        route (LatencyRoute, optional): Budget for this call type, or None
+        call_type (str): Call type
+        model (str): Preferred model
+
+    Returns:
+        str: Model to send the call to
+    """
+    if route is None or route.fallback_model == model:
+        return model
+    preferred = tracker.percentile(call_type, model, route.percentile)
+    if preferred is None or preferred <= route.budget:
+        return model
+    fallback = tracker.percentile(call_type, route.fallback_model, route.percentile)
+    if fallback is not None and fallback >= preferred:
+        return model
+    return route.fallback_model
@@ -0,0 +1,175 @@
+import json
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+from jinja2 import Environment
+
+# JSON schema the model's output is constrained to. Strict structured outputs
+# require every property to be listed as required and no extra properties.
+MEAL_PLAN_SCHEMA: Dict = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "meals": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "time": {"type": "string"},
+                    "items": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "description": {"type": "string"},
+                                "changed": {"type": "boolean"}
+                            },
+                            "required": ["description", "changed"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["name", "time", "items"],
+                "additionalProperties": False
+            }
+        },
+        "medications": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "timing": {"type": "string"},
+                    "note": {"type": "string"}
+                },
+                "required": ["name", "timing", "note"],
+                "additionalProperties": False
+            }
+        },
+        "recommendations": {"type": "array", "items": {"type": "string"}},
+        "reasoning": {"type": "string"}
+    },
+    "required": ["title", "meals", "medications", "recommendations", "reasoning"],
+    "additionalProperties": False
+}
+
+# response_format argument for chat.completions.create
+RESPONSE_FORMAT: Dict = {
+    "type": "json_schema",
+    "json_schema": {"name": "meal_plan", "strict": True, "schema": MEAL_PLAN_SCHEMA}
+}
+
+
+@dataclass
+class MealItem:
+    description: str
+    changed: bool = False
+
+
+@dataclass
+class Meal:
+    name: str
+    time: str
+    items: List[MealItem] = field(default_factory=list)
+
+
+@dataclass
+class MedicationNote:
+    name: str
+    timing: str
+    note: str
+
+
+@dataclass
+class MealPlan:
+    title: str
+    meals: List[Meal]
+    medications: List[MedicationNote]
+    recommendations: List[str]
+    reasoning: str
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MealPlan":
+        return cls(
+            title=data["title"],
+            meals=[
+                Meal(
+                    name=meal["name"],
+                    time=meal["time"],
+                    items=[MealItem(item["description"], item["changed"]) for item in meal["items"]]
+                )
+                for meal in data["meals"]
+            ],
+            medications=[
+                MedicationNote(med["name"], med["timing"], med["note"])
+                for med in data["medications"]
+            ],
+            recommendations=list(data["recommendations"]),
+            reasoning=data["reasoning"]
+        )
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def parse_meal_plan(text: str) -> MealPlan:
+    """
+    Parse a schema-constrained model response into a MealPlan.
+
+    Args:
+        text (str): JSON returned by the model
+
+    Returns:
+        MealPlan: Typed meal plan
+
+    Raises:
+        ValueError: If the text is not JSON or does not match the schema
+    """
+    try:
+        return MealPlan.from_dict(json.loads(text))
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid meal plan response: {str(e)}")
+
+
+# Compiled once at import; rendering is a single pass over the model. Class
+# names match the dashboard styles used by app.format_meal_plan_html.
+_environment = Environment(autoescape=True, trim_blocks=True, lstrip_blocks=True)
+_TEMPLATE = _environment.from_string("""
+<div class="updated-plan">
+{% if plan.title %}
+<h2 class="plan-title">{{ plan.title }}</h2>
+{% endif %}
+{% for meal in plan.meals %}
+<div class="meal-section">
+<h3 class="meal-title">{{ meal.name }}{% if meal.time %} ({{ meal.time }}){% endif %}</h3>
+<ul class="meal-items">
+{% for item in meal.items %}
+<li{% if item.changed %} class="recommendation"{% endif %}>{{ item.description }}</li>
+{% endfor %}
+</ul>
+</div>
+{% endfor %}
+{% if plan.medications %}
+<div class="supplements-section">
+{% for med in plan.medications %}
+<div class="supplement-item"><strong>{{ med.name }}</strong>{% if med.timing %} ({{ med.timing }}){% endif %}{% if med.note %}: {{ med.note }}{% endif %}</div>
+{% endfor %}
+</div>
+{% endif %}
+{% if plan.recommendations %}
+<ul class="recommendations">
+{% for recommendation in plan.recommendations %}
+<li class="recommendation">{{ recommendation }}</li>
+{% endfor %}
+</ul>
+{% endif %}
+{% if plan.reasoning %}
+<p class="reasoning">{{ plan.reasoning }}</p>
+{% endif %}
+</div>
+""".strip())
+
+
+def render_meal_plan_html(plan: MealPlan) -> str:
+    """Render a meal plan as dashboard HTML, escaping all model text."""
+    return _TEMPLATE.render(plan=plan)
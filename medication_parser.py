@@ -1,10 +1,17 @@
 import json 
+import sys
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from typing import ClassVar, List, Dict, Optional, Tuple
 from datetime import datetime, time
 
-@dataclass
+# Records are frozen and slotted: a regimen is parsed once and then only read,
+# and per-patient caches hold many of them. Names, units, frequencies and
+# timings repeat across patients, so they are interned and shared.
+
+@dataclass(frozen=True, slots=True)
 class PrescriptionMed:
+    kind: ClassVar[str] = "prescription"
+
     name: str
     brand_name: str
     dosage: str
@@ -17,8 +24,26 @@ class PrescriptionMed:
     start_date: datetime
     review_date: datetime
 
-@dataclass
+    @classmethod
+    def from_dict(cls, med: Dict) -> "PrescriptionMed":
+        return cls(
+            name=sys.intern(med["name"]),
+            brand_name=sys.intern(med["brandName"]),
+            dosage=sys.intern(med["dosage"]),
+            unit=sys.intern(med["unit"]),
+            frequency=sys.intern(med["frequency"]),
+            timing=sys.intern(med["timing"]),
+            purpose=med["purpose"],
+            instructions=med["instructions"],
+            prescribed_by=sys.intern(med["prescribedBy"]),
+            start_date=datetime.strptime(med["startDate"], "%Y-%m-%d"),
+            review_date=datetime.strptime(med["reviewDate"], "%Y-%m-%d")
+        )
+
+@dataclass(frozen=True, slots=True)
 class Supplement:
+    kind: ClassVar[str] = "supplement"
+
     name: str
     dosage: str
     unit: str
@@ -27,8 +52,22 @@ class Supplement:
     purpose: str
     instructions: str
 
-@dataclass
+    @classmethod
+    def from_dict(cls, supp: Dict) -> "Supplement":
+        return cls(
+            name=sys.intern(supp["name"]),
+            dosage=sys.intern(supp["dosage"]),
+            unit=sys.intern(supp["unit"]),
+            frequency=sys.intern(supp["frequency"]),
+            timing=sys.intern(supp["timing"]),
+            purpose=supp["purpose"],
+            instructions=supp["instructions"]
+        )
+
+@dataclass(frozen=True, slots=True)
 class AsNeededMed:
+    kind: ClassVar[str] = "as_needed"
+
     name: str
     brand_name: str
     dosage: str
@@ -38,123 +77,84 @@ class AsNeededMed:
     instructions: str
     contraindications: Optional[str]
 
-@dataclass
+    @classmethod
+    def from_dict(cls, med: Dict) -> "AsNeededMed":
+        return cls(
+            name=sys.intern(med["name"]),
+            brand_name=sys.intern(med["brandName"]),
+            dosage=sys.intern(med["dosage"]),
+            unit=sys.intern(med["unit"]),
+            max_frequency=sys.intern(med["maxFrequency"]),
+            purpose=med["purpose"],
+            instructions=med["instructions"],
+            contraindications=med.get("contraindications")
+        )
+
+@dataclass(frozen=True, slots=True)
 class ScheduleTime:
     time: time
-    medications: List[str]
+    medications: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, details: Dict) -> "ScheduleTime":
+        return cls(
+            time=datetime.strptime(details["time"], "%H:%M").time(),
+            medications=tuple(sys.intern(name) for name in details["medications"])
+        )
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Monitoring:
-    required_tests: List[Dict[str, str]]
-    side_effects_to_watch: List[str]
+    required_tests: Tuple[Dict[str, str], ...]
+    side_effects_to_watch: Tuple[str, ...]
+
+    @classmethod
+    def from_dict(cls, mon: Dict) -> "Monitoring":
+        return cls(
+            required_tests=tuple(mon["requiredTests"]),
+            side_effects_to_watch=tuple(sys.intern(effect) for effect in mon["sideEffectsToWatch"])
+        )
+
+Medication = PrescriptionMed | Supplement | AsNeededMed
 
 class MedicationRegimen:
+    # Only the typed sections are kept; the parsed JSON is dropped after loading
+    __slots__ = ('prescription_meds', 'supplements', 'as_needed', 'schedule', 'monitoring', 'med_lookup')
+
     def __init__(self, json_file_path: str):
         """Initialize with path to JSON file"""
         with open(json_file_path, 'r') as f:
-            self.raw_data = json.load(f)["medications"]
-
-        # Parse each section
-        self.prescription_meds = self._parse_prescription_meds()
-        self.supplements = self._parse_supplements()
-        self.as_needed = self._parse_as_needed()
-        self.schedule = self._parse_schedule()
-        self.monitoring = self._parse_monitoring()
-        
-        # Create lookup for easy access
-        self._create_med_lookup()
-
-    def _parse_prescription_meds(self) -> List[PrescriptionMed]:
-        meds = []
-        for med in self.raw_data["prescriptionMeds"]:
-            meds.append(PrescriptionMed(
-                name=med["name"],
-                brand_name=med["brandName"],
-                dosage=med["dosage"],
-                unit=med["unit"],
-                frequency=med["frequency"],
-                timing=med["timing"],
-                purpose=med["purpose"],
-                instructions=med["instructions"],
-                prescribed_by=med["prescribedBy"],
-                start_date=datetime.strptime(med["startDate"], "%Y-%m-%d"),
-                review_date=datetime.strptime(med["reviewDate"], "%Y-%m-%d")
-            ))
-        return meds
+            self._load(json.load(f))
 
-    def _parse_supplements(self) -> List[Supplement]:
-        supps = []
-        for supp in self.raw_data["supplements"]:
-            supps.append(Supplement(
-                name=supp["name"],
-                dosage=supp["dosage"],
-                unit=supp["unit"],
-                frequency=supp["frequency"],
-                timing=supp["timing"],
-                purpose=supp["purpose"],
-                instructions=supp["instructions"]
-            ))
-        return supps
-
-    def _parse_as_needed(self) -> List[AsNeededMed]:
-        meds = []
-        for med in self.raw_data["asNeeded"]:
-            meds.append(AsNeededMed(
-                name=med["name"],
-                brand_name=med["brandName"],
-                dosage=med["dosage"],
-                unit=med["unit"],
-                max_frequency=med["maxFrequency"],
-                purpose=med["purpose"],
-                instructions=med["instructions"],
-                contraindications=med.get("contraindications")
-            ))
-        return meds
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MedicationRegimen":
+        """Build a regimen from already-parsed medication JSON."""
+        regimen = cls.__new__(cls)
+        regimen._load(data)
+        return regimen
 
-    def _parse_schedule(self) -> Dict[str, ScheduleTime]:
-        schedule = {}
-        for time_of_day, details in self.raw_data["schedule"].items():
-            schedule[time_of_day] = ScheduleTime(
-                time=datetime.strptime(details["time"], "%H:%M").time(),
-                medications=details["medications"]
-            )
-        return schedule
-
-    def _parse_monitoring(self) -> Monitoring:
-        mon = self.raw_data["monitoring"]
-        return Monitoring(
-            required_tests=mon["requiredTests"],
-            side_effects_to_watch=mon["sideEffectsToWatch"]
-        )
+    def _load(self, data: Dict) -> None:
+        meds = data["medications"]
+        self.prescription_meds = tuple(PrescriptionMed.from_dict(med) for med in meds["prescriptionMeds"])
+        self.supplements = tuple(Supplement.from_dict(supp) for supp in meds["supplements"])
+        self.as_needed = tuple(AsNeededMed.from_dict(med) for med in meds["asNeeded"])
+        self.schedule = {
+            sys.intern(time_of_day): ScheduleTime.from_dict(details)
+            for time_of_day, details in meds["schedule"].items()
+        }
+        self.monitoring = Monitoring.from_dict(meds["monitoring"])
 
-    def _create_med_lookup(self):
-        """Creates a lookup dictionary for quick access to medication details by name"""
-        self.med_lookup = {}
-        
-        # Add prescription meds
-        for med in self.prescription_meds:
-            self.med_lookup[med.name] = {
-                "type": "prescription",
-                "details": med
-            }
-        
-        # Add supplements
-        for supp in self.supplements:
-            self.med_lookup[supp.name] = {
-                "type": "supplement",
-                "details": supp
-            }
-        
-        # Add as-needed meds
-        for med in self.as_needed:
-            self.med_lookup[med.name] = {
-                "type": "as_needed",
-                "details": med
-            }
+        # Name -> record; later sections win on a name clash, as before
+        self.med_lookup: Dict[str, Medication] = {
+            med.name: med
+            for med in (*self.prescription_meds, *self.supplements, *self.as_needed)
+        }
 
     def get_medication_details(self, med_name: str) -> Optional[Dict]:
         """Get details for a specific medication by name"""
-        return self.med_lookup.get(med_name)
+        med = self.med_lookup.get(med_name)
+        if med is None:
+            return None
+        return {"type": med.kind, "details": med}
 
     def get_medications_by_time(self, time_of_day: str) -> List[Dict]:
         """Get all medications scheduled for a specific time of day"""
@@ -204,7 +204,7 @@ class MedicationRegimen:
             "schedule": {},
             "monitoring": {
                 "upcoming_reviews": [],
-                "side_effects_to_watch": self.monitoring.side_effects_to_watch
+                "side_effects_to_watch": list(self.monitoring.side_effects_to_watch)
             },
             "totals": {
                 "prescription_meds": len(self.prescription_meds),
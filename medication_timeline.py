@@ -0,0 +1,194 @@
+import argparse
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from medication_parser import MedicationRegimen
+
+
+class Dose(NamedTuple):
+    time: datetime
+    profile_id: str
+    medication: str
+    time_slot: str
+    type: str
+    dosage: str
+
+
+class Review(NamedTuple):
+    review_date: date
+    profile_id: str
+    medication: str
+
+
+def expand_doses(regimen: MedicationRegimen, start: date, days: int, profile_id: str = "") -> List[Dose]:
+    """
+    Expand a regimen's daily schedule into doses for a range of days.
+
+    Prescriptions are only scheduled from their start date. The result is in
+    time order without sorting, since schedule slots are ordered once and
+    then repeated day by day.
+
+    Args:
+        regimen (MedicationRegimen): Parsed regimen
+        start (date): First day
+        days (int): Number of days
+        profile_id (str): Patient the doses belong to
+
+    Returns:
+        List[Dose]: Doses in chronological order
+    """
+    slots = sorted(regimen.schedule.items(), key=lambda item: item[1].time)
+    daily = []
+    for time_slot, slot in slots:
+        for name in slot.medications:
+            med = regimen.get_medication_details(name)
+            if med is None:
+                continue
+            details = med["details"]
+            starts = getattr(details, "start_date", None)
+            daily.append((
+                slot.time, time_slot, name, med["type"],
+                f"{details.dosage}{details.unit}", starts.date() if starts else None
+            ))
+
+    doses = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for slot_time, time_slot, name, kind, dosage, starts in daily:
+            if starts is None or day >= starts:
+                doses.append(Dose(datetime.combine(day, slot_time), profile_id, name, time_slot, kind, dosage))
+    return doses
+
+
+class DoseCalendar:
+    """
+    Doses for one or many patients over a fixed range of days, sorted by time.
+
+    Range queries bisect on the dose times, so they cost O(log n + k) for k
+    doses returned.
+    """
+
+    def __init__(self, doses: Iterable[Dose]):
+        """
+        Args:
+            doses (Iterable[Dose]): Doses in chronological order
+        """
+        self.doses: List[Dose] = list(doses)
+        self._times = [dose.time for dose in self.doses]
+
+    @classmethod
+    def for_regimen(cls, regimen: MedicationRegimen, start: date, days: int, profile_id: str = "") -> "DoseCalendar":
+        return cls(expand_doses(regimen, start, days, profile_id))
+
+    @classmethod
+    def for_population(cls, regimens: Dict[str, MedicationRegimen], start: date, days: int) -> "DoseCalendar":
+        """Merge every patient's calendar; each is already sorted, so this is a k-way merge."""
+        return cls(heapq.merge(
+            *(expand_doses(regimen, start, days, profile_id) for profile_id, regimen in regimens.items()),
+            key=lambda dose: dose.time
+        ))
+
+    def between(self, start: datetime, end: datetime) -> List[Dose]:
+        """Doses with start <= time < end."""
+        return self.doses[bisect_left(self._times, start):bisect_left(self._times, end)]
+
+    def on(self, day: date) -> List[Dose]:
+        """Doses on one calendar day."""
+        midnight = datetime.combine(day, datetime.min.time())
+        return self.between(midnight, midnight + timedelta(days=1))
+
+    def next_dose(self, after: datetime) -> Optional[Dose]:
+        """First dose strictly after a time, if any."""
+        index = bisect_right(self._times, after)
+        return self.doses[index] if index < len(self.doses) else None
+
+    def __len__(self) -> int:
+        return len(self.doses)
+
+
+class ReviewIndex:
+    """
+    Prescription review dates across many regimens, kept sorted by date.
+
+    Lookups bisect on the dates, so "reviews due in the next k days" costs
+    O(log n + k) however many patients are indexed. Adding a regimen inserts
+    each review in place; removing a patient is a linear scan.
+    """
+
+    def __init__(self):
+        self._dates: List[date] = []
+        self._reviews: List[Review] = []
+
+    @classmethod
+    def from_regimens(cls, regimens: Dict[str, MedicationRegimen]) -> "ReviewIndex":
+        index = cls()
+        reviews = [
+            Review(med.review_date.date(), profile_id, med.name)
+            for profile_id, regimen in regimens.items()
+            for med in regimen.prescription_meds
+        ]
+        reviews.sort()
+        index._reviews = reviews
+        index._dates = [review.review_date for review in reviews]
+        return index
+
+    def add(self, profile_id: str, regimen: MedicationRegimen) -> None:
+        for med in regimen.prescription_meds:
+            review = Review(med.review_date.date(), profile_id, med.name)
+            position = bisect_right(self._reviews, review)
+            self._reviews.insert(position, review)
+            self._dates.insert(position, review.review_date)
+
+    def remove(self, profile_id: str) -> None:
+        kept = [review for review in self._reviews if review.profile_id != profile_id]
+        self._reviews = kept
+        self._dates = [review.review_date for review in kept]
+
+    def between(self, start: date, end: date) -> List[Review]:
+        """Reviews with start <= review_date <= end."""
+        return self._reviews[bisect_left(self._dates, start):bisect_right(self._dates, end)]
+
+    def due_within(self, days: int, today: Optional[date] = None) -> List[Review]:
+        """
+        Reviews due from today through the next `days` days.
+
+        Args:
+            days (int): Window length in days
+            today (date, optional): Reference day, defaults to today
+
+        Returns:
+            List[Review]: Reviews in date order
+        """
+        today = today or date.today()
+        return self.between(today, today + timedelta(days=days))
+
+    def overdue(self, today: Optional[date] = None) -> List[Review]:
+        """Reviews dated before today."""
+        today = today or date.today()
+        return self._reviews[:bisect_left(self._dates, today)]
+
+    def __len__(self) -> int:
+        return len(self._reviews)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Print a medication dose calendar and upcoming reviews')
+    parser.add_argument('medication', help='Path to a medication.json file')
+    parser.add_argument('--start', type=date.fromisoformat, default=date.today(), help='First day (YYYY-MM-DD)')
+    parser.add_argument('--days', type=int, default=7, help='Days to expand')
+    args = parser.parse_args()
+
+    regimen = MedicationRegimen(args.medication)
+    calendar = DoseCalendar.for_regimen(regimen, args.start, args.days)
+    for offset in range(args.days):
+        day = args.start + timedelta(days=offset)
+        print(day.isoformat())
+        for dose in calendar.on(day):
+            print(f"  {dose.time:%H:%M} {dose.medication} {dose.dosage} ({dose.type})")
+
+    reviews = ReviewIndex.from_regimens({"": regimen}).due_within(args.days, args.start)
+    if reviews:
+        print("Reviews due:")
+        for review in reviews:
+            print(f"  {review.review_date.isoformat()} {review.medication}")
@@ -0,0 +1,78 @@
+import argparse
+import gc
+import json
+import os
+import time
+import tracemalloc
+from typing import Dict
+from health_assessment import HealthAssessment
+from medication_parser import MedicationRegimen
+from patient_context import estimate_size
+
+DATA_DIR = os.getenv('MERIDIAN_DATA_DIR', '.')
+
+
+def measure_footprint(assessment_text: str, medication_text: str, patients: int = 100000) -> Dict:
+    """
+    Hold many parsed patients in memory and report what each one costs.
+
+    Every patient is decoded from its own copy of the JSON text, as it would
+    be when read from a separate file, so only deliberate sharing (interned
+    strings) is counted as shared.
+
+    Args:
+        assessment_text (str): Health assessment JSON
+        medication_text (str): Medication JSON
+        patients (int): Number of patients to hold at once
+
+    Returns:
+        Dict: Total and per-patient bytes, plus the size of the decoded JSON for comparison
+    """
+    gc.collect()
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    start = time.perf_counter()
+
+    held = []
+    for _ in range(patients):
+        held.append((
+            HealthAssessment.from_dict(json.loads(assessment_text)),
+            MedicationRegimen.from_dict(json.loads(medication_text))
+        ))
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    used = current - baseline
+    raw_json = estimate_size(json.loads(assessment_text)) + estimate_size(json.loads(medication_text))
+    return {
+        'patients': len(held),
+        'total_bytes': used,
+        'peak_bytes': peak - baseline,
+        'bytes_per_patient': round(used / len(held)),
+        'raw_json_bytes_per_patient': raw_json,
+        'seconds': round(elapsed, 3)
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure the in-memory footprint of parsed patients')
+    parser.add_argument('--assessment', default=os.path.join(DATA_DIR, 'health_assessment.json'),
+                        help='Health assessment JSON')
+    parser.add_argument('--medication', default=os.path.join(DATA_DIR, 'medication.json'),
+                        help='Medication JSON')
+    parser.add_argument('--patients', type=int, default=100000, help='Patients held in memory')
+    args = parser.parse_args()
+
+    with open(args.assessment, 'r') as f:
+        assessment_text = f.read()
+    with open(args.medication, 'r') as f:
+        medication_text = f.read()
+
+    result = measure_footprint(assessment_text, medication_text, args.patients)
+    print(f"{result['patients']} patients: {result['total_bytes'] / 1024 ** 2:.1f} MiB held, "
+          f"{result['peak_bytes'] / 1024 ** 2:.1f} MiB peak, parsed in {result['seconds']}s under tracemalloc")
+    print(f"  {result['bytes_per_patient']} bytes per patient "
+          f"(decoded JSON alone: {result['raw_json_bytes_per_patient']} bytes)")
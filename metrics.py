@@ -0,0 +1,367 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Default latency buckets (seconds), tuned for a pipeline where the LLM call
+# dominates and the local stages take milliseconds.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape(value)}"'
+        for name, value in zip(label_names, label_values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(
+                f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter, optionally split by labels."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, e.g. requests currently in flight."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed upper bounds, exposed as _bucket/_sum/_count."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of the enclosed block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def get_count(self, **labels) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return int(state[-1]) if state else 0
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        lines = []
+        for key, state in items:
+            for bound, count in zip(self.buckets, state):
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {_format_value(count)}"
+                )
+            inf = 'le="+Inf"'
+            lines.append(
+                f"{self.name}_bucket{_format_labels(self.label_names, key, inf)} {_format_value(state[-1])}"
+            )
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def expose(self) -> str:
+        """Render every registered metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.expose() for metric in metrics) + "\n"
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+
+# Pipeline metrics shared by app, app_pipeline and openai_client
+STAGE_LATENCY = REGISTRY.histogram(
+    "meridian_stage_latency_seconds",
+    "Latency of each recommendation pipeline stage.",
+    labels=("stage",)
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "meridian_stage_errors_total",
+    "Errors raised by each recommendation pipeline stage.",
+    labels=("stage",)
+)
+REQUESTS = REGISTRY.counter(
+    "meridian_requests_total",
+    "Requests served by the dashboard API, by endpoint and status.",
+    labels=("endpoint", "status")
+)
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "meridian_requests_in_flight",
+    "Requests currently being processed, by endpoint.",
+    labels=("endpoint",)
+)
+LLM_REQUESTS = REGISTRY.counter(
+    "meridian_llm_requests_total",
+    "OpenAI chat completion calls, by model and outcome.",
+    labels=("model", "status")
+)
+LLM_TOKENS = REGISTRY.counter(
+    "meridian_llm_tokens_total",
+    "Tokens reported in the OpenAI response usage, by model and kind.",
+    labels=("model", "kind")
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "meridian_llm_latency_seconds",
+    "Latency of individual OpenAI chat completion calls.",
+    labels=("model",)
+)
+LLM_HEDGES = REGISTRY.counter(
+    "meridian_llm_hedges_total",
+    "Hedged OpenAI calls: hedges fired and which request answered first.",
+    labels=("call_type", "outcome")
+)
+LLM_ROUTES = REGISTRY.counter(
+    "meridian_llm_routes_total",
+    "Model chosen for each OpenAI call by latency-budget routing.",
+    labels=("call_type", "model")
+)
+
+CIRCUIT_STATE = REGISTRY.gauge(
+    "meridian_circuit_state",
+    "Circuit breaker state: 0 closed, 1 half-open, 2 open.",
+    labels=("circuit",)
+)
+CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "meridian_circuit_rejections_total",
+    "Calls rejected without being attempted because the circuit was open.",
+    labels=("circuit",)
+)
+
+# Recommendation cache metrics, reported by recommendation_cache and app_pipeline
+CACHE_HITS = REGISTRY.counter(
+    "meridian_cache_hits_total",
+    "Recommendation cache hits.",
+    labels=("cache",)
+)
+CACHE_MISSES = REGISTRY.counter(
+    "meridian_cache_misses_total",
+    "Recommendation cache misses.",
+    labels=("cache",)
+)
+STALE_SERVED = REGISTRY.counter(
+    "meridian_stale_recommendations_total",
+    "Cached recommendations served past their freshness window, by reason.",
+    labels=("reason",)
+)
+
+SLIDER_UPDATES = REGISTRY.counter(
+    "meridian_slider_updates_total",
+    "Slider values sent over session channels, by outcome.",
+    labels=("outcome",)
+)
+
+PREFETCH_JOBS = REGISTRY.counter(
+    "meridian_prefetch_jobs_total",
+    "Speculative prefetches of neighbouring score buckets, by outcome.",
+    labels=("outcome",)
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "meridian_prompt_tokens",
+    "Input tokens per prompt, counted locally before the call.",
+    labels=("prompt",),
+    buckets=(100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 8000)
+)
+
+# Webhook ingestion metrics
+WEBHOOK_EVENTS = REGISTRY.counter(
+    "meridian_webhook_events_total",
+    "Webhook deliveries, by outcome.",
+    labels=("outcome",)
+)
+WEBHOOK_QUEUE_DEPTH = REGISTRY.gauge(
+    "meridian_webhook_queue_depth",
+    "Webhook deliveries accepted but not yet written to storage."
+)
+WEBHOOK_DUPLICATE_RATIO = REGISTRY.gauge(
+    "meridian_webhook_duplicate_ratio",
+    "Share of webhook deliveries since start that were redeliveries of a known event."
+)
+WEBHOOK_DRAIN_LATENCY = REGISTRY.histogram(
+    "meridian_webhook_drain_latency_seconds",
+    "Time from accepting a webhook delivery to committing it to storage."
+)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time a pipeline stage and count it as an error if it raises.
+
+    Args:
+        stage (str): Stage name used as the `stage` label
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        STAGE_LATENCY.observe(time.perf_counter() - start, stage=stage)
@@ -1,21 +1,213 @@
-from typing import Optional
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, List, Optional, Tuple
 from openai import OpenAI
+from llm_routing import HedgePolicy, LatencyRoute, LatencyTracker, choose_model
+from metrics import LLM_HEDGES, LLM_LATENCY, LLM_REQUESTS, LLM_ROUTES, LLM_TOKENS
+from prompt_builder import count_tokens
+
+CLIENT_MODES = ("live", "record", "replay")
+
+# Failed calls are returned as text starting with this prefix
+ERROR_PREFIX = "Error generating response: "
+
+
+class Cassette:
+    """
+    Gzipped JSON-lines file of recorded chat completion calls.
+
+    Each line holds the request, the response content, the usage counts and
+    the observed latency. Requests are matched on a hash of everything sent
+    to the API, so a replay only answers calls that were actually recorded.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._writer = None
+        self._entries: Optional[Dict[str, List[Dict]]] = None
+        self._cursors: Dict[str, int] = {}
+
+    @staticmethod
+    def request_key(request: Dict) -> str:
+        encoded = json.dumps(request, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def append(
+        self,
+        request: Dict,
+        content: str,
+        usage: Dict[str, int],
+        latency: float,
+        model: Optional[str] = None
+    ) -> None:
+        """
+        Append a recorded call to the cassette.
+
+        Args:
+            request (Dict): Parameters as requested by the caller, before any
+                routing or hedging; replays look calls up by these
+            content (str): Message content returned by the API
+            usage (Dict[str, int]): Token usage reported by the API
+            latency (float): Wall-clock duration of the call in seconds
+            model (str, optional): Model that actually served the call, if
+                routing or hedging sent it elsewhere
+        """
+        entry = {
+            "key": self.request_key(request),
+            "request": request,
+            "content": content,
+            "usage": usage,
+            "latency": round(latency, 4)
+        }
+        if model is not None and model != request["model"]:
+            entry["model"] = model
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._writer is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._writer = gzip.open(self.path, "at", encoding="utf-8")
+            self._writer.write(line)
+            self._writer.flush()
+
+    def lookup(self, request: Dict) -> Dict:
+        """
+        Return the next recorded response for a request.
+
+        Repeated recordings of the same request are served round-robin so a
+        replay reproduces the variety seen while recording.
+
+        Args:
+            request (Dict): Parameters that would be sent to the API
+
+        Returns:
+            Dict: Recorded entry with 'content', 'usage' and 'latency', and
+            'model' if another model served the call
+
+        Raises:
+            KeyError: If the request was never recorded
+        """
+        key = self.request_key(request)
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load()
+            recorded = self._entries.get(key)
+            if not recorded:
+                raise KeyError(f"No recorded response for request {key[:12]} in {self.path}")
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return recorded[cursor % len(recorded)]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        entries: Dict[str, List[Dict]] = {}
+        if not os.path.exists(self.path):
+            return entries
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    entries.setdefault(entry["key"], []).append(entry)
+        except (EOFError, json.JSONDecodeError):
+            # A recorder that was killed leaves the last gzip member or line
+            # unterminated; everything read up to that point is still valid.
+            pass
+        return entries
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    """Return the shared Cassette for a path so clients never interleave writes."""
+    key = os.path.abspath(path)
+    with _cassettes_lock:
+        if key not in _cassettes:
+            _cassettes[key] = Cassette(key)
+        return _cassettes[key]
+
+
+@atexit.register
+def _close_cassettes() -> None:
+    for cassette in list(_cassettes.values()):
+        cassette.close()
+
 
 class OpenAIClient:
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        mode: str = "live",
+        cassette_path: Optional[str] = None,
+        replay_latency_scale: float = 0.0,
+        hedge: Optional[HedgePolicy] = None,
+        routes: Optional[Dict[str, LatencyRoute]] = None,
+        rate_limiter=None
+    ):
         """
         Initialize the OpenAI client with your API key.
-        
+
         Args:
             api_key (str): Your OpenAI API key
+            model (str): Default model to use
+            mode (str): 'live' calls the API, 'record' calls the API and saves
+                every call to the cassette, 'replay' answers from the cassette
+                without touching the network
+            cassette_path (str, optional): Recording file, required for
+                'record' and 'replay'
+            replay_latency_scale (float): In replay mode, sleep for the
+                recorded latency multiplied by this factor (0 disables it)
+            hedge (HedgePolicy, optional): Send a backup request when a call
+                runs past its usual latency
+            routes (Dict[str, LatencyRoute], optional): Latency budgets by call
+                type, used to switch to a faster model when the default is slow
+            rate_limiter (optional): Object with acquire(tokens), e.g.
+                batch_precompute.RateLimiter; charged before every API
+                request, hedges included, with its estimated token count
+
+        Hedging and routing only apply to live and record calls; replays
+        answer from the cassette with the requested model.
         """
-        self.client = OpenAI(api_key=api_key)
-        
+        if mode not in CLIENT_MODES:
+            raise ValueError(f"mode must be one of {CLIENT_MODES}, got {mode!r}")
+        if mode != "live" and not cassette_path:
+            raise ValueError(f"cassette_path is required in {mode} mode")
+
+        self.mode = mode
+        self.cassette = get_cassette(cassette_path) if cassette_path else None
+        self.replay_latency_scale = replay_latency_scale
+        self.client = OpenAI(api_key=api_key) if mode != "replay" else None
+
+        self.hedge = hedge
+        self.routes = routes or {}
+        self.rate_limiter = rate_limiter
+        self.latency = LatencyTracker()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
         # Default settings
         self.default_model = model
         self.default_temperature = 0.7
         self.default_max_tokens = 1000
-        
+
     def set_default_parameters(
         self,
         model: str = "gpt-3.5-turbo",
@@ -24,7 +216,7 @@ class OpenAIClient:
     ) -> None:
         """
         Update default parameters for API calls.
-        
+
         Args:
             model (str): The default model to use
             temperature (float): Default temperature setting
@@ -33,25 +225,29 @@ class OpenAIClient:
         self.default_model = model
         self.default_temperature = temperature
         self.default_max_tokens = max_tokens
-    
+
     def generate_response(
         self,
         prompt: str,
         system_prompt: Optional[str] = None,
         model: Optional[str] = None,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        response_format: Optional[Dict] = None,
+        call_type: str = "default"
     ) -> str:
         """
         Generate a response using OpenAI's API.
-        
+
         Args:
             prompt (str): The user's prompt
             system_prompt (str, optional): Instructions for how the AI should behave
             model (str, optional): Override default model
             temperature (float, optional): Override default temperature
             max_tokens (int, optional): Override default max tokens
-            
+            response_format (Dict, optional): Structured output format, e.g. a json_schema
+            call_type (str): Kind of call, for latency statistics and routing
+
         Returns:
             str: The generated response
         """
@@ -59,59 +255,256 @@ class OpenAIClient:
         model = model or self.default_model
         temperature = temperature or self.default_temperature
         max_tokens = max_tokens or self.default_max_tokens
-        
+
         messages = []
-        
+
         # Add system prompt if provided
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
-        
+
         # Add user prompt
         messages.append({"role": "user", "content": prompt})
-        
+
+        request = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_completion_tokens": max_tokens
+        }
+        # Only sent when set, so existing cassette recordings keep their keys
+        if response_format is not None:
+            request["response_format"] = response_format
+
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_completion_tokens=max_tokens
-            )
-            return response.choices[0].message.content
-        
+            content, _ = self._complete(request, call_type)
+            return content
+
         except Exception as e:
-            return f"Error generating response: {str(e)}"
-    
+            return f"{ERROR_PREFIX}{str(e)}"
+
     def generate_chat_response(
         self,
         messages: list[dict],
         model: Optional[str] = None,
         temperature: Optional[float] = None,
-        max_tokens: Optional[int] = None
+        max_tokens: Optional[int] = None,
+        call_type: str = "default"
     ) -> str:
         """
         Generate a response using a full chat history.
-        
+
         Args:
             messages (list[dict]): List of message dictionaries with 'role' and 'content'
             model (str, optional): Override default model
             temperature (float, optional): Override default temperature
             max_tokens (int, optional): Override default max tokens
-            
+            call_type (str): Kind of call, for latency statistics and routing
+
         Returns:
             str: The generated response
         """
         model = model or self.default_model
         temperature = temperature or self.default_temperature
         max_tokens = max_tokens or self.default_max_tokens
-        
+
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens
-            )
-            return response.choices[0].message.content
-            
+            content, _ = self._complete({
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "max_tokens": max_tokens
+            }, call_type)
+            return content
+
         except Exception as e:
-            return f"Error generating response: {str(e)}"
\ No newline at end of file
+            return f"{ERROR_PREFIX}{str(e)}"
+
+    def _complete(self, request: Dict, call_type: str = "default") -> Tuple[str, Dict[str, int]]:
+        """
+        Run a chat completion live or from the cassette, depending on the mode.
+
+        Args:
+            request (Dict): Keyword arguments for chat.completions.create
+            call_type (str): Kind of call, for latency statistics and routing
+
+        Returns:
+            Tuple[str, Dict[str, int]]: Message content and token usage
+        """
+        model = request["model"]
+
+        if self.mode == "replay":
+            try:
+                entry = self.cassette.lookup(request)
+            except KeyError:
+                LLM_REQUESTS.inc(model=model, status="error")
+                raise
+            if self.replay_latency_scale > 0:
+                time.sleep(entry["latency"] * self.replay_latency_scale)
+            self._record_usage(entry.get("model", model), entry["usage"], entry["latency"])
+            return entry["content"], entry["usage"]
+
+        # Recordings are keyed by the call as requested, so a replay, which
+        # neither routes nor hedges, finds them
+        requested = request
+        start = time.perf_counter()
+
+        route = self.routes.get(call_type)
+        if route is not None:
+            routed_model = choose_model(self.latency, route, call_type, model)
+            if routed_model != model:
+                request = dict(request, model=routed_model)
+            LLM_ROUTES.inc(call_type=call_type, model=routed_model)
+
+        if self.hedge is None:
+            content, usage, served_model = self._call(request, call_type)
+        else:
+            content, usage, served_model = self._hedged_call(request, call_type)
+
+        if self.mode == "record":
+            # Only the answer the caller got is recorded; a losing hedge is not
+            self.cassette.append(requested, content, usage, time.perf_counter() - start, served_model)
+        return content, usage
+
+    def _hedged_call(self, request: Dict, call_type: str) -> Tuple[str, Dict[str, int], str]:
+        """
+        Run a call and, if it outlasts the hedge deadline, race a backup request.
+
+        The primary request gets a thread of its own, so it never queues
+        behind other callers, and the deadline is timed from when it is
+        actually sent rather than from any wait on the rate limiter. Only
+        hedges go through the shared pool. The slower request is left to
+        finish in the background; its usage is still recorded, since it is
+        still billed.
+
+        Returns:
+            Tuple[str, Dict[str, int], str]: As for _call, from the winning request
+        """
+        deadline = self.latency.percentile(call_type, request["model"], self.hedge.percentile)
+        if deadline is None:
+            return self._call(request, call_type)
+
+        sent = threading.Event()
+        primary: Future = Future()
+
+        def run_primary():
+            try:
+                primary.set_result(self._call(request, call_type, sent))
+            except BaseException as e:
+                primary.set_exception(e)
+            finally:
+                # Wake the caller even if the request failed before being sent
+                sent.set()
+
+        threading.Thread(target=run_primary, name="llm-primary", daemon=True).start()
+        sent.wait()
+        try:
+            return primary.result(timeout=max(deadline, self.hedge.min_delay))
+        except FutureTimeout:
+            pass
+
+        hedge_request = request
+        if self.hedge.hedge_model:
+            hedge_request = dict(request, model=self.hedge.hedge_model)
+        LLM_HEDGES.inc(call_type=call_type, outcome="fired")
+        pending = {
+            primary: "primary_won",
+            self._executor().submit(self._call, hedge_request, call_type): "hedge_won"
+        }
+
+        error = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                outcome = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                LLM_HEDGES.inc(call_type=call_type, outcome=outcome)
+                return result
+        raise error
+
+    def _executor(self) -> ThreadPoolExecutor:
+        """Pool for hedge requests; primaries never run on it."""
+        with self._executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="llm-hedge")
+            return self._hedge_executor
+
+    def _call(
+        self,
+        request: Dict,
+        call_type: str,
+        sent: Optional[threading.Event] = None
+    ) -> Tuple[str, Dict[str, int], str]:
+        """
+        Send one chat completion to the API and record its latency and usage.
+
+        Failures are counted against the model the request was actually sent
+        to, which after routing or hedging may differ from the one asked for.
+
+        Args:
+            request (Dict): Keyword arguments for chat.completions.create
+            call_type (str): Kind of call, for latency statistics and routing
+            sent (threading.Event, optional): Set once the rate limiter lets
+                the request through, just before it goes out
+
+        Returns:
+            Tuple[str, Dict[str, int], str]: Message content, token usage and
+            the model the request was sent to
+        """
+        model = request["model"]
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(self._token_estimate(request))
+        if sent is not None:
+            sent.set()
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**request)
+        except Exception:
+            LLM_REQUESTS.inc(model=model, status="error")
+            raise
+        elapsed = time.perf_counter() - start
+
+        content = response.choices[0].message.content
+        usage = self._usage_dict(response)
+        self._record_usage(model, usage, elapsed)
+        self.latency.observe(call_type, model, elapsed)
+        return content, usage, model
+
+    @staticmethod
+    def _token_estimate(request: Dict) -> int:
+        """Prompt tokens counted locally plus the completion limit."""
+        prompt_tokens = sum(
+            count_tokens(message.get("content") or "", request["model"])
+            for message in request["messages"]
+        )
+        return prompt_tokens + request.get("max_completion_tokens", request.get("max_tokens", 0))
+
+    @staticmethod
+    def _usage_dict(response) -> Dict[str, int]:
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return {}
+        return {
+            kind: getattr(usage, kind)
+            for kind in ("prompt_tokens", "completion_tokens", "total_tokens")
+            if getattr(usage, kind, None) is not None
+        }
+
+    def _record_usage(self, model: str, usage: Dict[str, int], elapsed: float) -> None:
+        """
+        Record latency and token usage for a completed API call.
+
+        Args:
+            model (str): Model the request was sent to
+            usage (Dict[str, int]): Token counts reported by the API
+            elapsed (float): Wall-clock duration of the call in seconds
+        """
+        LLM_REQUESTS.inc(model=model, status="success")
+        LLM_LATENCY.observe(elapsed, model=model)
+
+        for kind, count in usage.items():
+            if count:
+                LLM_TOKENS.inc(count, model=model, kind=kind.replace("_tokens", ""))
@@ -0,0 +1,144 @@
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+from health_assessment import HealthAssessment
+from medication_parser import MedicationRegimen
+from score_stats import StreamingScoreStats
+
+
+@dataclass
+class PatientContext:
+    profile_id: str
+    assessment: HealthAssessment
+    medication: MedicationRegimen
+    # Only the statistics are kept; the raw score entries are dropped once read
+    wellbeing_stats: StreamingScoreStats
+    interactions: str
+    meal_plan: str
+    size_bytes: int = field(default=0, compare=False)
+
+
+def estimate_size(obj, _seen: Optional[set] = None) -> int:
+    """
+    Approximate the memory held by an object graph, in bytes.
+
+    Args:
+        obj: Root object
+
+    Returns:
+        int: Sum of sys.getsizeof over every reachable object
+    """
+    seen = _seen if _seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += estimate_size(vars(obj), seen)
+    elif hasattr(obj, "__slots__"):
+        size += sum(
+            estimate_size(getattr(obj, name), seen)
+            for name in obj.__slots__
+            if hasattr(obj, name)
+        )
+    return size
+
+
+class PatientContextCache:
+    """
+    LRU of loaded patient contexts bounded by count and approximate memory.
+
+    Contexts are loaded on first use. Concurrent requests for a profile that
+    is still loading wait for that load instead of starting their own, since a
+    load includes LLM calls.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], PatientContext],
+        max_contexts: int = 1000,
+        max_bytes: int = 512 * 1024 * 1024
+    ):
+        """
+        Args:
+            loader (Callable[[str], PatientContext]): Builds a context for a profile id
+            max_contexts (int): Maximum contexts kept loaded
+            max_bytes (int): Approximate memory budget for all loaded contexts
+        """
+        self.loader = loader
+        self.max_contexts = max_contexts
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._contexts: "OrderedDict[str, PatientContext]" = OrderedDict()
+        self._loading: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get(self, profile_id: str) -> PatientContext:
+        """
+        Return the context for a profile, loading it if needed.
+
+        Args:
+            profile_id (str): Patient profile identifier
+
+        Returns:
+            PatientContext: Loaded context
+
+        Raises:
+            Exception: Whatever the loader raises for an unknown or invalid profile
+        """
+        while True:
+            with self._lock:
+                context = self._contexts.get(profile_id)
+                if context is not None:
+                    self._contexts.move_to_end(profile_id)
+                    return context
+                event = self._loading.get(profile_id)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[profile_id] = event
+                    break
+            # Another thread is loading this profile; use its result or retry if it failed
+            event.wait()
+
+        try:
+            context = self.loader(profile_id)
+            context.size_bytes = estimate_size(context)
+            with self._lock:
+                self._contexts[profile_id] = context
+                self.total_bytes += context.size_bytes
+                self._evict()
+            return context
+        finally:
+            with self._lock:
+                del self._loading[profile_id]
+            event.set()
+
+    def invalidate(self, profile_id: str) -> None:
+        """Drop a profile so the next request reloads it."""
+        with self._lock:
+            context = self._contexts.pop(profile_id, None)
+            if context is not None:
+                self.total_bytes -= context.size_bytes
+
+    def __contains__(self, profile_id: str) -> bool:
+        with self._lock:
+            return profile_id in self._contexts
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._contexts)
+
+    def _evict(self) -> None:
+        # Always keep the most recently loaded context, even if it alone exceeds the budget
+        while len(self._contexts) > 1 and (
+            len(self._contexts) > self.max_contexts or self.total_bytes > self.max_bytes
+        ):
+            _, evicted = self._contexts.popitem(last=False)
+            self.total_bytes -= evicted.size_bytes
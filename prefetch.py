@@ -0,0 +1,198 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from metrics import PREFETCH_JOBS
+from recommendation_cache import RecommendationCache, score_bucket, bucket_score, DEFAULT_BUCKET_WIDTH
+
+Key = Tuple[str, int]
+
+
+class InFlight:
+    """
+    Registry of (profile_id, bucket) computations under way.
+
+    Shared by foreground requests, prefetching and revalidation so a bucket
+    is computed by at most one of them at a time. Each computation is a
+    Future that resolves to (html, created_at) once the result is cached.
+    A future that has not started can still be cancelled by someone who
+    wants the result sooner; claiming the key then starts a new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._futures: Dict[Key, Future] = {}
+
+    def claim(self, key: Key) -> Tuple[Future, bool]:
+        """
+        Register a computation of key unless one is already under way.
+
+        Returns:
+            Tuple[Future, bool]: The key's future, and True if the caller
+            registered it and must now resolve it and call release
+        """
+        with self._lock:
+            future = self._futures.get(key)
+            if future is not None and not future.cancelled():
+                return future, False
+            future = self._futures[key] = Future()
+            return future, True
+
+    def release(self, key: Key, future: Future) -> None:
+        """Unregister a computation; a newer one for the same key is left alone."""
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+
+    def __contains__(self, key: Key) -> bool:
+        with self._lock:
+            return key in self._futures
+
+
+class Prefetcher:
+    """
+    Background warming of the score buckets next to the one just served.
+
+    The dashboard slider moves in small steps, so after a request for bucket
+    b the next one is most likely b +/- 1. Each session has at most one set of
+    prefetches queued; a newer request from the same session cancels the ones
+    that have not started yet. Work is bounded by a fixed-size thread pool.
+
+    Cancellation only removes futures still waiting in the pool's queue. A
+    prefetch that has started keeps running to the end, LLM calls included,
+    and its result is still cached.
+
+    Buckets already being computed, by this prefetcher or by anyone sharing
+    its InFlight registry, are skipped.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[str, float], str],
+        cache: RecommendationCache,
+        max_concurrency: int = 2,
+        radius: int = 2,
+        bucket_width: float = DEFAULT_BUCKET_WIDTH,
+        in_flight: Optional[InFlight] = None
+    ):
+        """
+        Args:
+            compute (Callable[[str, float], str]): Uncached pipeline, returns rendered HTML
+            cache (RecommendationCache): Cache receiving the prefetched results
+            max_concurrency (int): Prefetches allowed to run at the same time
+            radius (int): Buckets to warm on each side of the served one
+            bucket_width (float): Score bucket width used by the cache
+            in_flight (InFlight, optional): Registry shared with other
+                producers of the same cache; a private one if omitted
+        """
+        self.compute = compute
+        self.cache = cache
+        self.radius = radius
+        self.bucket_width = bucket_width
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, List[Future]] = {}
+        self.in_flight = in_flight or InFlight()
+
+    def schedule(self, session_id: str, profile_id: str, score: float) -> int:
+        """
+        Cancel the session's queued prefetches and queue the neighbours of `score`.
+
+        Args:
+            session_id (str): Dashboard session the request came from
+            profile_id (str): Patient profile being viewed
+            score (float): Score that was just served, between 0 and 1
+
+        Returns:
+            int: Number of prefetches queued
+        """
+        self.cancel(session_id)
+
+        center = score_bucket(score, self.bucket_width)
+        max_bucket = score_bucket(1.0, self.bucket_width)
+        neighbours = []
+        for distance in range(1, self.radius + 1):
+            for bucket in (center + distance, center - distance):
+                if 0 <= bucket <= max_bucket:
+                    neighbours.append(bucket)
+
+        # The cache check can read the SQLite store, so it stays outside the
+        # lock; a bucket finished in between is at worst computed twice
+        missing = [bucket for bucket in neighbours if not self.cache.contains(profile_id, bucket)]
+
+        futures = []
+        claimed = []
+        with self._lock:
+            for bucket in missing:
+                key = (profile_id, bucket)
+                slot, owner = self.in_flight.claim(key)
+                if not owner:
+                    continue
+                futures.append(self._executor.submit(self._run, key, slot))
+                claimed.append((key, slot))
+            self._sessions[session_id] = futures
+        # Outside the lock: a job that already finished runs its callback
+        # immediately
+        for future, (key, slot) in zip(futures, claimed):
+            future.add_done_callback(lambda _, key=key, slot=slot: self._finish(key, slot))
+
+        PREFETCH_JOBS.inc(len(futures), outcome="scheduled")
+        return len(futures)
+
+    def refresh(self, profile_id: str, bucket: int) -> bool:
+        """
+        Queue a recomputation of one bucket, replacing its cached plan when done.
+
+        Used to revalidate stale entries; not tied to a session, so it is
+        never cancelled by later requests.
+
+        Returns:
+            bool: False if the bucket is already being computed
+        """
+        key = (profile_id, bucket)
+        slot, owner = self.in_flight.claim(key)
+        if not owner:
+            return False
+        future = self._executor.submit(self._run, key, slot)
+        future.add_done_callback(lambda _: self._finish(key, slot))
+        PREFETCH_JOBS.inc(outcome="scheduled")
+        return True
+
+    def cancel(self, session_id: str) -> int:
+        """
+        Cancel a session's prefetches that have not started yet.
+
+        Prefetches already running are not interrupted; their LLM calls
+        finish and their results are cached.
+
+        Returns:
+            int: Number of prefetches cancelled
+        """
+        with self._lock:
+            futures = self._sessions.pop(session_id, [])
+        cancelled = sum(1 for future in futures if future.cancel())
+        if cancelled:
+            PREFETCH_JOBS.inc(cancelled, outcome="cancelled")
+        return cancelled
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, key: Key, slot: Future) -> None:
+        if not slot.set_running_or_notify_cancel():
+            # A foreground request took the bucket over before this started
+            PREFETCH_JOBS.inc(outcome="cancelled")
+            return
+        profile_id, bucket = key
+        try:
+            html = self.compute(profile_id, bucket_score(bucket, self.bucket_width))
+        except Exception as e:
+            PREFETCH_JOBS.inc(outcome="failed")
+            slot.set_exception(e)
+            raise
+        slot.set_result((html, self.cache.put(profile_id, bucket, html)))
+        PREFETCH_JOBS.inc(outcome="completed")
+
+    def _finish(self, key: Key, slot: Future) -> None:
+        # A job cancelled in the pool's queue never ran, so its slot is still pending
+        slot.cancel()
+        self.in_flight.release(key, slot)
@@ -0,0 +1,208 @@
+import json
+import re
+import textwrap
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from metrics import PROMPT_TOKENS
+
+try:
+    import tiktoken
+except ImportError:  # Fall back to the local estimate below
+    tiktoken = None
+
+# Fields of the health_recommendation.main state, least valuable first. They
+# are dropped in this order until the prompt fits the token budget.
+TRIM_ORDER: List[Tuple[str, ...]] = [
+    ("detailed_recommendations", "communication_style"),  # duplicates recommended_tone
+    ("workload_capacity", "recommendations"),
+    ("workload_capacity", "confidence"),
+    ("historical_average",),  # repeated in trend_analysis
+    ("detailed_recommendations", "suggested_approach"),
+    ("workload_capacity", "workload_adjustment"),
+]
+
+# Approximate per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SYSTEM_PROMPT = "You are a dietician who has been given a meal plan and a client's current state."
+
+REFINE_TEMPLATE = textwrap.dedent("""
+    Update the meal plan to ensure that it is in line with the client's current state.
+    Provide your reasoning as to why you've made those changes as well.
+
+    Current state:
+    {current_state}
+
+    Meal Plan:
+    {meal_plan}
+
+    Return ONLY The updated meal plan and reasoning for the changes.
+""").strip()
+
+# Used with meal_plan.RESPONSE_FORMAT; the schema carries the output structure,
+# so the prompt only has to say what goes where
+STRUCTURED_REFINE_TEMPLATE = textwrap.dedent("""
+    Update the meal plan to ensure that it is in line with the client's current state.
+    Mark every meal item you added or changed as changed. Keep the medication notes
+    from the meal plan, list any further recommendations, and give your reasoning
+    for the changes.
+
+    Current state:
+    {current_state}
+
+    Meal Plan:
+    {meal_plan}
+""").strip()
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_encodings: Dict[str, Any] = {}
+
+
+@dataclass
+class CompiledPrompt:
+    system_prompt: str
+    prompt: str
+    prompt_tokens: int
+    budget: Optional[int]
+    trimmed_fields: List[str] = field(default_factory=list)
+
+    @property
+    def within_budget(self) -> bool:
+        return self.budget is None or self.prompt_tokens <= self.budget
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    """
+    Count tokens locally, without an API call.
+
+    Uses tiktoken when it is installed. Otherwise words and punctuation are
+    counted separately, with long words split every four characters, which
+    tracks BPE counts closely for English prompts.
+
+    Args:
+        text (str): Text to count
+        model (str): Model whose tokenizer should be used
+
+    Returns:
+        int: Number of tokens
+    """
+    if tiktoken is not None:
+        encoding = _encodings.get(model)
+        if encoding is None:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                encoding = tiktoken.get_encoding("o200k_base")
+            _encodings[model] = encoding
+        return len(encoding.encode(text))
+
+    return sum(
+        (len(piece) + 3) // 4 if piece[0].isalnum() else 1
+        for piece in _TOKEN_PATTERN.findall(text)
+    )
+
+
+def compact_state(state: Dict) -> str:
+    """
+    Serialize a recommendation state as minimal JSON.
+
+    None values are dropped and floats rounded to two decimals, which is all
+    the precision the prompt needs.
+
+    Args:
+        state (Dict): Output of health_recommendation.main
+
+    Returns:
+        str: Compact JSON string
+    """
+    return _dumps(_compact_value(state))
+
+
+def normalize_text(text: str) -> str:
+    """Strip trailing whitespace and collapse runs of blank lines."""
+    lines = [line.rstrip() for line in str(text).strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
+
+
+def build_refinement_prompt(
+    current_state: Dict,
+    meal_plan: str,
+    budget: Optional[int] = None,
+    model: str = "gpt-4o-mini",
+    template: str = REFINE_TEMPLATE
+) -> CompiledPrompt:
+    """
+    Build the meal plan refinement prompt within an input-token budget.
+
+    Low-value state fields are removed in TRIM_ORDER until the system and
+    user messages fit the budget. The meal plan itself is never trimmed, so a
+    prompt can still exceed the budget if the plan alone is too large.
+
+    Args:
+        current_state (Dict): Output of health_recommendation.main
+        meal_plan (str): Base meal plan to refine
+        budget (int, optional): Maximum input tokens, or None for no limit
+        model (str): Model whose tokenizer is used for counting
+        template (str): REFINE_TEMPLATE or STRUCTURED_REFINE_TEMPLATE
+
+    Returns:
+        CompiledPrompt: Messages, token count and the fields that were trimmed
+    """
+    state = _compact_value(current_state)
+    plan = normalize_text(meal_plan)
+    system_tokens = count_tokens(SYSTEM_PROMPT, model) + MESSAGE_OVERHEAD_TOKENS
+    trimmed: List[str] = []
+
+    def render() -> Tuple[str, int]:
+        prompt = template.format(
+            current_state=_dumps(state),
+            meal_plan=plan
+        )
+        return prompt, system_tokens + count_tokens(prompt, model) + MESSAGE_OVERHEAD_TOKENS
+
+    prompt, tokens = render()
+    for path in TRIM_ORDER:
+        if budget is None or tokens <= budget:
+            break
+        if _drop_path(state, path):
+            trimmed.append(".".join(path))
+            prompt, tokens = render()
+
+    PROMPT_TOKENS.observe(tokens, prompt="refine_meal_plan")
+    return CompiledPrompt(
+        system_prompt=SYSTEM_PROMPT,
+        prompt=prompt,
+        prompt_tokens=tokens,
+        budget=budget,
+        trimmed_fields=trimmed
+    )
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _compact_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: _compact_value(item)
+            for key, item in value.items()
+            if item is not None
+        }
+    if isinstance(value, (list, tuple)):
+        return [_compact_value(item) for item in value]
+    if isinstance(value, float):
+        return round(value, 2)
+    return value
+
+
+def _drop_path(state: Dict, path: Tuple[str, ...]) -> bool:
+    parent = state
+    for key in path[:-1]:
+        parent = parent.get(key)
+        if not isinstance(parent, dict):
+            return False
+    if path[-1] not in parent:
+        return False
+    del parent[path[-1]]
+    return True
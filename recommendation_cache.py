@@ -0,0 +1,209 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from metrics import CACHE_HITS, CACHE_MISSES
+
+# Slider values are 0-100 in steps of 0.1, i.e. 0.001 on the score scale.
+# Recommendations are shared per bucket so nearby slider positions reuse one plan.
+DEFAULT_BUCKET_WIDTH = 0.01
+
+
+def score_bucket(score: float, width: float = DEFAULT_BUCKET_WIDTH) -> int:
+    """
+    Map a wellbeing score to its cache bucket.
+
+    Args:
+        score (float): Wellbeing score between 0 and 1
+        width (float): Bucket width on the score scale
+
+    Returns:
+        int: Bucket index
+    """
+    return int(round(score / width))
+
+
+def bucket_score(bucket: int, width: float = DEFAULT_BUCKET_WIDTH) -> float:
+    """Return the representative score for a bucket, clamped to [0, 1]."""
+    return min(1.0, max(0.0, round(bucket * width, 6)))
+
+
+class RecommendationCache:
+    """
+    Thread-safe LRU of rendered recommendations keyed by (profile_id, bucket).
+
+    When a store path is given, entries are also written to a SQLite table so
+    that batch jobs running in another process can warm the server's cache.
+    Derived forms of an entry, such as its compressed response body, can be
+    kept in memory next to it with variant().
+    """
+
+    def __init__(self, max_entries: int = 4096, store_path: Optional[str] = None):
+        """
+        Args:
+            max_entries (int): Maximum entries kept in memory
+            store_path (str, optional): SQLite file backing the cache
+        """
+        self.max_entries = max_entries
+        self.store_path = store_path
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[str, float]]" = OrderedDict()
+        # key -> (created_at of the entry they were built from, {name: bytes})
+        self._variants: Dict[Tuple[str, int], Tuple[float, Dict[str, bytes]]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+        if store_path:
+            conn = self._connection()
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS recommendations (
+                    profile_id TEXT NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    html TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (profile_id, bucket)
+                )
+            ''')
+            conn.commit()
+
+    def get(self, profile_id: str, bucket: int) -> Optional[str]:
+        """
+        Look up a recommendation, falling back to the store on a memory miss.
+
+        Args:
+            profile_id (str): Patient profile identifier
+            bucket (int): Score bucket from score_bucket
+
+        Returns:
+            str: Rendered recommendation, or None if it has not been computed
+        """
+        entry = self.get_entry(profile_id, bucket)
+        return entry[0] if entry else None
+
+    def get_entry(self, profile_id: str, bucket: int) -> Optional[Tuple[str, float]]:
+        """Like get, but also returns the entry's creation time (epoch seconds)."""
+        key = (profile_id, bucket)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                CACHE_HITS.inc(cache="memory")
+                return entry
+        CACHE_MISSES.inc(cache="memory")
+
+        if not self.store_path:
+            return None
+        row = self._connection().execute(
+            'SELECT html, created_at FROM recommendations WHERE profile_id = ? AND bucket = ?',
+            key
+        ).fetchone()
+        if row is None:
+            CACHE_MISSES.inc(cache="store")
+            return None
+        CACHE_HITS.inc(cache="store")
+        self._remember(key, (row[0], row[1]))
+        return row[0], row[1]
+
+    def contains(self, profile_id: str, bucket: int) -> bool:
+        """Check for an entry without touching LRU order or hit counters."""
+        key = (profile_id, bucket)
+        with self._lock:
+            if key in self._entries:
+                return True
+        if not self.store_path:
+            return False
+        row = self._connection().execute(
+            'SELECT 1 FROM recommendations WHERE profile_id = ? AND bucket = ?',
+            key
+        ).fetchone()
+        return row is not None
+
+    def variant(
+        self,
+        profile_id: str,
+        bucket: int,
+        created_at: float,
+        name: str,
+        build: Callable[[], bytes]
+    ) -> bytes:
+        """
+        Return a derived form of an entry, building it on first use.
+
+        Variants are kept in memory only, and dropped when their entry is
+        replaced or evicted. A variant of an entry that is no longer current
+        is built but not kept.
+
+        Args:
+            profile_id (str): Patient profile identifier
+            bucket (int): Score bucket from score_bucket
+            created_at (float): Creation time of the entry the variant derives from
+            name (str): Variant name, e.g. 'gzip'
+            build (Callable[[], bytes]): Builds the variant on a miss
+
+        Returns:
+            bytes: The variant
+        """
+        key = (profile_id, bucket)
+        with self._lock:
+            stored = self._variants.get(key)
+            if stored is not None and stored[0] == created_at and name in stored[1]:
+                return stored[1][name]
+
+        # Built outside the lock; a concurrent build of the same variant is harmless
+        value = build()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] == created_at:
+                stored = self._variants.get(key)
+                if stored is None or stored[0] != created_at:
+                    stored = self._variants[key] = (created_at, {})
+                stored[1][name] = value
+        return value
+
+    def put(self, profile_id: str, bucket: int, html: str) -> float:
+        """
+        Store a rendered recommendation.
+
+        Args:
+            profile_id (str): Patient profile identifier
+            bucket (int): Score bucket from score_bucket
+            html (str): Rendered recommendation
+
+        Returns:
+            float: Creation time recorded for the entry
+        """
+        key = (profile_id, bucket)
+        entry = (html, time.time())
+        self._remember(key, entry)
+        if self.store_path:
+            conn = self._connection()
+            conn.execute(
+                'INSERT OR REPLACE INTO recommendations (profile_id, bucket, html, created_at) VALUES (?, ?, ?, ?)',
+                (profile_id, bucket, html, entry[1])
+            )
+            conn.commit()
+        return entry[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remember(self, key: Tuple[str, int], entry: Tuple[str, float]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            stored = self._variants.get(key)
+            if stored is not None and stored[0] != entry[1]:
+                del self._variants[key]
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._variants.pop(evicted, None)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.store_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
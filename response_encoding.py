@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+from typing import Callable, Optional
+from flask import Request, Response
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies smaller than this are not worth the compression overhead
+MIN_COMPRESS_BYTES = 512
+
+
+def negotiate_encoding(req: Request) -> Optional[str]:
+    """Pick 'br' or 'gzip' from the request's Accept-Encoding, or None."""
+    if brotli is not None and req.accept_encodings.quality('br') > 0:
+        return 'br'
+    if req.accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def strong_etag(body: bytes) -> str:
+    """Entity tag for an uncompressed body; identical bodies share a tag."""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def compress(body: bytes, encoding: Optional[str]) -> bytes:
+    """Encode a body as 'br' or 'gzip'; None returns it unchanged."""
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return body
+
+
+def if_none_match(req: Request, base_tag: str) -> Optional[str]:
+    """
+    Find the request's If-None-Match tag for any encoding of a representation.
+
+    Args:
+        req (Request): Incoming request
+        base_tag (str): Tag of the uncompressed representation
+
+    Returns:
+        str: The matching tag, or None if the client has no copy
+    """
+    for tag in req.if_none_match.as_set():
+        if tag.split('-', 1)[0] == base_tag:
+            return tag
+    return None
+
+
+def not_modified(etag: str) -> Response:
+    """Empty 304 for the variant the client already holds."""
+    response = Response(status=304)
+    _set_cache_headers(response, etag)
+    return response
+
+
+def variant_response(
+    req: Request,
+    base_tag: str,
+    variant: Callable[[Optional[str]], bytes],
+    content_type: str,
+    status: int = 200
+) -> Response:
+    """
+    Build a compressed response for a representation identified by base_tag.
+
+    Compressed variants get the encoding appended to the tag, since a strong
+    ETag must identify the exact bytes sent.
+
+    Args:
+        req (Request): Incoming request
+        base_tag (str): Tag of the uncompressed representation
+        variant (Callable[[Optional[str]], bytes]): Returns the body in an
+            encoding ('br', 'gzip', or None for uncompressed), so callers can
+            serve cached variants instead of compressing again
+        content_type (str): Content-Type of the body
+        status (int): Status code
+
+    Returns:
+        Response: Full response with the negotiated encoding
+    """
+    body = variant(None)
+    encoding = negotiate_encoding(req) if len(body) >= MIN_COMPRESS_BYTES else None
+    if encoding:
+        body = variant(encoding)
+    response = Response(body, status=status, content_type=content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    _set_cache_headers(response, f"{base_tag}-{encoding}" if encoding else base_tag)
+    return response
+
+
+def encoded_response(
+    req: Request,
+    body: bytes,
+    content_type: str,
+    status: int = 200,
+    conditional: bool = False
+) -> Response:
+    """
+    Build a compressed response tagged with a hash of its body.
+
+    If conditional is set and the request's If-None-Match names any variant
+    of the same body, the response is an empty 304. Responses whose version
+    is known without the body should use if_none_match and variant_response
+    directly, so a 304 costs neither rendering nor compression.
+
+    Args:
+        req (Request): Incoming request
+        body (bytes): Uncompressed body
+        content_type (str): Content-Type of the body
+        status (int): Status code for a full response
+        conditional (bool): Honour If-None-Match; only valid for GET and HEAD
+
+    Returns:
+        Response: 200 (or status) with the body, or 304
+    """
+    base_tag = strong_etag(body)
+    if conditional:
+        matched = if_none_match(req, base_tag)
+        if matched is not None:
+            return not_modified(matched)
+    return variant_response(req, base_tag, lambda encoding: compress(body, encoding), content_type, status)
+
+
+def _set_cache_headers(response: Response, etag: str) -> None:
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Let the browser keep the body but revalidate it on every use
+    response.headers['Cache-Control'] = 'private, no-cache'
@@ -0,0 +1,261 @@
+import argparse
+import codecs
+import json
+import time
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+# Longest single entry accepted, in characters. Sahha entries are well under
+# a kilobyte; anything longer means the export is malformed.
+MAX_ENTRY_SIZE = 1 << 20
+
+_WHITESPACE = " \t\n\r"
+
+
+@dataclass
+class IngestStats:
+    entries: int = 0
+    bytes_read: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    finished: Optional[float] = None
+
+    @property
+    def seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def entries_per_second(self) -> float:
+        return self.entries / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.bytes_read / (1024 * 1024) / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.entries} entries, {self.bytes_read / (1024 * 1024):.1f} MB in {self.seconds:.2f}s "
+            f"({self.entries_per_second:,.0f} entries/s, {self.megabytes_per_second:.1f} MB/s)"
+        )
+
+
+def iter_score_entries(
+    source: Union[str, BinaryIO],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    stats: Optional[IngestStats] = None,
+    max_entry_size: int = MAX_ENTRY_SIZE
+) -> Iterator[Dict]:
+    """
+    Yield the entries of a Sahha score export one at a time.
+
+    The export is a single JSON array. It is read in fixed-size chunks and
+    each element is decoded as soon as it is complete, so memory use depends
+    on the largest entry rather than on the size of the file. An entry that
+    still fails to parse after max_entry_size characters is rejected rather
+    than buffered until the end of the file.
+
+    Args:
+        source (str or BinaryIO): Path to the export, or a file opened in binary mode
+        chunk_size (int): Bytes read per chunk
+        stats (IngestStats, optional): Updated with entry and byte counts as parsing progresses
+        max_entry_size (int): Longest entry accepted, in characters
+
+    Yields:
+        Dict: One score entry
+
+    Raises:
+        ValueError: If the export is not a JSON array, is truncated or has an oversized entry
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            yield from iter_score_entries(f, chunk_size, stats, max_entry_size)
+        return
+
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        chunk = source.read(chunk_size)
+        if stats is not None:
+            stats.bytes_read += len(chunk)
+        if not chunk:
+            buffer = buffer[pos:] + text_decoder.decode(b"", final=True)
+            pos = 0
+            eof = True
+            return False
+        buffer = buffer[pos:] + text_decoder.decode(chunk)
+        pos = 0
+        return True
+
+    def skip_whitespace() -> None:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof or not fill():
+                return
+
+    skip_whitespace()
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise ValueError("Sahha export must be a JSON array")
+    pos += 1
+
+    while True:
+        skip_whitespace()
+        if pos >= len(buffer):
+            raise ValueError("Sahha export ended before the closing ']'")
+        if buffer[pos] == ']':
+            break
+        if buffer[pos] == ',':
+            pos += 1
+            continue
+
+        while True:
+            try:
+                entry, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise ValueError(f"Invalid JSON in Sahha export near offset {pos}")
+                if len(buffer) - pos > max_entry_size:
+                    raise ValueError(
+                        f"Sahha export entry near offset {pos} is longer than {max_entry_size} characters"
+                    )
+                fill()
+                continue
+            if end == len(buffer) and not eof and not isinstance(entry, (dict, list)):
+                # A scalar at the end of the buffer may continue in the next chunk
+                fill()
+                continue
+            break
+
+        pos = end
+        if stats is not None:
+            stats.entries += 1
+        yield entry
+
+    if stats is not None:
+        stats.finished = time.perf_counter()
+
+
+def iter_batches(entries: Iterable[Dict], batch_size: int = 1000) -> Iterator[List[Dict]]:
+    """
+    Group entries into lists of at most `batch_size`.
+
+    Args:
+        entries (Iterable[Dict]): Score entries, e.g. from iter_score_entries
+        batch_size (int): Maximum entries per batch
+
+    Yields:
+        List[Dict]: Batch of entries
+    """
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@dataclass
+class ScoreAggregate:
+    count: int = 0
+    total: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+    latest_score: Optional[float] = None
+    latest_time: Optional[str] = None
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    def add(self, score: Optional[float], score_time: Optional[str]) -> None:
+        if score is None:
+            return
+        self.count += 1
+        self.total += score
+        self.minimum = score if self.minimum is None else min(self.minimum, score)
+        self.maximum = score if self.maximum is None else max(self.maximum, score)
+        # ISO-8601 timestamps in one export share a format, so they compare as strings
+        if score_time is not None and (self.latest_time is None or score_time >= self.latest_time):
+            self.latest_time = score_time
+            self.latest_score = score
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.minimum,
+            "max": self.maximum,
+            "latest_score": self.latest_score,
+            "latest_time": self.latest_time
+        }
+
+
+class ScoreAggregator:
+    """Running aggregates per (profileId, type), sized by key count rather than entry count."""
+
+    def __init__(self):
+        self.aggregates: Dict[Tuple[str, str], ScoreAggregate] = {}
+
+    def add(self, entry: Dict) -> None:
+        key = (entry.get('profileId'), entry.get('type'))
+        aggregate = self.aggregates.get(key)
+        if aggregate is None:
+            aggregate = self.aggregates[key] = ScoreAggregate()
+        aggregate.add(entry.get('score'), entry.get('scoreDateTime'))
+
+    def add_batch(self, entries: Iterable[Dict]) -> None:
+        for entry in entries:
+            self.add(entry)
+
+    def get(self, profile_id: str, score_type: str) -> Optional[ScoreAggregate]:
+        return self.aggregates.get((profile_id, score_type))
+
+    def by_profile(self) -> Dict[str, Dict[str, Dict]]:
+        result: Dict[str, Dict[str, Dict]] = {}
+        for (profile_id, score_type), aggregate in self.aggregates.items():
+            result.setdefault(profile_id, {})[score_type] = aggregate.to_dict()
+        return result
+
+
+def ingest_export(
+    path: str,
+    aggregator: Optional[ScoreAggregator] = None,
+    batch_size: int = 1000,
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Tuple[ScoreAggregator, IngestStats]:
+    """
+    Stream an export into per-profile, per-type aggregates.
+
+    Args:
+        path (str): Path to the Sahha export
+        aggregator (ScoreAggregator, optional): Aggregator to add to
+        batch_size (int): Entries handed to the aggregator at a time
+        chunk_size (int): Bytes read per chunk
+
+    Returns:
+        Tuple[ScoreAggregator, IngestStats]: Aggregates and throughput
+    """
+    aggregator = aggregator or ScoreAggregator()
+    stats = IngestStats()
+    for batch in iter_batches(iter_score_entries(path, chunk_size, stats), batch_size):
+        aggregator.add_batch(batch)
+    return aggregator, stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Aggregate a Sahha score export with bounded memory.")
+    parser.add_argument("export", help="Path to the Sahha JSON export")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    aggregator, stats = ingest_export(args.export, batch_size=args.batch_size)
+    print(json.dumps(aggregator.by_profile(), indent=2))
+    print(f"Ingested {stats.summary()}")
@@ -0,0 +1,336 @@
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# File layout:
+#   0   8 bytes   magic
+#   8   uint64    number of records
+#   16  uint32    length of the JSON header
+#   20  ...       JSON header (profile id, score type, factor names)
+#   HEADER_SIZE   records: int64 epoch seconds, float32 score, float32 per factor
+# The header is padded to a page so the record array is page-aligned and
+# worker processes mapping the same file share its pages.
+MAGIC = b"MSCORE01"
+HEADER_SIZE = 4096
+_COUNT = struct.Struct("<Q")
+_HEADER_LEN = struct.Struct("<I")
+
+
+def record_dtype(factor_names: Sequence[str]) -> np.dtype:
+    """Fixed-width record type for a series with the given factor columns."""
+    return np.dtype(
+        [("timestamp", "<i8"), ("score", "<f4")] +
+        [(f"factor_{i}", "<f4") for i in range(len(factor_names))]
+    )
+
+
+def to_epoch(score_time: str) -> int:
+    """Convert a Sahha scoreDateTime (ISO-8601, UTC when no offset is given) to epoch seconds."""
+    parsed = datetime.fromisoformat(score_time.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+class ScoreSeries:
+    """
+    Memory-mapped score history for one profile and score type.
+
+    Records are sorted by timestamp. `records`, `timestamps`, `scores` and
+    `factor()` are zero-copy NumPy views into the mapped file.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open an existing series read-only.
+
+        Args:
+            path (str): Series file created with ScoreSeries.create
+
+        Raises:
+            ValueError: If the file is not a score series
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+        if len(header) < HEADER_SIZE or header[:8] != MAGIC:
+            raise ValueError(f"{path} is not a score series file")
+        (header_len,) = _HEADER_LEN.unpack_from(header, 16)
+        meta = json.loads(header[20:20 + header_len])
+
+        self.profile_id: str = meta["profile_id"]
+        self.score_type: str = meta["score_type"]
+        self.factor_names: List[str] = meta["factor_names"]
+        self.dtype = record_dtype(self.factor_names)
+        self._factor_index = {name: i for i, name in enumerate(self.factor_names)}
+        self._mmap: Optional[mmap.mmap] = None
+        self.records = np.empty(0, dtype=self.dtype)
+        self._map()
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        profile_id: str,
+        score_type: str,
+        factor_names: Sequence[str] = ()
+    ) -> "ScoreSeries":
+        """
+        Create an empty series file.
+
+        Args:
+            path (str): File to create
+            profile_id (str): Sahha profileId
+            score_type (str): Score type, e.g. 'wellbeing'
+            factor_names (Sequence[str]): Factor columns stored with each score
+
+        Returns:
+            ScoreSeries: The opened, empty series
+        """
+        meta = json.dumps({
+            "profile_id": profile_id,
+            "score_type": score_type,
+            "factor_names": list(factor_names)
+        }).encode("utf-8")
+        if 20 + len(meta) > HEADER_SIZE:
+            raise ValueError("Too many factor columns for the series header")
+
+        header = bytearray(HEADER_SIZE)
+        header[:8] = MAGIC
+        _COUNT.pack_into(header, 8, 0)
+        _HEADER_LEN.pack_into(header, 16, len(meta))
+        header[20:20 + len(meta)] = meta
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'xb') as f:
+            f.write(header)
+        return cls(path)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.records["timestamp"]
+
+    @property
+    def scores(self) -> np.ndarray:
+        return self.records["score"]
+
+    def factor(self, name: str) -> np.ndarray:
+        """Zero-copy view of one factor column; missing values are NaN."""
+        return self.records[f"factor_{self._factor_index[name]}"]
+
+    def between(self, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """
+        Records with start <= timestamp < end, found by binary search.
+
+        Args:
+            start (int, optional): Inclusive lower bound, epoch seconds
+            end (int, optional): Exclusive upper bound, epoch seconds
+
+        Returns:
+            np.ndarray: View of the matching records
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.timestamps, start, side="left"))
+        hi = len(self.records) if end is None else int(np.searchsorted(self.timestamps, end, side="left"))
+        return self.records[lo:hi]
+
+    def append(
+        self,
+        timestamps: Sequence[int],
+        scores: Sequence[float],
+        factors: Optional[Dict[str, Sequence[Optional[float]]]] = None
+    ) -> int:
+        """
+        Append records that are newer than everything already stored.
+
+        Records are written before the record count is updated, so a crash
+        mid-append leaves the previous contents intact.
+
+        Args:
+            timestamps (Sequence[int]): Epoch seconds, non-decreasing
+            scores (Sequence[float]): One score per timestamp
+            factors (Dict[str, Sequence], optional): Factor name to values; unknown names are ignored
+
+        Returns:
+            int: Number of records appended
+
+        Raises:
+            ValueError: If timestamps are unsorted or older than the last stored record
+        """
+        new = np.zeros(len(timestamps), dtype=self.dtype)
+        if not len(new):
+            return 0
+        new["timestamp"] = timestamps
+        new["score"] = scores
+        for name, index in self._factor_index.items():
+            values = (factors or {}).get(name)
+            column = f"factor_{index}"
+            if values is None:
+                new[column] = np.nan
+            else:
+                new[column] = [np.nan if v is None else v for v in values]
+
+        if np.any(np.diff(new["timestamp"]) < 0):
+            raise ValueError("Appended timestamps must be sorted")
+        if len(self.records) and new["timestamp"][0] < self.records["timestamp"][-1]:
+            raise ValueError("Appended timestamps must not be older than the stored series")
+
+        count = len(self.records) + len(new)
+        with open(self.path, 'r+b') as f:
+            f.seek(HEADER_SIZE + len(self.records) * self.dtype.itemsize)
+            f.write(new.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(8)
+            f.write(_COUNT.pack(count))
+        self._map()
+        return len(new)
+
+    def close(self) -> None:
+        self.records = np.empty(0, dtype=self.dtype)
+        self._release()
+
+    def _map(self) -> None:
+        with open(self.path, 'rb') as f:
+            (count,) = _COUNT.unpack(f.read(16)[8:])
+            size = os.fstat(f.fileno()).st_size
+            # Ignore a partially written tail beyond the committed record count
+            count = min(count, (size - HEADER_SIZE) // self.dtype.itemsize)
+            self._release()
+            if count == 0:
+                self.records = np.empty(0, dtype=self.dtype)
+                return
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.records = np.frombuffer(self._mmap, dtype=self.dtype, count=count, offset=HEADER_SIZE)
+
+    def _release(self) -> None:
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out earlier still reference the mapping; it is
+                # unmapped once they are garbage collected.
+                pass
+            self._mmap = None
+
+
+class ScoreSeriesStore:
+    """Directory of series files laid out as <root>/<profile_id>/<score_type>.mscore."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._open: Dict[Tuple[str, str], ScoreSeries] = {}
+
+    def path_for(self, profile_id: str, score_type: str) -> str:
+        return os.path.join(self.root, profile_id, f"{score_type}.mscore")
+
+    def get(self, profile_id: str, score_type: str) -> Optional[ScoreSeries]:
+        """Open a series, or return None if it does not exist."""
+        key = (profile_id, score_type)
+        if key not in self._open:
+            path = self.path_for(profile_id, score_type)
+            if not os.path.exists(path):
+                return None
+            self._open[key] = ScoreSeries(path)
+        return self._open[key]
+
+    def ingest(self, entries: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Append Sahha score entries to their series, creating series as needed.
+
+        Series are append-only with one record per timestamp. An entry whose
+        timestamp is already stored, or was just appended, is a duplicate
+        and is skipped; the rule is the same whether the pair arrives in one
+        batch or two, so re-ingesting an export is a no-op. An entry older
+        than the series' last record that is not a duplicate is late: it
+        cannot be inserted, so it is counted and logged. Factor columns are
+        fixed by the first batch that creates a series.
+
+        Args:
+            entries (Iterable[Dict]): Score entries, e.g. from sahha_stream.iter_score_entries
+
+        Returns:
+            Dict[str, int]: Counts of appended, skipped (duplicate) and late entries
+        """
+        grouped: Dict[Tuple[str, str], List[Dict]] = {}
+        for entry in entries:
+            if entry.get("score") is None:
+                continue
+            grouped.setdefault((entry["profileId"], entry["type"]), []).append(entry)
+
+        appended = skipped = late = 0
+        for (profile_id, score_type), group in grouped.items():
+            # Parsed, not string, order: exports mix 'Z' and '+10:00' offsets
+            group.sort(key=lambda e: to_epoch(e["scoreDateTime"]))
+            series = self.get(profile_id, score_type)
+            if series is None:
+                factor_names = [factor["name"] for factor in group[0].get("factors", [])]
+                series = ScoreSeries.create(self.path_for(profile_id, score_type), profile_id, score_type, factor_names)
+                self._open[(profile_id, score_type)] = series
+
+            stored = series.timestamps
+            last = int(stored[-1]) if len(stored) else None
+            timestamps, scores, factors = [], [], {name: [] for name in series.factor_names}
+            series_late = 0
+            for entry in group:
+                timestamp = to_epoch(entry["scoreDateTime"])
+                if last is not None and timestamp <= last:
+                    # The group is sorted, so only stored records can be newer than this one
+                    index = np.searchsorted(stored, timestamp)
+                    if timestamp == last or (index < len(stored) and stored[index] == timestamp):
+                        skipped += 1
+                    else:
+                        series_late += 1
+                    continue
+                values = {factor["name"]: factor.get("score") for factor in entry.get("factors", [])}
+                timestamps.append(timestamp)
+                scores.append(entry["score"])
+                for name in series.factor_names:
+                    factors[name].append(values.get(name))
+                last = timestamp
+            appended += series.append(timestamps, scores, factors)
+            if series_late:
+                logger.warning(
+                    "Dropped %d %s entries for profile %s older than its last stored score",
+                    series_late, score_type, profile_id
+                )
+                late += series_late
+
+        return {"appended": appended, "skipped": skipped, "late": late}
+
+    def close(self) -> None:
+        for series in self._open.values():
+            series.close()
+        self._open.clear()
+
+
+if __name__ == '__main__':
+    from sahha_stream import IngestStats, iter_batches, iter_score_entries
+
+    parser = argparse.ArgumentParser(description="Convert a Sahha export into memory-mapped score series.")
+    parser.add_argument("export", help="Path to the Sahha JSON export")
+    parser.add_argument("store", help="Directory for the series files")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    args = parser.parse_args()
+
+    store = ScoreSeriesStore(args.store)
+    stats = IngestStats()
+    totals = {"appended": 0, "skipped": 0, "late": 0}
+    for batch in iter_batches(iter_score_entries(args.export, stats=stats), args.batch_size):
+        for key, count in store.ingest(batch).items():
+            totals[key] += count
+    store.close()
+    print(f"Appended {totals['appended']}, skipped {totals['skipped']} duplicates, "
+          f"dropped {totals['late']} late entries; read {stats.summary()}")
@@ -0,0 +1,129 @@
+import math
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_HALF_LIVES = (3, 7, 30)
+DEFAULT_WINDOWS = (7, 30)
+
+
+class StreamingScoreStats:
+    """
+    Running statistics over a score series, updated in O(1) per new score.
+
+    Tracks the count, mean and variance (Welford), the latest score, EWMAs at
+    several half-lives and means over fixed trailing windows. Trend and tone
+    classification read these instead of rescanning the history, so their
+    cost does not depend on how long the history is.
+    """
+
+    def __init__(
+        self,
+        half_lives: Sequence[float] = DEFAULT_HALF_LIVES,
+        windows: Sequence[int] = DEFAULT_WINDOWS
+    ):
+        """
+        Args:
+            half_lives (Sequence[float]): EWMA half-lives, in observations
+            windows (Sequence[int]): Trailing window sizes, in observations
+        """
+        self.count = 0
+        self.total = 0.0
+        self.last: Optional[float] = None
+        self._welford_mean = 0.0
+        self._m2 = 0.0
+        self._alphas = {h: 1 - 0.5 ** (1 / h) for h in half_lives}
+        self._ewma: Dict[float, Optional[float]] = {h: None for h in half_lives}
+        self._windows: Dict[int, Deque[float]] = {w: deque(maxlen=w) for w in windows}
+        self._window_sums: Dict[int, float] = {w: 0.0 for w in windows}
+
+    @classmethod
+    def from_scores(cls, scores: Iterable[float], **kwargs) -> "StreamingScoreStats":
+        """Build statistics from scores in chronological order."""
+        stats = cls(**kwargs)
+        for score in scores:
+            stats.update(score)
+        return stats
+
+    @classmethod
+    def from_entries(cls, entries: Iterable[Dict], score_type: str = "wellbeing", **kwargs) -> "StreamingScoreStats":
+        """
+        Build statistics from Sahha score entries of one type.
+
+        Only (scoreDateTime, score) pairs of the wanted type are kept while
+        ordering them, so a streamed export is never held as a list of dicts.
+
+        Args:
+            entries (Iterable[Dict]): Sahha score entries, in any order
+            score_type (str): Entry type to keep
+
+        Returns:
+            StreamingScoreStats: Statistics over the entries' scores by scoreDateTime
+        """
+        selected: List[Tuple[str, float]] = [
+            (entry['scoreDateTime'], entry['score'])
+            for entry in entries
+            if entry['type'] == score_type
+        ]
+        # Stable on equal timestamps, like sorting the entries themselves
+        selected.sort(key=lambda pair: pair[0])
+        return cls.from_scores((score for _, score in selected), **kwargs)
+
+    def update(self, score: float) -> None:
+        """Add the next score in chronological order."""
+        self.count += 1
+        self.total += score
+        self.last = score
+
+        delta = score - self._welford_mean
+        self._welford_mean += delta / self.count
+        self._m2 += delta * (score - self._welford_mean)
+
+        for half_life, alpha in self._alphas.items():
+            previous = self._ewma[half_life]
+            self._ewma[half_life] = score if previous is None else previous + alpha * (score - previous)
+
+        for size, window in self._windows.items():
+            if len(window) == size:
+                self._window_sums[size] -= window[0]
+            window.append(score)
+            self._window_sums[size] += score
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.total / self.count if self.count else None
+
+    @property
+    def mean_before_last(self) -> Optional[float]:
+        """Mean of every score except the latest one."""
+        if self.count < 2:
+            return None
+        return (self.total - self.last) / (self.count - 1)
+
+    @property
+    def variance(self) -> Optional[float]:
+        """Sample variance."""
+        return self._m2 / (self.count - 1) if self.count > 1 else None
+
+    @property
+    def stddev(self) -> Optional[float]:
+        variance = self.variance
+        return math.sqrt(variance) if variance is not None else None
+
+    def ewma(self, half_life: float) -> Optional[float]:
+        """Exponentially weighted mean with the given half-life, in observations."""
+        return self._ewma[half_life]
+
+    def rolling_mean(self, window: int) -> Optional[float]:
+        """Mean of the last `window` scores, or of all scores if there are fewer."""
+        values = self._windows[window]
+        return self._window_sums[window] / len(values) if values else None
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "stddev": self.stddev,
+            "last": self.last,
+            "ewma": {f"half_life_{h:g}": value for h, value in self._ewma.items()},
+            "rolling_mean": {f"last_{w}": self.rolling_mean(w) for w in self._windows},
+        }
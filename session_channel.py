@@ -0,0 +1,167 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from metrics import SLIDER_UPDATES
+
+# run(session_id, profile_id, value, checkpoint) -> rendered HTML
+PipelineRunner = Callable[[str, str, float, Callable[[], None]], str]
+
+
+class SessionCancelled(Exception):
+    """Raised at a pipeline checkpoint once a newer value arrived for the session."""
+
+
+class SliderSession:
+    """
+    Latest-wins processing of one dashboard session's slider values.
+
+    At most one pipeline runs per session. Values that arrive while it runs
+    replace each other, so only the newest is processed next, and the running
+    pipeline stops at its next checkpoint. A checkpoint is never placed after
+    the LLM call: a plan that has been paid for is still cached, it is just
+    not pushed to the browser.
+    """
+
+    def __init__(self, session_id: str, run: PipelineRunner, executor: ThreadPoolExecutor):
+        self.session_id = session_id
+        self.generation = 0
+        self.last_active = time.monotonic()
+        # Open event streams; only changed under the hub lock, which _reap reads it under
+        self.listeners = 0
+        self.events: "queue.Queue[Tuple[str, Dict]]" = queue.Queue(maxsize=16)
+        self._run = run
+        self._executor = executor
+        self._latest: Optional[Tuple[int, str, float]] = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    def submit(self, profile_id: str, value: float) -> int:
+        """
+        Make a value the session's latest and process it as soon as possible.
+
+        Returns:
+            int: Generation number of the value, echoed in its result event
+        """
+        with self._lock:
+            self.generation += 1
+            if self._latest is not None:
+                SLIDER_UPDATES.inc(outcome="superseded")
+            self._latest = (self.generation, profile_id, value)
+            self.last_active = time.monotonic()
+            start = not self._running
+            self._running = True
+            generation = self.generation
+        SLIDER_UPDATES.inc(outcome="submitted")
+        if start:
+            self._executor.submit(self._drain)
+        return generation
+
+    def checkpoint(self, generation: int) -> None:
+        """Raise SessionCancelled if a newer value has been submitted."""
+        if generation != self.generation:
+            raise SessionCancelled()
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                if self._latest is None:
+                    self._running = False
+                    return
+                generation, profile_id, value = self._latest
+                self._latest = None
+
+            try:
+                html = self._run(self.session_id, profile_id, value, lambda: self.checkpoint(generation))
+            except SessionCancelled:
+                SLIDER_UPDATES.inc(outcome="cancelled")
+                continue
+            except Exception as e:
+                if generation == self.generation:
+                    self._push('error', {'generation': generation, 'value': value, 'error': str(e)})
+                SLIDER_UPDATES.inc(outcome="failed")
+                continue
+
+            if generation == self.generation:
+                self._push('result', {'generation': generation, 'value': value, 'html': html})
+                SLIDER_UPDATES.inc(outcome="delivered")
+            else:
+                SLIDER_UPDATES.inc(outcome="cancelled")
+
+    def _push(self, event: str, data: Dict) -> None:
+        # Only the newest result matters; drop the oldest if nobody is reading
+        while True:
+            try:
+                self.events.put_nowait((event, data))
+                return
+            except queue.Full:
+                try:
+                    self.events.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class SessionHub:
+    """Slider sessions by id, sharing one worker pool."""
+
+    def __init__(self, run: PipelineRunner, max_workers: int = 4, idle_timeout: float = 600.0):
+        """
+        Args:
+            run (PipelineRunner): Runs the pipeline, calling checkpoint between stages
+            max_workers (int): Sessions processed at the same time
+            idle_timeout (float): Seconds before a session without listeners is dropped
+        """
+        self.run = run
+        self.idle_timeout = idle_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slider")
+        self._sessions: Dict[str, SliderSession] = {}
+        self._lock = threading.Lock()
+
+    def session(self, session_id: str) -> SliderSession:
+        with self._lock:
+            return self._get_or_create(session_id)
+
+    def stream(self, session_id: str, keepalive: float = 15.0) -> Iterator[str]:
+        """
+        Yield a session's events as server-sent event text until the client leaves.
+
+        Args:
+            session_id (str): Dashboard session
+            keepalive (float): Seconds between comment lines that keep proxies from timing out
+
+        Yields:
+            str: SSE frames
+        """
+        # Attached in the same critical section that finds the session, so it
+        # cannot be reaped in between
+        with self._lock:
+            session = self._get_or_create(session_id)
+            session.listeners += 1
+        try:
+            yield 'retry: 2000\n\n'
+            while True:
+                try:
+                    event, data = session.events.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event}\nid: {data['generation']}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            with self._lock:
+                session.listeners -= 1
+                session.last_active = time.monotonic()
+
+    def _get_or_create(self, session_id: str) -> SliderSession:
+        self._reap()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = SliderSession(session_id, self.run, self._executor)
+        return session
+
+    def _reap(self) -> None:
+        cutoff = time.monotonic() - self.idle_timeout
+        for session_id, session in list(self._sessions.items()):
+            if session.listeners == 0 and session.last_active < cutoff:
+                del self._sessions[session_id]
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import pickle
+from typing import Callable, Optional, TypeVar
+
+SNAPSHOT_DIR = os.getenv('MERIDIAN_SNAPSHOT_DIR', '.snapshots')
+# Bump when the parsed classes change shape so old snapshots are rebuilt
+SNAPSHOT_VERSION = 2
+
+T = TypeVar('T')
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def snapshot_path(parser: Callable, source_path: str, snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    """Snapshot file for one source file parsed by one parser."""
+    key = f"{parser.__module__}.{parser.__qualname__}:{os.path.abspath(source_path)}"
+    return os.path.join(snapshot_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pickle')
+
+
+def load_cached(parser: Callable[[str], T], source_path: str, snapshot_dir: Optional[str] = SNAPSHOT_DIR) -> T:
+    """
+    Parse a source file, or load the result from its snapshot if still valid.
+
+    A snapshot holds a small header (format version, source path, mtime,
+    size and SHA-256) followed by the pickled object. If mtime and size
+    match, the object is loaded without reading the source at all. If only
+    they changed, the content hash decides, so touched but unchanged files
+    keep their snapshot. Snapshots are local caches of trusted files; never
+    point snapshot_dir at data from elsewhere, since loading unpickles it.
+
+    Args:
+        parser (Callable[[str], T]): Builds the object from a path, e.g. HealthAssessment
+        source_path (str): File to parse
+        snapshot_dir (str, optional): Snapshot directory; None disables snapshots
+
+    Returns:
+        T: Parsed object
+    """
+    if snapshot_dir is None:
+        return parser(source_path)
+
+    path = snapshot_path(parser, source_path, snapshot_dir)
+    stat = os.stat(source_path)
+    source_hash = None
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header['version'] == SNAPSHOT_VERSION:
+                if (header['mtime_ns'], header['size']) == (stat.st_mtime_ns, stat.st_size):
+                    return pickle.load(f)
+                source_hash = file_sha256(source_path)
+                if header['sha256'] == source_hash:
+                    obj = pickle.load(f)
+                    _write_snapshot(path, source_path, stat, source_hash, obj)
+                    return obj
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Ignoring unreadable snapshot {path}: {str(e)}")
+
+    obj = parser(source_path)
+    _write_snapshot(path, source_path, stat, source_hash or file_sha256(source_path), obj)
+    return obj
+
+
+def _write_snapshot(path: str, source_path: str, stat: os.stat_result, source_hash: str, obj) -> None:
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'source': os.path.abspath(source_path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': source_hash
+    }
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        # A read-only deployment still works, it just parses every time
+        print(f"Could not write snapshot {path}: {str(e)}")
@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Configuration read at import time by app_pipeline and friends: no network,
+# no background prefetching, and the sample patient shipped with the repo
+os.environ.setdefault('OPEN_AI_API_KEY', 'sk-test')
+os.environ.setdefault('MERIDIAN_DATA_DIR', ROOT)
+os.environ.setdefault('MERIDIAN_PREFETCH_CONCURRENCY', '0')
+os.environ.setdefault('MERIDIAN_SNAPSHOT_DIR', tempfile.mkdtemp(prefix='meridian-snapshots-'))
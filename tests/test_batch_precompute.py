@@ -0,0 +1,28 @@
+import pytest
+from batch_precompute import read_jobs, run_batch
+from recommendation_cache import RecommendationCache
+
+
+def test_out_of_range_scores_are_not_precomputed():
+    cache = RecommendationCache()
+    computed = []
+
+    def compute(profile_id, score):
+        computed.append(score)
+        return "<p>plan</p>"
+
+    result = run_batch([("p1", 1.7), ("p1", -0.2), ("p1", float("nan")), ("p1", 0.5)], compute, cache, max_workers=1)
+
+    assert result["invalid"] == 3
+    assert result["completed"] == 1
+    assert computed == [0.5]
+    assert len(cache) == 1
+
+
+@pytest.mark.parametrize("score", ["1.5", "-0.1", "nan", "high"])
+def test_read_jobs_rejects_bad_scores_by_line(tmp_path, score):
+    path = tmp_path / "jobs.csv"
+    path.write_text(f"profile_id,score\np1,0.5\np2,{score}\n")
+
+    with pytest.raises(ValueError, match=r"jobs\.csv:3"):
+        read_jobs(str(path))
@@ -0,0 +1,67 @@
+import threading
+import pytest
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+
+def _fail():
+    raise RuntimeError("down")
+
+
+def _start_slow_call(breaker, outcome):
+    """Admit a call that finishes, with outcome(), only once released."""
+    admitted, release = threading.Event(), threading.Event()
+
+    def slow():
+        admitted.set()
+        release.wait(timeout=5)
+        return outcome()
+
+    def run():
+        try:
+            breaker.call(slow)
+        except RuntimeError:
+            pass
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert admitted.wait(timeout=5)
+    return release, thread
+
+
+def _open_then_half_open(breaker):
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(RuntimeError):
+            breaker.call(_fail)
+    assert breaker.state == OPEN
+    breaker._opened_at -= breaker.reset_timeout
+
+
+def test_slow_success_from_before_opening_does_not_close_the_circuit():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    release, slow = _start_slow_call(breaker, lambda: "late")
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            breaker.call(_fail)
+
+    release.set()
+    slow.join(timeout=5)
+
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "rejected")
+
+
+def test_late_failure_does_not_admit_a_second_trial():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    release_old, old = _start_slow_call(breaker, _fail)
+    _open_then_half_open(breaker)
+    release_trial, trial = _start_slow_call(breaker, lambda: "ok")
+
+    release_old.set()
+    old.join(timeout=5)
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "second trial")
+
+    release_trial.set()
+    trial.join(timeout=5)
+    assert breaker.state == CLOSED
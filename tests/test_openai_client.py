@@ -0,0 +1,118 @@
+import threading
+import time
+from types import SimpleNamespace
+from llm_routing import HedgePolicy, LatencyRoute
+from metrics import LLM_HEDGES, LLM_REQUESTS
+from openai_client import ERROR_PREFIX, OpenAIClient
+
+
+class FakeCompletions:
+    """Stands in for client.chat.completions; latency and failure are set per model."""
+
+    def __init__(self, latency=None, failing=()):
+        self.latency = latency or {}
+        self.failing = set(failing)
+        self.sent = []
+
+    def create(self, model, **_):
+        self.sent.append(model)
+        time.sleep(self.latency.get(model, 0))
+        if model in self.failing:
+            raise RuntimeError(f"{model} unavailable")
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=model))],
+            usage=None
+        )
+
+
+def _client(completions, **kwargs):
+    client = OpenAIClient(api_key="sk-test", **kwargs)
+    client.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
+
+
+def test_primary_does_not_queue_behind_the_hedge_pool():
+    completions = FakeCompletions(latency={"slow": 5.0})
+    client = _client(
+        completions,
+        hedge=HedgePolicy(percentile=0.5, min_delay=0.05, hedge_model="fast")
+    )
+    for _ in range(10):
+        client.latency.observe("default", "slow", 0.05)
+
+    # Occupy every pool worker; primaries must not wait for them
+    release = threading.Event()
+    for _ in range(32):
+        client._executor().submit(release.wait)
+    try:
+        fired = LLM_HEDGES.get(call_type="default", outcome="fired")
+        start = time.perf_counter()
+        result = [None]
+        caller = threading.Thread(target=lambda: result.__setitem__(0, client.generate_response("hi", model="slow")))
+        caller.start()
+        time.sleep(0.5)
+        assert completions.sent == ["slow"]
+        assert LLM_HEDGES.get(call_type="default", outcome="fired") == fired + 1
+    finally:
+        release.set()
+    caller.join(timeout=5)
+    assert result[0] == "fast"
+    assert time.perf_counter() - start < 2.0
+
+
+def test_errors_are_counted_against_the_routed_model():
+    client = _client(
+        FakeCompletions(failing={"fallback"}),
+        routes={"plan": LatencyRoute(budget=0.01, fallback_model="fallback")}
+    )
+    for _ in range(10):
+        client.latency.observe("plan", "preferred", 1.0)
+    preferred_errors = LLM_REQUESTS.get(model="preferred", status="error")
+    fallback_errors = LLM_REQUESTS.get(model="fallback", status="error")
+
+    response = client.generate_response("hi", model="preferred", call_type="plan")
+
+    assert response.startswith(ERROR_PREFIX)
+    assert LLM_REQUESTS.get(model="preferred", status="error") == preferred_errors
+    assert LLM_REQUESTS.get(model="fallback", status="error") == fallback_errors + 1
+
+
+def test_routed_recording_replays_under_the_requested_model(tmp_path):
+    cassette_path = str(tmp_path / "routed.jsonl.gz")
+    routes = {"plan": LatencyRoute(budget=0.01, fallback_model="fallback")}
+    recorder = _client(FakeCompletions(), mode="record", cassette_path=cassette_path, routes=routes)
+    for _ in range(10):
+        recorder.latency.observe("plan", "preferred", 1.0)
+
+    recorded = recorder.generate_response("hi", model="preferred", call_type="plan")
+    recorder.cassette.close()
+
+    player = OpenAIClient(api_key="sk-test", mode="replay", cassette_path=cassette_path, routes=routes)
+    assert recorded == "fallback"
+    assert player.generate_response("hi", model="preferred", call_type="plan") == recorded
+
+
+def test_hedged_recording_replays_the_answer_the_caller_got(tmp_path):
+    cassette_path = str(tmp_path / "hedged.jsonl.gz")
+    completions = FakeCompletions(latency={"slow": 0.5})
+    recorder = _client(
+        completions,
+        mode="record",
+        cassette_path=cassette_path,
+        hedge=HedgePolicy(percentile=0.5, min_delay=0.05, hedge_model="fast")
+    )
+    for _ in range(10):
+        recorder.latency.observe("default", "slow", 0.05)
+
+    recorded = recorder.generate_response("hi", model="slow")
+    # Let the losing primary finish; it is billed but must not be recorded
+    deadline = time.monotonic() + 5
+    while recorder.latency.percentile("default", "slow", 1.0) < 0.5 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    recorder.cassette.close()
+
+    assert recorded == "fast"
+    assert sorted(completions.sent) == ["fast", "slow"]
+    player = OpenAIClient(api_key="sk-test", mode="replay", cassette_path=cassette_path)
+    for _ in range(3):
+        assert player.generate_response("hi", model="slow") == "fast"
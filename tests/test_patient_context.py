@@ -0,0 +1,21 @@
+import pytest
+import app_pipeline
+from patient_context import PatientContextCache
+
+
+def test_context_is_not_cached_when_an_llm_call_fails(monkeypatch):
+    answers = [f"{app_pipeline.ERROR_PREFIX}rate limited", "Medication interactions"]
+    monkeypatch.setattr(app_pipeline.client, 'generate_response', lambda *args, **kwargs: answers.pop(0))
+    monkeypatch.setattr(app_pipeline.o1_client, 'generate_chat_response', lambda *args, **kwargs: "Breakfast: oats")
+    monkeypatch.setattr(app_pipeline, 'llm_breaker', app_pipeline.CircuitBreaker("test"))
+    contexts = PatientContextCache(app_pipeline.load_patient_context)
+
+    with pytest.raises(RuntimeError):
+        contexts.get(app_pipeline.DEFAULT_PROFILE_ID)
+    assert app_pipeline.DEFAULT_PROFILE_ID not in contexts
+
+    context = contexts.get(app_pipeline.DEFAULT_PROFILE_ID)
+    assert context.interactions == "Medication interactions"
+    assert context.meal_plan == "Breakfast: oats"
+    assert context.wellbeing_stats.count > 0
+    assert not hasattr(context, 'score_history')
@@ -0,0 +1,91 @@
+import threading
+from prefetch import Prefetcher
+from recommendation_cache import RecommendationCache
+
+
+def test_schedule_survives_jobs_finishing_before_their_callbacks_register():
+    # An instant compute often finishes before add_done_callback runs, so
+    # the callback runs inline; schedule must not be holding its lock then
+    prefetcher = Prefetcher(
+        compute=lambda profile_id, score: "<p>plan</p>",
+        cache=RecommendationCache(),
+        max_concurrency=4,
+        radius=3
+    )
+
+    def schedule_many():
+        for step in range(200):
+            prefetcher.schedule("session", f"profile-{step}", 0.5)
+
+    worker = threading.Thread(target=schedule_many, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    prefetcher.shutdown()
+
+    assert not worker.is_alive(), "Prefetcher.schedule deadlocked"
+
+
+def test_cache_lookups_do_not_hold_the_schedule_lock():
+    prefetcher = Prefetcher(
+        compute=lambda profile_id, score: "<p>plan</p>",
+        cache=RecommendationCache(),
+        max_concurrency=1,
+        radius=1
+    )
+    held = []
+    contains = prefetcher.cache.contains
+
+    def checking_contains(profile_id, bucket):
+        held.append(prefetcher._lock.locked())
+        return contains(profile_id, bucket)
+    prefetcher.cache.contains = checking_contains
+
+    prefetcher.schedule("session", "profile", 0.5)
+    prefetcher.shutdown()
+
+    assert held == [False, False]
+
+
+def test_foreground_miss_waits_for_the_running_computation(monkeypatch):
+    import app_pipeline
+    from prefetch import InFlight
+
+    cache = RecommendationCache()
+    in_flight = InFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute(score, profile_id=app_pipeline.DEFAULT_PROFILE_ID, checkpoint=None):
+        calls.append(score)
+        started.set()
+        release.wait(timeout=10)
+        return "<p>plan</p>"
+    monkeypatch.setattr(app_pipeline, 'compute_health_recommendation', compute)
+    monkeypatch.setattr(app_pipeline, 'recommendation_cache', cache)
+    monkeypatch.setattr(app_pipeline, 'in_flight', in_flight)
+    revalidator = Prefetcher(
+        compute=lambda profile_id, score: app_pipeline.compute_health_recommendation(score, profile_id),
+        cache=cache, max_concurrency=1, radius=0, in_flight=in_flight
+    )
+    prefetcher = Prefetcher(
+        compute=lambda profile_id, score: app_pipeline.compute_health_recommendation(score, profile_id),
+        cache=cache, max_concurrency=1, radius=1, in_flight=in_flight
+    )
+
+    assert revalidator.refresh("profile", 50)
+    assert started.wait(timeout=5)
+    result = []
+    foreground = threading.Thread(
+        target=lambda: result.append(app_pipeline.recommendation_entry(0.5, "profile"))
+    )
+    foreground.start()
+    # Neighbours of 0.49 are 48 and 50; 50 is already being computed
+    assert prefetcher.schedule("session", "profile", 0.49) == 1
+    release.set()
+    foreground.join(timeout=10)
+    prefetcher.shutdown()
+    revalidator.shutdown()
+
+    assert result and result[0][1] == "<p>plan</p>"
+    assert result[0][2] == cache.get_entry("profile", 50)[1]
+    assert sorted(calls) == [0.48, 0.5]
@@ -0,0 +1,97 @@
+import pytest
+import app_pipeline
+from app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+@pytest.fixture
+def pipeline_calls(monkeypatch):
+    calls = []
+
+    def compute(score, profile_id=app_pipeline.DEFAULT_PROFILE_ID, checkpoint=None):
+        calls.append((score, profile_id))
+        return "<p>plan</p>"
+    monkeypatch.setattr(app_pipeline, 'compute_health_recommendation', compute)
+    return calls
+
+
+@pytest.mark.parametrize('value', [155, -0.5, 'nan'])
+def test_process_rejects_out_of_range_values(client, pipeline_calls, value):
+    entries = len(app_pipeline.recommendation_cache)
+
+    response = client.post('/process', json={'value': value})
+
+    assert response.status_code == 400
+    assert response.get_json()['status'] == 'error'
+    assert pipeline_calls == []
+    assert len(app_pipeline.recommendation_cache) == entries
+
+
+@pytest.mark.parametrize('score', [1.55, -0.01, float('nan')])
+def test_generate_rejects_scores_outside_unit_interval(pipeline_calls, score):
+    with pytest.raises(ValueError):
+        app_pipeline.generate_health_recommendation(score)
+    assert pipeline_calls == []
+
+
+def test_llm_failure_is_not_rendered_as_a_plan(client, monkeypatch):
+    failure = f"{app_pipeline.ERROR_PREFIX}upstream timed out"
+    monkeypatch.setattr(app_pipeline.client, 'generate_response', lambda *args, **kwargs: failure)
+    monkeypatch.setattr(app_pipeline.o1_client, 'generate_chat_response', lambda *args, **kwargs: failure)
+    monkeypatch.setattr(app_pipeline, 'recommendation_cache', app_pipeline.RecommendationCache())
+    monkeypatch.setattr(app_pipeline, 'llm_breaker', app_pipeline.CircuitBreaker("test"))
+
+    response = client.post('/process', json={'value': 42})
+
+    assert response.status_code == 503
+    body = response.get_json()
+    assert body['status'] == 'error'
+    assert 'results' not in body
+    assert len(app_pipeline.recommendation_cache) == 0
+    assert app_pipeline.DEFAULT_PROFILE_ID not in app_pipeline.patient_contexts
+
+
+def test_conditional_get_answers_304_without_rendering(client, pipeline_calls, monkeypatch):
+    import app as app_module
+    cache = app_pipeline.RecommendationCache()
+    monkeypatch.setattr(app_pipeline, 'recommendation_cache', cache)
+    monkeypatch.setattr(app_module, 'recommendation_cache', cache)
+    renders, compressions = [], []
+    render = app_module.render_fragment
+    monkeypatch.setattr(app_module, 'render_fragment', lambda plan: renders.append(plan) or render(plan) * 50)
+    compress = app_module.compress
+    monkeypatch.setattr(app_module, 'compress', lambda body, encoding: compressions.append(encoding) or compress(body, encoding))
+    url = '/process?value=42&format=html'
+
+    first = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert first.status_code == 200
+    assert first.headers['Content-Encoding'] == 'gzip'
+    etag = first.headers['ETag']
+
+    again = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert again.status_code == 200
+    assert again.data == first.data
+    assert again.headers['ETag'] == etag
+
+    revalidated = client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == etag
+
+    assert len(pipeline_calls) == 1
+    assert len(renders) == 1
+    assert compressions == ['gzip']
+
+
+def test_prefetch_needs_a_session_id(client, pipeline_calls, monkeypatch):
+    import app as app_module
+    sessions = []
+    monkeypatch.setattr(app_module, 'prefetch_neighbours', lambda score, session_id, profile_id: sessions.append(session_id))
+
+    assert client.post('/process', json={'value': 42}).status_code == 200
+    assert client.post('/process', json={'value': 42, 'sessionId': 'tab-1'}).status_code == 200
+
+    assert sessions == ['tab-1']
@@ -0,0 +1,52 @@
+from score_series import ScoreSeriesStore, to_epoch
+
+
+def _entry(score_time, score=0.5):
+    return {'profileId': 'p1', 'type': 'wellbeing', 'scoreDateTime': score_time, 'score': score, 'factors': []}
+
+
+def test_ingest_orders_mixed_utc_offsets_by_instant(tmp_path):
+    store = ScoreSeriesStore(str(tmp_path))
+    # As strings the '+10:00' entry sorts last, but it is the earliest instant
+    entries = [
+        _entry('2024-05-01T01:00:00Z', 0.2),
+        _entry('2024-05-01T09:00:00+10:00', 0.1),
+        _entry('2024-05-01T02:00:00Z', 0.3),
+    ]
+
+    assert store.ingest(entries)['appended'] == 3
+
+    series = store.get('p1', 'wellbeing')
+    assert list(series.timestamps) == sorted(to_epoch(e['scoreDateTime']) for e in entries)
+    assert [round(float(score), 2) for score in series.scores] == [0.1, 0.2, 0.3]
+    store.close()
+
+
+def test_duplicate_timestamps_are_skipped_within_and_across_batches(tmp_path):
+    within = ScoreSeriesStore(str(tmp_path / 'within'))
+    across = ScoreSeriesStore(str(tmp_path / 'across'))
+    first, repeat = _entry('2024-05-01T01:00:00Z', 0.2), _entry('2024-05-01T11:00:00+10:00', 0.9)
+
+    assert within.ingest([first, repeat]) == {'appended': 1, 'skipped': 1, 'late': 0}
+    assert across.ingest([first]) == {'appended': 1, 'skipped': 0, 'late': 0}
+    assert across.ingest([repeat]) == {'appended': 0, 'skipped': 1, 'late': 0}
+
+    for store in (within, across):
+        assert [round(float(score), 2) for score in store.get('p1', 'wellbeing').scores] == [0.2]
+        store.close()
+
+
+def test_late_entries_are_reported_separately_from_duplicates(tmp_path, caplog):
+    store = ScoreSeriesStore(str(tmp_path))
+    store.ingest([_entry('2024-05-01T01:00:00Z'), _entry('2024-05-03T01:00:00Z')])
+
+    result = store.ingest([
+        _entry('2024-05-01T01:00:00Z'),
+        _entry('2024-05-02T01:00:00Z'),
+        _entry('2024-05-04T01:00:00Z'),
+    ])
+
+    assert result == {'appended': 1, 'skipped': 1, 'late': 1}
+    assert 'Dropped 1 wellbeing entries for profile p1' in caplog.text
+    assert len(store.get('p1', 'wellbeing')) == 3
+    store.close()
@@ -0,0 +1,33 @@
+import threading
+from session_channel import SessionHub
+
+
+def test_concurrent_streams_keep_an_exact_listener_count():
+    hub = SessionHub(lambda session_id, profile_id, value, checkpoint: "")
+    streams = [hub.stream("tab", keepalive=0.01) for _ in range(50)]
+    barrier = threading.Barrier(len(streams))
+
+    def open_and_close(stream):
+        barrier.wait()
+        next(stream)
+        stream.close()
+
+    threads = [threading.Thread(target=open_and_close, args=(stream,)) for stream in streams]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert hub._sessions["tab"].listeners == 0
+
+
+def test_session_with_a_listener_is_not_reaped():
+    hub = SessionHub(lambda session_id, profile_id, value, checkpoint: "", idle_timeout=0)
+    stream = hub.stream("tab", keepalive=0.01)
+    next(stream)
+    listening = hub._sessions["tab"]
+
+    hub.session("other")
+
+    assert hub._sessions.get("tab") is listening
+    stream.close()
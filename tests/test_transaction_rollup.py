@@ -0,0 +1,41 @@
+import sqlite3
+import pandas as pd
+from transaction_parser import init_transactions_table, read_transactions_sql, store_transactions
+from transaction_rollup import TransactionRollup
+
+TRANSACTIONS = [
+    {'date': '2024-03-02', 'amount': 12.5, 'category': 'Groceries'},
+    {'date': '2024-03-01', 'amount': 40.0, 'category': 'Travel'},
+    {'date': '2024-03-02', 'amount': 3.25, 'category': None},
+    {'date': '2024-03-05', 'amount': 7.75, 'category': 'Groceries'},
+    {'date': '1969-12-31', 'amount': 1.0, 'category': 'Travel'},
+]
+
+
+def test_add_frame_matches_row_by_row_adds():
+    df = pd.DataFrame(TRANSACTIONS)
+    df['date'] = pd.to_datetime(df['date'])
+    df['amount'] = df['amount'].map(lambda x: f"${x:.2f}")
+
+    vectorised = TransactionRollup.from_frame(df)
+    row_by_row = TransactionRollup.from_transactions(TRANSACTIONS)
+
+    assert vectorised.totals() == row_by_row.totals() == (5, 64.5)
+    assert vectorised.date_range == row_by_row.date_range
+    assert vectorised.category_breakdown() == row_by_row.category_breakdown()
+    # Uncategorised rows are dropped from the breakdown, as value_counts drops NaN
+    assert [category for category, _, _ in vectorised.category_breakdown()] == ['Groceries', 'Travel']
+    assert vectorised.totals('2024-03-02', '2024-03-05', 'Groceries') == (2, 20.25)
+
+
+def test_rollup_fed_on_ingest_matches_one_built_from_sql():
+    conn = sqlite3.connect(':memory:')
+    init_transactions_table(conn)
+    live = TransactionRollup()
+
+    store_transactions(conn, TRANSACTIONS, rollup=live)
+    loaded = TransactionRollup.from_chunks(read_transactions_sql(conn, chunksize=2))
+
+    assert live.totals() == loaded.totals()
+    # The loader reads in date order, so only ties between equal counts may differ
+    assert sorted(live.category_breakdown()) == sorted(loaded.category_breakdown())
@@ -0,0 +1,69 @@
+import json
+from metrics import WEBHOOK_EVENTS
+from webhook_dedup import RecentEventIds
+from webhook_queue import IngestQueue
+from webhook_store import connect, init_db, store_webhooks
+
+
+def _delivery(event_id):
+    payload = json.dumps({'id': event_id, 'type': 'sleep'})
+    return (payload, '{}', '2024-11-01 08:00:00', '127.0.0.1', event_id)
+
+
+def _accept(recent_ids, ingest_queue, event_id):
+    """What webhook_handler does for an async delivery; True if it was queued."""
+    if recent_ids.check_and_add(event_id):
+        return False
+    return ingest_queue.submit(_delivery(event_id))
+
+
+def test_redelivery_is_accepted_after_a_batch_fails(tmp_path):
+    db_path = str(tmp_path / 'webhooks.db')
+    init_db(db_path)
+    recent_ids = RecentEventIds()
+    failing = True
+
+    def store(rows):
+        if failing:
+            raise RuntimeError("disk I/O error")
+        conn = connect(db_path)
+        try:
+            return store_webhooks(conn, rows)
+        finally:
+            conn.close()
+
+    failed_before = WEBHOOK_EVENTS.get(outcome="failed")
+    first = IngestQueue(db_path, store=store, recent_ids=recent_ids, max_attempts=2, retry_delay=0)
+    first.start()
+    assert _accept(recent_ids, first, 'evt-1')
+    first.shutdown()
+    assert WEBHOOK_EVENTS.get(outcome="failed") == failed_before + 1
+
+    # Sahha redelivers the event it never saw stored
+    failing = False
+    second = IngestQueue(db_path, store=store, recent_ids=recent_ids, retry_delay=0)
+    second.start()
+    assert _accept(recent_ids, second, 'evt-1')
+    second.shutdown()
+
+    conn = connect(db_path)
+    stored = conn.execute('SELECT event_id FROM cloud_run_webhooks').fetchall()
+    conn.close()
+    assert stored == [('evt-1',)]
+
+
+def test_failed_batch_is_retried_before_it_is_dropped():
+    attempts = []
+
+    def store(rows):
+        attempts.append(len(rows))
+        if len(attempts) == 1:
+            raise RuntimeError("database is locked")
+        return len(rows)
+
+    ingest_queue = IngestQueue(store=store, recent_ids=RecentEventIds(), max_attempts=3, retry_delay=0)
+    ingest_queue.start()
+    assert ingest_queue.submit(_delivery('evt-2'))
+    ingest_queue.shutdown()
+
+    assert attempts == [1, 1]
@@ -0,0 +1,59 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+import webhook_retention
+from webhook_retention import compact, expired_days
+from webhook_store import connect, init_db, store_webhooks
+
+
+def _store(conn, event_id, received, headers):
+    payload = json.dumps({'id': event_id, 'type': 'sleep'})
+    store_webhooks(conn, [(payload, json.dumps(headers), received, '127.0.0.1', event_id)])
+
+
+def test_compact_drops_only_unused_header_sets_via_the_index(tmp_path):
+    db_path = str(tmp_path / 'webhooks.db')
+    init_db(db_path)
+    conn = connect(db_path)
+    try:
+        _store(conn, 'kept', '2024-11-02 08:00:00', {'User-Agent': 'current'})
+        _store(conn, 'gone', '2024-11-01 08:00:00', {'User-Agent': 'retired'})
+        with conn:
+            conn.execute("DELETE FROM cloud_run_webhooks WHERE event_id = 'gone'")
+
+        plan = ' '.join(row[-1] for row in conn.execute('''
+            EXPLAIN QUERY PLAN
+            SELECT 1 FROM cloud_run_webhooks w WHERE w.headers_hash = 'x'
+        '''))
+        compact(conn)
+
+        assert 'idx_cloud_run_webhooks_headers_hash' in plan
+        remaining = [json.loads(row[0]) for row in conn.execute('SELECT headers FROM webhook_headers')]
+        assert remaining == [{'user-agent': 'current'}]
+    finally:
+        conn.close()
+
+
+def test_expired_days_default_to_the_utc_date(tmp_path, monkeypatch):
+    db_path = str(tmp_path / 'webhooks.db')
+    init_db(db_path)
+    conn = connect(db_path)
+    utc_today = date(2024, 11, 10)
+
+    class FrozenClock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(2024, 11, 10, 0, 30, tzinfo=timezone.utc).astimezone(tz)
+
+    class LocalDate(date):
+        @classmethod
+        def today(cls):
+            # A timezone behind UTC is still on the previous day
+            return utc_today - timedelta(days=1)
+
+    monkeypatch.setattr(webhook_retention, 'datetime', FrozenClock)
+    monkeypatch.setattr(webhook_retention, 'date', LocalDate)
+    try:
+        _store(conn, 'old', '2024-11-08 23:00:00', {})
+        assert expired_days(conn, retention_days=1) == ['2024-11-08']
+    finally:
+        conn.close()
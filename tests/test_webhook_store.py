@@ -0,0 +1,35 @@
+import json
+from webhook_store import connect, init_db, iter_webhooks, store_webhooks
+
+
+def _delivery(event_id, headers):
+    payload = json.dumps({'id': event_id, 'type': 'sleep'})
+    return (payload, json.dumps(headers), '2024-11-01 08:00:00', '127.0.0.1', event_id)
+
+
+def test_per_request_headers_do_not_defeat_header_dedup(tmp_path):
+    db_path = str(tmp_path / 'webhooks.db')
+    init_db(db_path)
+    deliveries = [
+        _delivery(f'evt-{i}', {
+            'Host': 'hooks.example.com',
+            'User-Agent': 'Sahha-Webhooks/1.0',
+            'Content-Type': 'application/json',
+            'Content-Length': str(200 + i),
+            'X-Cloud-Trace-Context': f'trace-{i}',
+            'X-Signature': f'sig-{i}',
+        })
+        for i in range(3)
+    ]
+    conn = connect(db_path)
+    try:
+        assert store_webhooks(conn, deliveries) == 3
+        assert conn.execute('SELECT COUNT(*) FROM webhook_headers').fetchone()[0] == 1
+
+        stored = [json.loads(row[5]) for row in iter_webhooks(conn, include_headers=True)]
+    finally:
+        conn.close()
+
+    for (_, headers, *_), merged in zip(deliveries, stored):
+        expected = {name.lower(): value for name, value in json.loads(headers).items()}
+        assert {name.lower(): value for name, value in merged.items()} == expected
@@ -1,6 +1,21 @@
 import json
+import sqlite3
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from transaction_rollup import TransactionRollup
+from webhook_store import filter_clause
+
+TRANSACTIONS_TABLE = 'transactions'
+CHUNK_SIZE = 10000
+
+# Column types for loaded chunks; dates are parsed to datetime64 separately
+TRANSACTION_DTYPES = {
+    'amount': 'float64',
+    'merchant': 'string',
+    'category': 'string',
+    'termText': 'string'
+}
 
 def parse_transactions(json_data):
     """
@@ -31,24 +46,202 @@ def parse_transactions(json_data):
     columns_order = ['date', 'amount', 'merchant', 'category', 'termText']
     df = df[columns_order]
     
-    # Sort by date
-    df = df.sort_values('date')
+    # Sort by date; feeds usually arrive in order already
+    if not df['date'].is_monotonic_increasing:
+        df = df.sort_values('date')
     
     return df
 
-def display_summary(df):
+def _checked_table(table: str) -> str:
+    # Table names cannot be bound as parameters
+    if not table.isidentifier():
+        raise ValueError(f"Invalid table name: {table!r}")
+    return table
+
+def init_transactions_table(conn: sqlite3.Connection, table: str = TRANSACTIONS_TABLE) -> None:
+    """Create a transactions table indexed for date and category range scans."""
+    table = _checked_table(table)
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            date TEXT NOT NULL,
+            amount REAL NOT NULL,
+            merchant TEXT,
+            category TEXT,
+            termText TEXT
+        )
+    ''')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_date ON {table} (date)')
+    conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_category_date ON {table} (category, date)')
+    conn.commit()
+
+def store_transactions(
+    conn: sqlite3.Connection,
+    transactions: Iterable[Dict],
+    table: str = TRANSACTIONS_TABLE,
+    rollup: Optional[TransactionRollup] = None
+) -> None:
+    """
+    Append transaction dicts, as found in the transactions JSON, to a table.
+    
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        transactions (Iterable[Dict]): Dicts with date, amount, merchant, category and termText
+        table (str): Table created by init_transactions_table
+        rollup (TransactionRollup, optional): Updated with each stored
+            transaction once the insert commits, so summaries stay current
+            without re-reading the table
+    """
+    table = _checked_table(table)
+    rows = [(t['date'], t['amount'], t.get('merchant'), t.get('category'), t.get('termText'))
+            for t in transactions]
+    with conn:
+        conn.executemany(f'''
+            INSERT INTO {table} (date, amount, merchant, category, termText)
+            VALUES (?, ?, ?, ?, ?)
+        ''', rows)
+    if rollup is not None:
+        for when, amount, _, category, _ in rows:
+            rollup.add(when, amount, category)
+
+def _range_conditions(
+    date_sql: str,
+    category_sql: str,
+    start: Optional[date],
+    end: Optional[date],
+    categories: Optional[Sequence[str]]
+) -> Tuple[list, list]:
+    conditions, params = [], []
+    if start is not None:
+        conditions.append(f'{date_sql} >= ?')
+        params.append(start.isoformat())
+    if end is not None:
+        # Exclusive upper bound on the next day keeps dates stored with a time
+        # inside the range without wrapping the column in a function
+        conditions.append(f'{date_sql} < ?')
+        params.append((end + timedelta(days=1)).isoformat())
+    if categories is not None:
+        conditions.append(f"{category_sql} IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    return conditions, params
+
+def _read_chunks(conn: sqlite3.Connection, query: str, params: list, chunksize: int) -> Iterator[pd.DataFrame]:
+    return pd.read_sql_query(
+        query, conn, params=params, chunksize=chunksize,
+        parse_dates=['date'], dtype=TRANSACTION_DTYPES
+    )
+
+def read_transactions_sql(
+    conn: sqlite3.Connection,
+    table: str = TRANSACTIONS_TABLE,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    categories: Optional[Sequence[str]] = None,
+    chunksize: int = CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Read transactions from a SQLite table in date order, one chunk at a time.
+    
+    Filters run in SQL against the table's indexes, so only matching rows
+    are read and at most one chunk is held in memory.
+    
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        table (str): Table with date, amount, merchant, category and termText columns
+        start (date, optional): First day included
+        end (date, optional): Last day included
+        categories (Sequence[str], optional): Categories to keep
+        chunksize (int): Rows per chunk
+    
+    Yields:
+        pandas.DataFrame: Chunks with datetime dates and numeric, signed amounts
+    
+    Raises:
+        ValueError: If the table name is not a plain identifier
+    """
+    table = _checked_table(table)
+    conditions, params = _range_conditions('date', 'category', start, end, categories)
+    query = f'''
+        SELECT date, amount, merchant, category, termText
+        FROM {table}
+        WHERE {' AND '.join(conditions) or '1'}
+        ORDER BY date, id
+    '''
+    return _read_chunks(conn, query, params, chunksize)
+
+def read_webhook_transactions(
+    conn: sqlite3.Connection,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    categories: Optional[Sequence[str]] = None,
+    profile_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    chunksize: int = CHUNK_SIZE
+) -> Iterator[pd.DataFrame]:
+    """
+    Read transactions carried in stored webhook payloads, one chunk at a time.
+    
+    Each payload's transactions array is unnested by SQLite's json_each, so
+    payloads are never decoded in Python. Rows come in arrival order (webhook
+    id, then position in the payload) rather than date order, which avoids a
+    sort over the whole history; TransactionRollup accepts either.
+    
+    Args:
+        conn (sqlite3.Connection): Connection to the webhook database
+        start (date, optional): First transaction day included
+        end (date, optional): Last transaction day included
+        categories (Sequence[str], optional): Categories to keep
+        profile_id (str, optional): Only payloads for this profileId
+        event_type (str, optional): Only payloads of this type
+        chunksize (int): Rows per chunk
+    
+    Yields:
+        pandas.DataFrame: Chunks with datetime dates and numeric, signed amounts
+    """
+    where, params = filter_clause(profile_id=profile_id, event_type=event_type)
+    conditions, range_params = _range_conditions(
+        "json_extract(t.value, '$.date')", "json_extract(t.value, '$.category')",
+        start, end, categories
+    )
+    query = f'''
+        SELECT json_extract(t.value, '$.date') AS date,
+               json_extract(t.value, '$.amount') AS amount,
+               json_extract(t.value, '$.merchant') AS merchant,
+               json_extract(t.value, '$.category') AS category,
+               json_extract(t.value, '$.termText') AS termText
+        FROM cloud_run_webhooks w, json_each(w.payload, '$.transactions') t
+        WHERE {' AND '.join([where, *conditions])}
+        ORDER BY w.id, t.key
+    '''
+    return _read_chunks(conn, query, params + range_params, chunksize)
+
+def display_summary(df, rollup=None):
     """
     Print summary statistics about the transactions.
     
     Args:
         df (pandas.DataFrame): Transaction data
+        rollup (TransactionRollup, optional): Aggregates kept up to date as
+            transactions arrive, e.g. by store_transactions; when given, the
+            summary is read from it instead of scanning df
     """
-    # Convert amount strings back to float for calculations
-    amounts = df['amount'].apply(lambda x: float(x.replace('$', '')))
+    if rollup is None:
+        # Convert amount strings back to float for calculations
+        amounts = df['amount'].apply(lambda x: float(x.replace('$', '')))
+        count, amount = len(df), amounts.sum()
+        first, last = df['date'].min(), df['date'].max()
+        by_category = df['category'].value_counts()
+    else:
+        count, amount = rollup.totals()
+        first, last = rollup.date_range
+        by_category = pd.Series(
+            {category: category_count for category, category_count, _ in rollup.category_breakdown()},
+            name='count'
+        ).rename_axis('category')
     
     print("\nTransaction Summary:")
-    print(f"Total Transactions: {len(df)}")
-    print(f"Date Range: {df['date'].min().strftime('%Y-%m-%d')} to {df['date'].max().strftime('%Y-%m-%d')}")
-    print(f"Total Spent: ${abs(amounts.sum()):.2f}")
+    print(f"Total Transactions: {count}")
+    print(f"Date Range: {first.strftime('%Y-%m-%d')} to {last.strftime('%Y-%m-%d')}")
+    print(f"Total Spent: ${abs(amount):.2f}")
     print("\nTransactions by Category:")
-    print(df['category'].value_counts())
+    print(by_category)
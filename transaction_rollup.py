@@ -0,0 +1,273 @@
+from array import array
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import pandas as pd
+
+DateLike = Union[str, date, datetime]
+
+# Day number of 1970-01-01, for converting datetime64[D] values to ordinals
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _ordinal(value: DateLike) -> int:
+    """Proleptic Gregorian day number of a date, datetime or YYYY-MM-DD string."""
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10]).toordinal()
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    return value.toordinal()
+
+
+def _cents(amount) -> int:
+    """Amount in integer cents; '$12.34' strings from parse_transactions are accepted."""
+    if isinstance(amount, str):
+        amount = float(amount.replace('$', ''))
+    return round(amount * 100)
+
+
+class _DailySeries:
+    """
+    Transaction counts and cent totals for every day between the first and
+    last transaction, with prefix sums over both.
+
+    Days are stored densely, so a date maps to its slot by subtraction and a
+    range total is two prefix lookups. Prefix sums are repaired lazily from
+    the earliest day changed since the last query; transactions arriving in
+    date order only ever touch the tail.
+    """
+
+    __slots__ = ('origin', 'counts', 'cents', '_prefix_counts', '_prefix_cents', '_dirty')
+
+    def __init__(self):
+        self.origin: Optional[int] = None
+        self.counts = array('q')
+        self.cents = array('q')
+        # Entry i holds the sum of days [0, i)
+        self._prefix_counts = array('q', [0])
+        self._prefix_cents = array('q', [0])
+        self._dirty = 0
+
+    def add(self, day: int, cents: int, count: int = 1) -> None:
+        if self.origin is None:
+            self.origin = day
+        elif day < self.origin:
+            # Rare: a transaction older than any seen so far shifts every slot
+            shift = self.origin - day
+            self.counts = array('q', bytes(8 * shift)) + self.counts
+            self.cents = array('q', bytes(8 * shift)) + self.cents
+            self._prefix_counts = array('q', [0])
+            self._prefix_cents = array('q', [0])
+            self.origin = day
+            self._dirty = 0
+
+        index = day - self.origin
+        if index >= len(self.counts):
+            padding = bytes(8 * (index + 1 - len(self.counts)))
+            self.counts.frombytes(padding)
+            self.cents.frombytes(padding)
+        self.counts[index] += count
+        self.cents[index] += cents
+        self._dirty = min(self._dirty, index)
+
+    def _refresh(self) -> None:
+        if self._dirty >= len(self.counts):
+            return
+        del self._prefix_counts[self._dirty + 1:]
+        del self._prefix_cents[self._dirty + 1:]
+        running_count = self._prefix_counts[-1]
+        running_cents = self._prefix_cents[-1]
+        for index in range(self._dirty, len(self.counts)):
+            running_count += self.counts[index]
+            running_cents += self.cents[index]
+            self._prefix_counts.append(running_count)
+            self._prefix_cents.append(running_cents)
+        self._dirty = len(self.counts)
+
+    def total(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[int, int]:
+        """(count, cents) over days start..end inclusive; None means unbounded."""
+        if self.origin is None:
+            return 0, 0
+        self._refresh()
+        first = 0 if start is None else max(start - self.origin, 0)
+        last = len(self.counts) if end is None else min(end - self.origin + 1, len(self.counts))
+        if first >= last:
+            return 0, 0
+        return (
+            self._prefix_counts[last] - self._prefix_counts[first],
+            self._prefix_cents[last] - self._prefix_cents[first]
+        )
+
+    @property
+    def last_day(self) -> Optional[int]:
+        return None if self.origin is None else self.origin + len(self.counts) - 1
+
+
+class TransactionRollup:
+    """
+    Per-day and per-category transaction aggregates maintained as
+    transactions arrive.
+
+    Each transaction updates its day in the overall series and in its
+    category's series, in amortised O(1). Transactions without a category
+    only count towards the overall series, as value_counts drops them. Totals over any date range come
+    from prefix sums, so summaries and spend-by-category views cost the
+    same for a week of data as for years of it. Amounts are kept in integer
+    cents so long-running sums do not drift.
+    """
+
+    def __init__(self):
+        self._overall = _DailySeries()
+        # Insertion order is first appearance, which breaks count ties in category_breakdown
+        self._categories: Dict[str, _DailySeries] = {}
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Dict]) -> "TransactionRollup":
+        """Build a rollup from transaction dicts with date, amount and category keys."""
+        rollup = cls()
+        rollup.add_many(transactions)
+        return rollup
+
+    @classmethod
+    def from_frame(cls, df) -> "TransactionRollup":
+        """Build a rollup from a DataFrame returned by parse_transactions."""
+        rollup = cls()
+        rollup.add_frame(df)
+        return rollup
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable) -> "TransactionRollup":
+        """Build a rollup from DataFrame chunks, e.g. read_transactions_sql output."""
+        rollup = cls()
+        for chunk in chunks:
+            rollup.add_frame(chunk)
+        return rollup
+
+    def add(self, when: DateLike, amount, category: str) -> None:
+        """
+        Record one transaction.
+
+        Args:
+            when (DateLike): Transaction date
+            amount (float or str): Signed amount, or a '$12.34' string
+            category (str): Spending category, or None
+        """
+        day = _ordinal(when)
+        cents = _cents(amount)
+        self._overall.add(day, cents)
+        if pd.isna(category):
+            return
+        series = self._categories.get(category)
+        if series is None:
+            series = self._categories[category] = _DailySeries()
+        series.add(day, cents)
+
+    def add_many(self, transactions: Iterable[Dict]) -> None:
+        for transaction in transactions:
+            self.add(transaction['date'], transaction['amount'], transaction['category'])
+
+    def add_frame(self, df) -> None:
+        """
+        Record every row of a DataFrame, e.g. one chunk from a SQL loader.
+
+        Rows are summed per day and per (category, day) with a groupby, so
+        the daily series see one update per group instead of one per row.
+
+        Raises:
+            ValueError: If a date is missing
+        """
+        if df.empty:
+            return
+        dates = pd.to_datetime(df['date'])
+        if dates.isna().any():
+            raise ValueError("Transaction dates must not be missing")
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        amounts = df['amount']
+        if amounts.dtype.kind not in 'iuf':
+            # '$12.34' strings from parse_transactions
+            amounts = amounts.astype(str).str.replace('$', '', regex=False).astype('float64')
+
+        frame = pd.DataFrame({
+            'day': dates.to_numpy().astype('datetime64[D]').astype('int64') + _EPOCH_ORDINAL,
+            'cents': (amounts.to_numpy(dtype='float64') * 100).round().astype('int64'),
+            'category': df['category'].to_numpy(dtype=object)
+        })
+
+        # Days ascending, so each series only grows at its tail
+        overall = frame.groupby('day')['cents'].agg(['size', 'sum'])
+        for day, count, cents in zip(overall.index, overall['size'], overall['sum']):
+            self._overall.add(int(day), int(cents), int(count))
+
+        categorised = frame.dropna(subset=['category'])
+        # Registered in order of first appearance, which breaks count ties in category_breakdown
+        for category in categorised['category'].unique():
+            if category not in self._categories:
+                self._categories[category] = _DailySeries()
+        grouped = categorised.groupby(['category', 'day'])['cents'].agg(['size', 'sum'])
+        for (category, day), count, cents in zip(grouped.index, grouped['size'], grouped['sum']):
+            self._categories[category].add(int(day), int(cents), int(count))
+
+    def totals(
+        self,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None,
+        category: Optional[str] = None
+    ) -> Tuple[int, float]:
+        """
+        Transaction count and summed amount over a date range.
+
+        Args:
+            start (DateLike, optional): First day included, unbounded if omitted
+            end (DateLike, optional): Last day included, unbounded if omitted
+            category (str, optional): Restrict to one category
+
+        Returns:
+            Tuple[int, float]: (count, amount)
+        """
+        series = self._overall if category is None else self._categories.get(category)
+        if series is None:
+            return 0, 0.0
+        count, cents = series.total(
+            None if start is None else _ordinal(start),
+            None if end is None else _ordinal(end)
+        )
+        return count, cents / 100
+
+    def category_breakdown(
+        self,
+        start: Optional[DateLike] = None,
+        end: Optional[DateLike] = None
+    ) -> List[Tuple[str, int, float]]:
+        """
+        Count and amount per category over a date range, most frequent first.
+
+        Args:
+            start (DateLike, optional): First day included
+            end (DateLike, optional): Last day included
+
+        Returns:
+            List[Tuple[str, int, float]]: (category, count, amount) for categories with transactions in range
+        """
+        rows = []
+        for category in self._categories:
+            count, amount = self.totals(start, end, category)
+            if count:
+                rows.append((category, count, amount))
+        # Stable sort keeps first-appearance order between equal counts
+        rows.sort(key=lambda row: row[1], reverse=True)
+        return rows
+
+    @property
+    def count(self) -> int:
+        return self._overall.total()[0]
+
+    @property
+    def date_range(self) -> Optional[Tuple[date, date]]:
+        """First and last transaction dates, or None if there are none."""
+        if self._overall.origin is None:
+            return None
+        return date.fromordinal(self._overall.origin), date.fromordinal(self._overall.last_day)
+
+    @property
+    def categories(self) -> List[str]:
+        return list(self._categories)
@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+from metrics import WEBHOOK_DUPLICATE_RATIO, WEBHOOK_EVENTS
+
+
+class RecentEventIds:
+    """
+    Bounded LRU set of recently seen webhook event ids.
+
+    Redeliveries usually arrive within minutes, so a few hundred thousand
+    ids catch nearly all of them without a database round trip. Older
+    duplicates are still rejected by the unique index on event_id.
+    """
+
+    def __init__(self, capacity: int = 200000):
+        self.capacity = capacity
+        self._ids: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def warm(self, event_ids: Iterable[str]) -> None:
+        """Preload ids, oldest first, e.g. after a restart."""
+        with self._lock:
+            for event_id in event_ids:
+                self._ids[event_id] = None
+                self._ids.move_to_end(event_id)
+            while len(self._ids) > self.capacity:
+                self._ids.popitem(last=False)
+
+    def check_and_add(self, event_id: Optional[str]) -> bool:
+        """
+        Record a delivery and report whether its id was already seen.
+
+        Args:
+            event_id (str, optional): Event id; deliveries without one are never duplicates
+
+        Returns:
+            bool: True if the event is a known duplicate
+        """
+        with self._lock:
+            self.checked += 1
+            if event_id is None:
+                duplicate = False
+            elif event_id in self._ids:
+                self._ids.move_to_end(event_id)
+                duplicate = True
+            else:
+                self._ids[event_id] = None
+                if len(self._ids) > self.capacity:
+                    self._ids.popitem(last=False)
+                duplicate = False
+        if duplicate:
+            self.record_duplicates(1)
+        else:
+            self._update_ratio()
+        return duplicate
+
+    def discard(self, event_id: Optional[str]) -> None:
+        """Forget an id whose delivery was not stored, so a retry is accepted."""
+        if event_id is not None:
+            with self._lock:
+                self._ids.pop(event_id, None)
+
+    def record_duplicates(self, count: int) -> None:
+        """Count duplicates caught later, e.g. by the database's unique index."""
+        if not count:
+            return
+        with self._lock:
+            self.duplicates += count
+        WEBHOOK_EVENTS.inc(count, outcome="duplicate")
+        self._update_ratio()
+
+    @property
+    def duplicate_rate(self) -> float:
+        return self.duplicates / self.checked if self.checked else 0.0
+
+    def _update_ratio(self) -> None:
+        WEBHOOK_DUPLICATE_RATIO.set(self.duplicate_rate)
@@ -1,79 +1,158 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
+import atexit
+import os
+import signal
 import sqlite3
+import sys
 from datetime import datetime
 import json
 import hmac
 import hashlib
+from metrics import REGISTRY, PROMETHEUS_CONTENT_TYPE, WEBHOOK_EVENTS
+from webhook_dedup import RecentEventIds
+from webhook_queue import IngestQueue
+from webhook_store import DB_PATH, HEADERS_SQL, event_id_for, filter_clause, init_db, iter_webhooks, recent_event_ids, store_webhooks
 
 app = Flask(__name__)
 
-def init_db():
-    conn = sqlite3.connect('webhook_data.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS cloud_run_webhooks (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            payload JSON,
-            headers JSON,
-            timestamp DATETIME,
-            source_ip TEXT
-        )
-    ''')
-    conn.commit()
-    conn.close()
+# 'sync' writes each delivery before answering; 'async' answers 202 and
+# writes from a background queue
+INGEST_MODE = os.getenv('WEBHOOK_INGEST_MODE', 'sync')
+QUEUE_SIZE = int(os.getenv('WEBHOOK_QUEUE_SIZE', '10000'))
+RETRY_AFTER_SECONDS = int(os.getenv('WEBHOOK_RETRY_AFTER', '5'))
+DEDUP_CAPACITY = int(os.getenv('WEBHOOK_DEDUP_CAPACITY', '200000'))
+
+# Sahha redelivers events it did not see acknowledged; recent ids are answered
+# from memory and older ones are caught by the unique index on event_id
+recent_ids = RecentEventIds(DEDUP_CAPACITY)
+try:
+    _conn = sqlite3.connect(DB_PATH)
+    recent_ids.warm(recent_event_ids(_conn, DEDUP_CAPACITY))
+    _conn.close()
+except sqlite3.Error:
+    pass
+
+ingest_queue = IngestQueue(DB_PATH, maxsize=QUEUE_SIZE, recent_ids=recent_ids) if INGEST_MODE == 'async' else None
+if ingest_queue is not None:
+    ingest_queue.start()
+
+@atexit.register
+def _drain_ingest_queue():
+    if ingest_queue is not None:
+        ingest_queue.shutdown()
+
+def _duplicate_response():
+    return jsonify({
+        'status': 'success',
+        'message': 'Webhook already received',
+        'timestamp': datetime.utcnow().isoformat()
+    }), 200
 
 @app.route('/receive-webhook', methods=['POST'])
 def handle_webhook():
+    if ingest_queue is not None:
+        return _enqueue_webhook()
+
     try:
         # Store all headers
         headers = dict(request.headers)
-        
+
         # Get the payload
         payload = request.get_json(silent=True) or {}
-        
+
         # Store source IP for debugging
         source_ip = request.remote_addr
-        
+
+        event_id = event_id_for(payload) if isinstance(payload, dict) else None
+        if recent_ids.check_and_add(event_id):
+            return _duplicate_response()
+
         # Store in database
-        conn = sqlite3.connect('webhook_data.db')
-        c = conn.cursor()
-        c.execute('''
-            INSERT INTO cloud_run_webhooks 
-            (payload, headers, timestamp, source_ip) 
-            VALUES (?, ?, ?, ?)
-        ''', (
-            json.dumps(payload),
-            json.dumps(headers),
-            datetime.utcnow(),
-            source_ip
-        ))
-        conn.commit()
-        conn.close()
-        
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            inserted = store_webhooks(conn, [(
+                json.dumps(payload),
+                json.dumps(headers),
+                datetime.utcnow(),
+                source_ip,
+                event_id
+            )])
+        except Exception:
+            recent_ids.discard(event_id)
+            raise
+        finally:
+            conn.close()
+        if not inserted:
+            recent_ids.record_duplicates(1)
+            return _duplicate_response()
+        WEBHOOK_EVENTS.inc(outcome="stored")
+
         return jsonify({
             'status': 'success',
             'message': 'Webhook received and stored',
             'timestamp': datetime.utcnow().isoformat()
         }), 200
-        
+
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+def _enqueue_webhook():
+    """Validate a delivery, queue it for storage and acknowledge it with 202."""
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        WEBHOOK_EVENTS.inc(outcome="invalid")
+        return jsonify({
+            'status': 'error',
+            'message': 'Webhook payload must be a JSON object'
+        }), 400
+
+    event_id = event_id_for(payload)
+    if recent_ids.check_and_add(event_id):
+        return _duplicate_response()
+
+    received_at = datetime.utcnow()
+    accepted = ingest_queue.submit((
+        json.dumps(payload),
+        json.dumps(dict(request.headers)),
+        received_at,
+        request.remote_addr,
+        event_id
+    ))
+    if not accepted:
+        recent_ids.discard(event_id)
+        WEBHOOK_EVENTS.inc(outcome="rejected")
+        response = jsonify({
+            'status': 'error',
+            'message': 'Ingest queue is full, retry later'
+        })
+        response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+        return response, 503
+
+    WEBHOOK_EVENTS.inc(outcome="accepted")
+    return jsonify({
+        'status': 'accepted',
+        'message': 'Webhook received and queued for storage',
+        'timestamp': received_at.isoformat()
+    }), 202
+
 # Endpoint to view stored webhooks
 @app.route('/view-webhooks', methods=['GET'])
 def view_webhooks():
     try:
-        conn = sqlite3.connect('webhook_data.db')
+        where, params = filter_clause(**_export_filters())
+        conn = sqlite3.connect(DB_PATH)
         c = conn.cursor()
-        c.execute('''
-            SELECT id, payload, headers, timestamp, source_ip 
-            FROM cloud_run_webhooks 
-            ORDER BY timestamp DESC 
+        c.execute(f'''
+            SELECT w.id, w.payload, {HEADERS_SQL}, w.timestamp, w.source_ip
+            FROM cloud_run_webhooks w
+            LEFT JOIN webhook_headers h ON h.hash = w.headers_hash
+            WHERE {where}
+            ORDER BY w.timestamp DESC
             LIMIT 50
-        ''')
+        ''', params)
         webhooks = [{
             'id': row[0],
             'payload': json.loads(row[1]),
@@ -82,15 +161,57 @@ def view_webhooks():
             'source_ip': row[4]
         } for row in c.fetchall()]
         conn.close()
-        
+
         return jsonify(webhooks), 200
-        
+
     except Exception as e:
         return jsonify({
             'status': 'error',
             'message': str(e)
         }), 500
 
+def _export_filters() -> dict:
+    return {
+        'profile_id': request.args.get('profileId'),
+        'event_type': request.args.get('type'),
+        'since': request.args.get('since'),
+        'until': request.args.get('until')
+    }
+
+# Stream every matching webhook as NDJSON, one object per line
+@app.route('/export-webhooks', methods=['GET'])
+def export_webhooks():
+    filters = _export_filters()
+    include_headers = request.args.get('headers') == '1'
+
+    def generate():
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            for row_id, event_id, payload, timestamp, source_ip, headers in iter_webhooks(
+                conn, include_headers=include_headers, **filters
+            ):
+                # Stored payload and header text is already JSON, so it is
+                # spliced in as-is instead of being decoded and re-encoded
+                line = (
+                    f'{{"id":{row_id},"event_id":{json.dumps(event_id)},'
+                    f'"timestamp":{json.dumps(timestamp)},"source_ip":{json.dumps(source_ip)},'
+                    f'"payload":{payload}'
+                )
+                if include_headers:
+                    line += f',"headers":{headers or "null"}'
+                yield line + '}\n'
+        finally:
+            conn.close()
+
+    return Response(generate(), content_type='application/x-ndjson')
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Expose ingestion metrics, including queue depth and drain latency."""
+    return Response(REGISTRY.expose(), content_type=PROMETHEUS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     init_db()
-    app.run(debug=True, port=8080)
\ No newline at end of file
+    # Turn SIGTERM into a normal exit so the ingest queue drains before shutdown
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    app.run(debug=True, port=8080)
@@ -0,0 +1,148 @@
+import logging
+import queue
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+from metrics import WEBHOOK_DRAIN_LATENCY, WEBHOOK_EVENTS, WEBHOOK_QUEUE_DEPTH
+from webhook_dedup import RecentEventIds
+from webhook_store import DB_PATH, WebhookRow, connect, store_webhooks
+
+logger = logging.getLogger(__name__)
+
+
+class IngestQueue:
+    """
+    Bounded in-memory queue drained to SQLite by a background worker.
+
+    Deliveries are acknowledged as soon as they are enqueued. The worker
+    writes them in batches, one transaction per batch. When the queue is full,
+    submit() refuses new deliveries so the caller can push back on the sender.
+
+    A batch that fails to write is retried with backoff. Its event ids are
+    released from the dedup set as soon as the first attempt fails, so if
+    the batch is finally dropped, the sender's redelivery is stored instead
+    of being rejected as a duplicate.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        maxsize: int = 10000,
+        batch_size: int = 200,
+        store: Optional[Callable[[List[WebhookRow]], int]] = None,
+        recent_ids: Optional[RecentEventIds] = None,
+        max_attempts: int = 3,
+        retry_delay: float = 0.5
+    ):
+        """
+        Args:
+            db_path (str): SQLite database to drain into
+            maxsize (int): Maximum deliveries waiting to be written
+            batch_size (int): Maximum deliveries written per transaction
+            store (Callable, optional): Replaces the default SQLite writer; returns rows inserted
+            recent_ids (RecentEventIds, optional): Credited with duplicates the database
+                ignored, and released for batches that fail to write
+            max_attempts (int): Write attempts per batch before it is dropped
+            retry_delay (float): Seconds before the first retry, doubled after each one
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Tuple[float, WebhookRow]]" = queue.Queue(maxsize=maxsize)
+        self._store = store
+        self._recent_ids = recent_ids
+        self.max_attempts = max(1, max_attempts)
+        self.retry_delay = retry_delay
+        self._stopping = threading.Event()
+        self._worker: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="webhook-ingest", daemon=True)
+            self._worker.start()
+
+    def submit(self, row: WebhookRow) -> bool:
+        """
+        Enqueue a delivery for storage.
+
+        Args:
+            row (WebhookRow): (payload, headers, timestamp, source_ip, event_id)
+
+        Returns:
+            bool: False if the queue is full or shutting down
+        """
+        if self._stopping.is_set():
+            return False
+        try:
+            self._queue.put_nowait((time.perf_counter(), row))
+        except queue.Full:
+            return False
+        WEBHOOK_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def shutdown(self, timeout: float = 30.0) -> None:
+        """Stop accepting deliveries and wait for the queue to drain."""
+        self._stopping.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def _run(self) -> None:
+        conn = connect(self.db_path) if self._store is None else None
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                try:
+                    first = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                batch = [first]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._write(conn, batch)
+                WEBHOOK_QUEUE_DEPTH.set(self._queue.qsize())
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn, batch: List[Tuple[float, WebhookRow]]) -> None:
+        rows = [row for _, row in batch]
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if self._store is not None:
+                    inserted = self._store(rows)
+                else:
+                    inserted = store_webhooks(conn, rows)
+                break
+            except Exception:
+                # The sender already has its 202; forget the ids so that its
+                # redelivery is accepted, whatever happens to this batch
+                if attempt == 1:
+                    self._release(rows)
+                if attempt == self.max_attempts:
+                    logger.exception("Dropping %d webhooks after %d failed attempts", len(rows), attempt)
+                    WEBHOOK_EVENTS.inc(len(rows), outcome="failed")
+                    return
+                logger.warning(
+                    "Storing %d webhooks failed (attempt %d of %d), retrying",
+                    len(rows), attempt, self.max_attempts, exc_info=True
+                )
+                WEBHOOK_EVENTS.inc(len(rows), outcome="retried")
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+
+        now = time.perf_counter()
+        for enqueued_at, _ in batch:
+            WEBHOOK_DRAIN_LATENCY.observe(now - enqueued_at)
+        WEBHOOK_EVENTS.inc(inserted, outcome="stored")
+        if self._recent_ids is not None:
+            self._recent_ids.record_duplicates(len(rows) - inserted)
+
+    def _release(self, rows: List[WebhookRow]) -> None:
+        if self._recent_ids is not None:
+            for *_, event_id in rows:
+                self._recent_ids.discard(event_id)
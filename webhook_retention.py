@@ -0,0 +1,144 @@
+import argparse
+import gzip
+import json
+import os
+import sqlite3
+from datetime import date, datetime, timedelta, timezone
+from typing import List, Optional
+from webhook_store import DB_PATH, HEADERS_SQL, connect
+
+RETENTION_DAYS = int(os.getenv('WEBHOOK_RETENTION_DAYS', '30'))
+ARCHIVE_DIR = os.getenv('WEBHOOK_ARCHIVE_DIR', 'webhook_archive')
+# Pages returned to the OS per incremental_vacuum step
+VACUUM_STEP_PAGES = 1000
+
+
+def expired_days(conn: sqlite3.Connection, retention_days: int, today: Optional[date] = None) -> List[str]:
+    """
+    Day partitions older than the retention window, oldest first.
+
+    Partitions are keyed by UTC receive day, so today defaults to the
+    current UTC date rather than the local one.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = (today - timedelta(days=retention_days)).isoformat()
+    rows = conn.execute('''
+        SELECT DISTINCT partition_day FROM cloud_run_webhooks
+        WHERE partition_day < ?
+        ORDER BY partition_day
+    ''', (cutoff,)).fetchall()
+    return [row[0] for row in rows]
+
+
+def archive_day(conn: sqlite3.Connection, day: str, archive_dir: str = ARCHIVE_DIR) -> int:
+    """
+    Move one day partition into a gzip-compressed JSONL file.
+
+    Rows are appended to webhooks-<day>.jsonl.gz, then deleted from the
+    database. Appending keeps late arrivals for an archived day; if a run is
+    interrupted between the two steps, its rows appear twice in the archive
+    and can be told apart by event_id.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        day (str): Partition day, YYYY-MM-DD
+        archive_dir (str): Directory for archive files
+
+    Returns:
+        int: Number of rows archived
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f'webhooks-{day}.jsonl.gz')
+    cursor = conn.execute(f'''
+        SELECT w.id, w.event_id, w.payload, {HEADERS_SQL}, w.timestamp, w.source_ip
+        FROM cloud_run_webhooks w
+        LEFT JOIN webhook_headers h ON h.hash = w.headers_hash
+        WHERE w.partition_day = ?
+        ORDER BY w.id
+    ''', (day,))
+
+    count = 0
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        for row_id, event_id, payload, headers, timestamp, source_ip in cursor:
+            f.write(json.dumps({
+                'id': row_id,
+                'event_id': event_id,
+                'payload': json.loads(payload),
+                'headers': json.loads(headers) if headers else None,
+                'timestamp': timestamp,
+                'source_ip': source_ip
+            }) + '\n')
+            count += 1
+        f.flush()
+        os.fsync(f.fileno())
+
+    with conn:
+        conn.execute('DELETE FROM cloud_run_webhooks WHERE partition_day = ?', (day,))
+    return count
+
+
+def compact(conn: sqlite3.Connection) -> int:
+    """
+    Drop header sets no row refers to and release free pages incrementally.
+
+    Returns:
+        int: Number of pages released
+    """
+    with conn:
+        conn.execute('''
+            DELETE FROM webhook_headers
+            WHERE NOT EXISTS (
+                SELECT 1 FROM cloud_run_webhooks w WHERE w.headers_hash = webhook_headers.hash
+            )
+        ''')
+    start = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    free_pages = start
+    while free_pages:
+        # Small steps keep each write lock short so ingestion is not stalled.
+        # executescript steps the pragma to completion; execute() frees one page
+        conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})')
+        remaining = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if remaining >= free_pages:
+            break
+        free_pages = remaining
+    return start - free_pages
+
+
+def apply_retention(
+    db_path: str = DB_PATH,
+    retention_days: int = RETENTION_DAYS,
+    archive_dir: str = ARCHIVE_DIR,
+    today: Optional[date] = None
+) -> dict:
+    """
+    Archive every expired day partition, then compact the database.
+
+    Args:
+        db_path (str): Webhook database
+        retention_days (int): Days of deliveries to keep in the database
+        archive_dir (str): Directory for archive files
+        today (date, optional): Reference date, defaults to the current UTC date
+
+    Returns:
+        dict: Rows archived per day and pages released
+    """
+    conn = connect(db_path)
+    try:
+        archived = {day: archive_day(conn, day, archive_dir)
+                    for day in expired_days(conn, retention_days, today)}
+        return {'archived': archived, 'pages_released': compact(conn)}
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Archive expired webhook partitions and compact the database')
+    parser.add_argument('--db', default=DB_PATH, help='Webhook database')
+    parser.add_argument('--retention-days', type=int, default=RETENTION_DAYS, help='Days to keep in the database')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR, help='Directory for archive files')
+    args = parser.parse_args()
+
+    result = apply_retention(args.db, args.retention_days, args.archive_dir)
+    for day, count in result['archived'].items():
+        print(f"Archived {count} webhooks from {day}")
+    print(f"Released {result['pages_released']} pages")
@@ -0,0 +1,278 @@
+import hashlib
+import json
+import sqlite3
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+DB_PATH = 'webhook_data.db'
+
+# (payload JSON, headers JSON, received timestamp, source IP, event id)
+WebhookRow = Tuple[str, str, object, str, Optional[str]]
+
+# Headers that stay the same across deliveries from one sender. Only these
+# are deduplicated; per-request headers (Content-Length, trace ids, signature
+# timestamps) would make almost every set unique, so they stay on the row
+SHARED_HEADERS = frozenset({
+    'accept', 'accept-encoding', 'content-type', 'host', 'user-agent',
+    'via', 'x-event-type', 'x-forwarded-proto'
+})
+
+# Headers of a row joined to webhook_headers as h: the shared set with the
+# row's own headers laid over it
+HEADERS_SQL = '''
+    CASE WHEN w.headers IS NULL THEN h.headers
+         WHEN h.headers IS NULL THEN w.headers
+         ELSE json_patch(h.headers, w.headers) END'''
+
+
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    return sqlite3.connect(db_path)
+
+
+def event_id_for(payload: dict) -> Optional[str]:
+    """Identifier shared by every redelivery of a Sahha event."""
+    event_id = payload.get('id') or payload.get('requestId')
+    return str(event_id) if event_id is not None else None
+
+
+def partition_day(timestamp) -> str:
+    """Day partition (YYYY-MM-DD) for a received timestamp or its stored text."""
+    return str(timestamp)[:10]
+
+
+def headers_hash(headers_json: str) -> str:
+    return hashlib.sha256(headers_json.encode('utf-8')).hexdigest()
+
+
+def split_headers(headers_json: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Split a delivery's headers into the deduplicated shared set and the rest.
+
+    Shared header names are lowercased and serialised with sorted keys, so
+    every delivery from the same sender hashes the same.
+
+    Args:
+        headers_json (str): Headers of one delivery as a JSON object
+
+    Returns:
+        Tuple[str, str, Optional[str]]: (shared headers JSON, its hash, remaining headers JSON or None)
+    """
+    headers = json.loads(headers_json)
+    shared = {name.lower(): value for name, value in headers.items() if name.lower() in SHARED_HEADERS}
+    own = {name: value for name, value in headers.items() if name.lower() not in SHARED_HEADERS}
+    shared_json = json.dumps(shared, sort_keys=True)
+    return shared_json, headers_hash(shared_json), json.dumps(own) if own else None
+
+
+def init_db(db_path: str = DB_PATH) -> None:
+    conn = connect(db_path)
+    c = conn.cursor()
+    # Incremental auto-vacuum lets retention hand freed pages back to the OS
+    # without rewriting the whole file; switching an existing database over
+    # needs one full VACUUM
+    if c.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        c.execute('VACUUM')
+
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS cloud_run_webhooks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            payload JSON,
+            headers JSON,
+            timestamp DATETIME,
+            source_ip TEXT,
+            event_id TEXT,
+            partition_day TEXT,
+            headers_hash TEXT
+        )
+    ''')
+    # Header sets repeat across deliveries, so each distinct one is stored once
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS webhook_headers (
+            hash TEXT PRIMARY KEY,
+            headers JSON
+        )
+    ''')
+
+    # table_xinfo also lists generated columns, which table_info hides
+    columns = {row[1] for row in c.execute('PRAGMA table_xinfo(cloud_run_webhooks)')}
+    if 'event_id' not in columns:
+        c.execute('ALTER TABLE cloud_run_webhooks ADD COLUMN event_id TEXT')
+        # Backfill the first delivery of each event; later copies keep a NULL
+        # event id so the unique index can still be created
+        c.execute('''
+            UPDATE cloud_run_webhooks
+            SET event_id = COALESCE(json_extract(payload, '$.id'), json_extract(payload, '$.requestId'))
+            WHERE id IN (
+                SELECT MIN(id) FROM cloud_run_webhooks
+                GROUP BY COALESCE(json_extract(payload, '$.id'), json_extract(payload, '$.requestId'))
+            )
+        ''')
+
+    # NULL event ids (payloads without an id) are allowed to repeat
+    c.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_cloud_run_webhooks_event_id
+        ON cloud_run_webhooks (event_id)
+    ''')
+
+    if 'partition_day' not in columns:
+        c.execute('ALTER TABLE cloud_run_webhooks ADD COLUMN partition_day TEXT')
+        c.execute('UPDATE cloud_run_webhooks SET partition_day = substr(timestamp, 1, 10)')
+    if 'headers_hash' not in columns:
+        c.execute('ALTER TABLE cloud_run_webhooks ADD COLUMN headers_hash TEXT')
+        _move_headers(conn)
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cloud_run_webhooks_partition_day
+        ON cloud_run_webhooks (partition_day)
+    ''')
+    # Lets retention find header sets still in use without scanning every row
+    c.execute('''
+        CREATE INDEX IF NOT EXISTS idx_cloud_run_webhooks_headers_hash
+        ON cloud_run_webhooks (headers_hash)
+    ''')
+
+    # Virtual columns cost no storage; the indexes on them hold the extracted
+    # values so filtered exports never parse payloads
+    for column, path in (('profile_id', '$.profileId'), ('event_type', '$.type')):
+        if column not in columns:
+            c.execute(f'''
+                ALTER TABLE cloud_run_webhooks ADD COLUMN {column} TEXT
+                GENERATED ALWAYS AS (json_extract(payload, '{path}')) VIRTUAL
+            ''')
+        c.execute(f'''
+            CREATE INDEX IF NOT EXISTS idx_cloud_run_webhooks_{column}
+            ON cloud_run_webhooks ({column}, id)
+        ''')
+    conn.commit()
+    conn.close()
+
+
+def _move_headers(conn: sqlite3.Connection) -> None:
+    """Move the shared part of existing rows' inline headers into webhook_headers."""
+    rows = conn.execute('''
+        SELECT id, headers FROM cloud_run_webhooks
+        WHERE headers IS NOT NULL
+    ''').fetchall()
+    split = [(row_id, *split_headers(headers)) for row_id, headers in rows]
+    conn.executemany(
+        'INSERT OR IGNORE INTO webhook_headers (hash, headers) VALUES (?, ?)',
+        {(digest, shared) for _, shared, digest, _ in split}
+    )
+    conn.executemany(
+        'UPDATE cloud_run_webhooks SET headers = ?, headers_hash = ? WHERE id = ?',
+        [(own, digest, row_id) for row_id, _, digest, own in split]
+    )
+
+
+def store_webhooks(conn: sqlite3.Connection, rows: Iterable[WebhookRow]) -> int:
+    """
+    Insert webhook deliveries in a single transaction, ignoring known events.
+
+    Shared headers (see SHARED_HEADERS) are stored once in webhook_headers;
+    the rest stay inline on the row.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        rows (Iterable[WebhookRow]): (payload, headers, timestamp, source_ip, event_id) tuples
+
+    Returns:
+        int: Number of rows inserted; the rest were duplicates
+    """
+    rows = [
+        (payload, *split_headers(headers), timestamp, partition_day(timestamp), source_ip, event_id)
+        for payload, headers, timestamp, source_ip, event_id in rows
+    ]
+    with conn:
+        conn.executemany(
+            'INSERT OR IGNORE INTO webhook_headers (hash, headers) VALUES (?, ?)',
+            {(digest, shared) for _, shared, digest, *_ in rows}
+        )
+        before = conn.total_changes
+        conn.executemany('''
+            INSERT OR IGNORE INTO cloud_run_webhooks
+            (payload, headers, headers_hash, timestamp, partition_day, source_ip, event_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(payload, own, digest, timestamp, day, source_ip, event_id)
+              for payload, _, digest, own, timestamp, day, source_ip, event_id in rows])
+        return conn.total_changes - before
+
+
+def filter_clause(
+    profile_id: Optional[str] = None,
+    event_type: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None
+) -> Tuple[str, List]:
+    """
+    Build a WHERE clause over the indexed webhook columns.
+
+    Args:
+        profile_id (str, optional): Payload profileId
+        event_type (str, optional): Payload type
+        since (str, optional): First partition day to include, YYYY-MM-DD
+        until (str, optional): Last partition day to include, YYYY-MM-DD
+
+    Returns:
+        Tuple[str, List]: SQL conditions joined with AND (or "1") and their parameters
+    """
+    conditions, params = [], []
+    for condition, value in (
+        ('w.profile_id = ?', profile_id),
+        ('w.event_type = ?', event_type),
+        ('w.partition_day >= ?', since),
+        ('w.partition_day <= ?', until),
+    ):
+        if value is not None:
+            conditions.append(condition)
+            params.append(value)
+    return ' AND '.join(conditions) or '1', params
+
+
+def iter_webhooks(
+    conn: sqlite3.Connection,
+    include_headers: bool = False,
+    batch_size: int = 1000,
+    **filters
+) -> Iterator[tuple]:
+    """
+    Yield stored webhooks in id order without decoding their JSON.
+
+    Rows are read in short keyset-paginated batches, so a long export never
+    holds a read lock that would block ingestion.
+
+    Args:
+        conn (sqlite3.Connection): Open database connection
+        include_headers (bool): Also return the headers JSON text
+        batch_size (int): Rows per query
+        **filters: profile_id, event_type, since, until (see filter_clause)
+
+    Yields:
+        tuple: (id, event_id, payload, timestamp, source_ip, headers or None)
+    """
+    where, params = filter_clause(**filters)
+    headers_sql = HEADERS_SQL if include_headers else 'NULL'
+    query = f'''
+        SELECT w.id, w.event_id, w.payload, w.timestamp, w.source_ip, {headers_sql}
+        FROM cloud_run_webhooks w
+        LEFT JOIN webhook_headers h ON h.hash = w.headers_hash
+        WHERE {where} AND w.id > ?
+        ORDER BY w.id
+        LIMIT ?
+    '''
+    last_id = 0
+    while True:
+        rows = conn.execute(query, params + [last_id, batch_size]).fetchall()
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1][0]
+
+
+def recent_event_ids(conn: sqlite3.Connection, limit: int) -> Iterable[str]:
+    """Most recently stored event ids, oldest first."""
+    rows = conn.execute('''
+        SELECT event_id FROM cloud_run_webhooks
+        WHERE event_id IS NOT NULL
+        ORDER BY id DESC
+        LIMIT ?
+    ''', (limit,)).fetchall()
+    return [row[0] for row in reversed(rows)]